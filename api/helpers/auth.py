@@ -1,37 +1,77 @@
 """Helper functions to deal with authentication and authorization."""
+from ast import literal_eval
 from datetime import timedelta
 from functools import wraps
+from hashlib import sha256
+from json import dumps, loads
 from os import getenv
 from time import time
 
 from cryptography.fernet import Fernet
-from flask import request
+from flask import g, has_app_context, request
 from jwt import decode, encode
 
-from api.models import User
+from api.helpers.cache import LRUCache
+from api.models import Role, User
 
-# pylint:disable=invalid-name, eval-used, broad-except
+# pylint:disable=invalid-name, broad-except
+
+
+class ExpiredTokenError(Exception):
+    """A token was presented after its expiry time."""
+
+
+# Fernet ciphers keyed by the cryptographic key they were built with.
+ciphers = {}
+
+# Verified token claims keyed by the SHA-256 digest of the token.
+token_cache = LRUCache()
+
+
+def get_cipher():
+    """Get the cipher of the configured cryptographic key."""
+    cryptographic_key = getenv('CRYPTOGRAPHIC_KEY')
+    try:
+        return ciphers[cryptographic_key]
+    except KeyError:
+        cipher = Fernet(cryptographic_key.encode('utf-8'))
+        ciphers[cryptographic_key] = cipher
+        return cipher
+
+
+def init_auth(app):
+    """Build the cipher and size the token cache for an application."""
+    get_cipher()
+    token_cache.maxsize = app.config['TOKEN_CACHE_SIZE']
+    token_cache.ttl = app.config['TOKEN_CACHE_TTL']
+    Role.registry.ttl = app.config['ROLE_REGISTRY_TTL']
+    Role.registry.clear()
 
 
 def decrypt(data):
     """Decrypt data."""
-    cryptographic_key = getenv('CRYPTOGRAPHIC_KEY').encode('utf-8')
-    f = Fernet(cryptographic_key)
-    return eval((f.decrypt((data).encode('utf-8'))).decode('utf-8'))
+    decrypted = get_cipher().decrypt(data.encode('utf-8')).decode('utf-8')
+    try:
+        return loads(decrypted)
+    except ValueError:
+        # Tokens issued before claims were JSON encoded.
+        return literal_eval(decrypted)
 
 
 def encrypt(data):
     """Encrypt data."""
-    cryptographic_key = getenv('CRYPTOGRAPHIC_KEY').encode('utf-8')
-    f = Fernet(cryptographic_key)
-    return (f.encrypt(str(data).encode('utf-8'))).decode('utf-8')
+    return get_cipher().encrypt(dumps(data).encode('utf-8')).decode('utf-8')
 
 
 def create_token(email):
-    """Create access token and return it."""
+    """
+    Create access token and return it.
+
+    The user's roles are stored as a mask of their ids, see Role.mask.
+    """
     token_fields = ['id', 'email', 'name']
     user = User.get(email=email)
-    user_roles = [role.title for role in user.roles]
+    user_roles = Role.mask(user.role_ids())
     user = user.serialize()
     data = {field: user[field] for field in token_fields}
     data.update({'roles': user_roles})
@@ -43,13 +83,47 @@ def create_token(email):
 
 
 def view_token(token):
-    """View information inside token."""
-    decoded = decode(
-        token,
-        getenv('JWT_KEY'),
-        algorithms=['HS256'])
-    decrypted = decrypt(decoded['data'])
-    return decrypted
+    """
+    View information inside token.
+
+    Claims are memoized for the current request and kept in a bounded
+    cache until the token expires, so a token is only decoded and
+    decrypted the first time it is seen.
+    """
+    memo = g.setdefault('token_claims', {}) if has_app_context() else {}
+    try:
+        return memo[token]
+    except KeyError:
+        pass
+    key = sha256(token.encode('utf-8')).digest()
+    claims = token_cache.get(key)
+    if claims is None:
+        decoded = decode(
+            token,
+            getenv('JWT_KEY'),
+            algorithms=['HS256'])
+        if decoded['expires'] < time():
+            raise ExpiredTokenError('Expired token.')
+        claims = decrypt(decoded['data'])
+        token_cache.set(key, claims, expires=decoded['expires'])
+    memo[token] = claims
+    return claims
+
+
+def authenticate():
+    """
+    Verify the request's token once, before the request is dispatched.
+
+    The claims are kept on flask.g as the request's identity, or the
+    reason the token was rejected as its authentication error.
+    """
+    g.identity, g.auth_error = None, None
+    token = request.headers.get('Authorization')
+    if token:
+        try:
+            g.identity = view_token(token)
+        except Exception as e:
+            g.auth_error = str(e)
 
 
 def token_required(f):
@@ -57,54 +131,48 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         """Wrap function."""
-        token = request.headers.get('Authorization')
-        if not token:
+        if 'identity' not in g:
+            authenticate()
+        if not request.headers.get('Authorization'):
             return {
                 "status": "fail",
                 "error": "Bad request",
                 "message": "Header does not contain authorization token."
             }, 400
-        try:
-            decoded_token = decode(
-                token,
-                getenv('JWT_KEY'),
-                algorithms=['HS256'],
-                options={
-                    'verify_signature': True
-                }
-            )
-            if decoded_token['expires'] < time():
-                return {
-                    "status": "fail",
-                    "error": "Bad request",
-                    "message": "Expired token."
-                }, 400
-            else:
-                return f(*args, **kwargs)
-        except Exception as e:
+        if g.auth_error:
             return {
                 "status": "fail",
                 "error": "Bad request",
-                "message": str(e)
+                "message": g.auth_error
             }, 400
+        return f(*args, **kwargs)
     return decorated
 
 
+def has_role(claims, title):
+    """
+    Check whether a token's claims grant a role.
+
+    The mask of role ids is read through the role registry, so the check
+    does not query the database once the registry is loaded. Tokens issued
+    before masks were used list the titles instead.
+    """
+    roles = claims['roles']
+    if isinstance(roles, list):
+        return title in roles
+    role_id = Role.id_of(title)
+    return role_id is not None and bool(roles >> role_id & 1)
+
+
 def requires_role(role):
     """Define the decorator's wrapper."""
     def check_role(f):
         """Confirm the user who made a request has a required role."""
         @wraps(f)
-        def wrapper(request, *args, **kwargs):
+        @token_required
+        def wrapper(*args, **kwargs):
             """Carry out check_role functionality."""
-            token = request.headers.get('Authorization')
-            decoded_token = decode(
-                token,
-                getenv('JWT_KEY'),
-                algorithms=['HS256'],
-                options={
-                    'verify_signature': True})
-            if role in decoded_token['roles']:
+            if has_role(g.identity, role):
                 return f(*args, **kwargs)
             else:
                 return {
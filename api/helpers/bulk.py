@@ -0,0 +1,161 @@
+"""Bulk import of users."""
+
+from csv import DictReader
+from io import TextIOWrapper
+from itertools import islice
+from json import loads
+
+from flask import current_app
+
+from api.helpers.passwords import hash_passwords
+from api.helpers.validation import validate_json
+from api.models import Role, User, Wallet, db
+from api.models.base import commit, rollback
+from api.models.user import user_roles
+
+REQUIRED = ['email', 'name', 'password', 'phone_number']
+
+
+def read_users(stream, file_format):
+    """
+    Read user rows from a CSV or JSON lines stream, one row at a time.
+
+    Lines which are not valid JSON are yielded as a string describing the
+    problem, so they can be reported against their row number.
+    """
+    if isinstance(stream.read(0), bytes):
+        stream = TextIOWrapper(stream, encoding='utf-8')
+    if file_format == 'csv':
+        for row in DictReader(stream):
+            yield row
+    elif file_format == 'jsonl':
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                row = loads(line)
+            except ValueError as e:
+                row = str(e)
+            yield row
+    else:
+        raise ValueError('Unknown format {}.'.format(file_format))
+
+
+def import_users(rows, chunk_size=500, workers=None):
+    """
+    Create users with wallets and the basic role in batched inserts.
+
+    Each chunk of rows is validated, its passwords hashed and its users,
+    wallets and role rows inserted with one statement per table. Rows which
+    cannot be created are reported by their 1-based position.
+    """
+    basic_role_id = Role.id_of('basic')
+    rows = iter(rows)
+    created, errors, start = [], [], 1
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        ids, chunk_errors = import_chunk(
+            chunk, start, basic_role_id, workers)
+        created.extend(ids)
+        errors.extend(chunk_errors)
+        start += len(chunk)
+    return {'created': created, 'errors': errors}
+
+
+def import_chunk(chunk, start, basic_role_id, workers):
+    """Import a chunk of rows, returning the new ids and row errors."""
+    valid, errors = validate_chunk(chunk, start)
+    if not valid:
+        return [], errors
+    passwords = hash_passwords(
+        [row['password'] for _, row in valid], workers)
+    users = [{
+        'email': row['email'],
+        'name': row['name'],
+        'phone_number': row['phone_number'],
+        'password': password
+    } for (_, row), password in zip(valid, passwords)]
+    try:
+        db.session.execute(User.__table__.insert(), users)
+        ids = dict(db.session.query(User.email, User.id).filter(
+            User.email.in_([user['email'] for user in users])))
+        db.session.execute(
+            Wallet.__table__.insert(),
+            [{'user_id': ids[user['email']]} for user in users])
+        if basic_role_id is not None:
+            db.session.execute(
+                user_roles.insert(),
+                [{'user_id': ids[user['email']], 'role_id': basic_role_id}
+                 for user in users])
+        commit()
+    except Exception:
+        rollback()
+        current_app.logger.exception(
+            'Importing rows %s to %s failed.', start, start + len(chunk) - 1)
+        return [], errors + [{
+            'row': number,
+            'message': 'The user could not be created.',
+            'help': 'The rows imported with it were not created either.'
+        } for number, _ in valid]
+    return [ids[user['email']] for user in users], errors
+
+
+def validate_chunk(chunk, start):
+    """Split a chunk into numbered valid rows and row errors."""
+    valid, errors = [], []
+    emails, phone_numbers = set(), set()
+    for number, row in enumerate(chunk, start):
+        if not isinstance(row, dict):
+            errors.append({
+                'row': number,
+                'message': 'The row is not a valid object.',
+                'help': str(row)
+            })
+            continue
+        missing = validate_json(REQUIRED, row)
+        if isinstance(missing, str):
+            errors.append({
+                'row': number,
+                'message': 'Not all fields were provided.',
+                'missing': missing
+            })
+        elif any(not isinstance(row[key], str) for key in REQUIRED):
+            errors.append({
+                'row': number,
+                'message': 'Not all fields are strings.',
+                'invalid': ', '.join(
+                    key for key in REQUIRED if not isinstance(row[key], str))
+            })
+        elif row['email'] in emails or row['phone_number'] in phone_numbers:
+            errors.append({
+                'row': number,
+                'message': 'The email or phone number is repeated.',
+                'help': 'Each user should be in the import once.'
+            })
+        else:
+            emails.add(row['email'])
+            phone_numbers.add(row['phone_number'])
+            valid.append((number, row))
+    if valid:
+        taken = db.session.query(User.email, User.phone_number).filter(
+            User.email.in_(emails) | User.phone_number.in_(phone_numbers))
+        taken_emails, taken_phone_numbers = set(), set()
+        for email, phone_number in taken:
+            taken_emails.add(email)
+            taken_phone_numbers.add(phone_number)
+        remaining = []
+        for number, row in valid:
+            if row['email'] in taken_emails or \
+                    row['phone_number'] in taken_phone_numbers:
+                errors.append({
+                    'row': number,
+                    'message': 'The email or phone number is taken.',
+                    'help': 'Use details not registered to another user.'
+                })
+            else:
+                remaining.append((number, row))
+        valid = remaining
+    errors.sort(key=lambda error: error['row'])
+    return valid, errors
@@ -0,0 +1,115 @@
+"""In-process and shared caches."""
+
+from collections import OrderedDict
+from json import dumps, loads
+from threading import Lock
+from time import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LRUCache(object):
+    """
+    A bounded, thread-safe cache which evicts the least recently used entry.
+
+    Entries expire after ttl seconds when one is set, or at an explicit
+    timestamp given when the entry is stored.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """Create an empty cache."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def __len__(self):
+        """Count the entries, including expired ones not yet evicted."""
+        return len(self.entries)
+
+    def clear(self):
+        """Remove all entries."""
+        with self.lock:
+            self.entries.clear()
+
+    def delete(self, key):
+        """Remove an entry if it is present."""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def get(self, key, default=None):
+        """Get a live entry, marking it as recently used."""
+        with self.lock:
+            try:
+                value, expires = self.entries[key]
+            except KeyError:
+                return default
+            if expires is not None and expires <= time():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires=None):
+        """Store an entry, evicting the least recently used if full."""
+        if self.maxsize < 1:
+            return
+        if self.ttl is not None:
+            ttl_expires = time() + self.ttl
+            expires = ttl_expires if expires is None else min(
+                expires, ttl_expires)
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+class RedisCache(object):
+    """
+    A cache shared between processes, kept in Redis.
+
+    It has the interface of LRUCache. Values are stored as JSON under a
+    common prefix, and the server bounds the cache with its own LRU
+    eviction when given a maxmemory policy.
+    """
+
+    def __init__(self, client, ttl=None, prefix='cache:'):
+        """Use a Redis client for the cache."""
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Connect to the Redis server at a URL."""
+        if redis is None:
+            raise RuntimeError('A shared cache needs redis installed.')
+        return cls(redis.StrictRedis.from_url(url), **kwargs)
+
+    def clear(self):
+        """Remove all entries."""
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def delete(self, key):
+        """Remove an entry if it is present."""
+        self.client.delete(self.prefix + key)
+
+    def get(self, key, default=None):
+        """Get a live entry."""
+        value = self.client.get(self.prefix + key)
+        return default if value is None else loads(value)
+
+    def set(self, key, value, expires=None):
+        """Store an entry until it expires."""
+        seconds = self.ttl
+        if expires is not None:
+            remaining = max(1, int(expires - time()))
+            seconds = remaining if seconds is None else min(
+                seconds, remaining)
+        self.client.set(self.prefix + key, dumps(value), ex=seconds)
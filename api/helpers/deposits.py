@@ -0,0 +1,378 @@
+"""
+Deposit ingestion.
+
+Submitted deposits are stored in the pending_deposit table and answered at
+once. A worker thread in each process, or "manage.py drain_deposits",
+applies them in chunks, oldest first. A chunk is written in one
+transaction, with one statement per table: its deposits are inserted, the
+balances of their payments and wallets raised by set-based UPDATEs, and
+its pending rows deleted, so no accepted deposit is lost when a process
+stops. Each deposit carries a key chosen by the client, and deposits whose
+key is already pending or recorded are skipped, so submitting them again
+is safe.
+"""
+
+from itertools import islice
+from threading import Event, Lock, Thread
+from time import time
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+
+from api.helpers.validation import validate_json
+from api.models import Deposit, Payment, PendingDeposit, Wallet, db
+from api.models.base import (
+    commit, evict_fragments, fragment_keys_of, rollback)
+
+REQUIRED = ['amount', 'idempotency_key', 'payment_id']
+PERIODS = ['period_start', 'period_end']
+
+
+class DepositWorker(object):
+    """
+    A thread applying pending deposits for as long as the process runs.
+
+    The worker drains the pending table every interval seconds, or as soon
+    as it is woken. It starts on first use, so each server process runs its
+    own, and deposits left pending by a process which stopped are applied
+    by the next worker to drain the table.
+    """
+
+    def __init__(self, app, batch_size=500, interval=1.0):
+        """Create a worker for an application."""
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self.event = Event()
+        self.lock = Lock()
+        self.thread = None
+
+    def wake(self):
+        """Have the worker drain the table, starting it if not running."""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(
+                    target=self.work, name='deposits', daemon=True)
+                self.thread.start()
+        self.event.set()
+
+    def work(self):
+        """Drain pending deposits for as long as the process runs."""
+        while True:
+            self.event.wait(self.interval)
+            self.event.clear()
+            try:
+                with self.app.app_context():
+                    result = drain_deposits(self.batch_size)
+                for error in result['errors']:
+                    self.app.logger.warning(
+                        'Deposit %s was not applied: %s',
+                        error['idempotency_key'], error['message'])
+            except Exception:  # pylint:disable=broad-except
+                self.app.logger.exception('Pending deposits were not applied.')
+
+
+def init_deposits(app):
+    """
+    Create the deposit worker, started by the first request.
+
+    Without DEPOSIT_WORKER, pending deposits are only applied by
+    "manage.py drain_deposits".
+    """
+    if app.config['DEPOSIT_WORKER']:
+        worker = DepositWorker(
+            app, app.config['DEPOSIT_BATCH_SIZE'],
+            app.config['DEPOSIT_BATCH_INTERVAL'])
+        app.before_first_request(worker.wake)
+    else:
+        worker = None
+    app.extensions['deposit_worker'] = worker
+
+
+def is_number(value):
+    """Check whether a JSON value is a number."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_deposit(row, keys):
+    """Get what is wrong with a submitted deposit, or None."""
+    if not isinstance(row, dict):
+        return {
+            'message': 'The deposit is not a valid object.',
+            'help': str(row)
+        }
+    missing = validate_json(REQUIRED, row)
+    if isinstance(missing, str):
+        return {
+            'message': 'Not all fields were provided.',
+            'missing': missing
+        }
+    key = row['idempotency_key']
+    if not isinstance(key, str) or len(key) > 64:
+        return {
+            'message': 'The idempotency key is not valid.',
+            'help': 'Use a string of at most 64 characters.'
+        }
+    if key in keys:
+        return {
+            'message': 'The idempotency key is repeated.',
+            'help': 'Each deposit should have a key of its own.'
+        }
+    if not is_number(row['amount']) or row['amount'] <= 0:
+        return {
+            'message': 'The amount is not valid.',
+            'help': 'Use a positive number.'
+        }
+    if not isinstance(row['payment_id'], int) or \
+            isinstance(row['payment_id'], bool):
+        return {
+            'message': 'The payment_id is not valid.',
+            'help': 'Use the id of an existent payment.'
+        }
+    if any(not is_number(row[key]) for key in PERIODS if key in row):
+        return {
+            'message': 'The period is not valid.',
+            'help': 'Use timestamps for period_start and period_end.'
+        }
+    return None
+
+
+def validate_deposits(rows):
+    """
+    Split submitted deposits into valid deposits and numbered errors.
+
+    Payments are checked to exist with one query. Valid deposits keep only
+    the keys which are recorded.
+    """
+    valid, errors, keys = [], [], set()
+    for number, row in enumerate(rows, 1):
+        error = check_deposit(row, keys)
+        if error is None:
+            keys.add(row['idempotency_key'])
+            valid.append((number, row))
+        else:
+            error['row'] = number
+            errors.append(error)
+    if valid:
+        payments = {ident for (ident,) in db.session.query(Payment.id).filter(
+            Payment.id.in_({row['payment_id'] for _, row in valid}))}
+        remaining = []
+        for number, row in valid:
+            if row['payment_id'] in payments:
+                remaining.append((number, row))
+            else:
+                errors.append({
+                    'row': number,
+                    'message': 'The payment does not exist.',
+                    'help': 'Use the id of an existent payment.'
+                })
+        valid = remaining
+    errors.sort(key=lambda error: error['row'])
+    return [
+        {key: row[key] for key in REQUIRED + PERIODS if key in row}
+        for _, row in valid], errors
+
+
+def queue_batch(deposits):
+    """Store deposits in one transaction, skipping taken keys."""
+    keys = [deposit['idempotency_key'] for deposit in deposits]
+    taken = {key for (key,) in db.session.query(
+        Deposit.idempotency_key).filter(Deposit.idempotency_key.in_(keys))}
+    failed = set()
+    for key, error in db.session.query(
+            PendingDeposit.idempotency_key, PendingDeposit.error).filter(
+                PendingDeposit.idempotency_key.in_(keys)):
+        (failed if error else taken).add(key)
+    if failed:
+        PendingDeposit.query.filter(
+            PendingDeposit.idempotency_key.in_(failed)).delete(
+                synchronize_session=False)
+    now = time()
+    rows = []
+    for deposit in deposits:
+        if deposit['idempotency_key'] not in taken:
+            row = {'period_start': None, 'period_end': None, 'timestamp': now}
+            row.update(deposit)
+            rows.append(row)
+    if rows:
+        db.session.execute(PendingDeposit.__table__.insert(), rows)
+    commit()
+    return {'queued': len(rows), 'skipped': [
+        key for key in keys if key in taken]}
+
+
+def queue_deposits(deposits, chunk_size=500):
+    """
+    Store deposits to be applied, in chunks of one transaction each.
+
+    Deposits whose key is pending or recorded are skipped, and those which
+    failed to apply are replaced. A chunk which fails because another
+    request stored one of its keys meanwhile is tried once more. Returns
+    the number of deposits queued and the keys skipped.
+    """
+    deposits = iter(deposits)
+    result = {'queued': 0, 'skipped': []}
+    while True:
+        chunk = list(islice(deposits, chunk_size))
+        if not chunk:
+            return result
+        try:
+            chunk_result = queue_batch(chunk)
+        except IntegrityError:
+            rollback()
+            chunk_result = queue_batch(chunk)
+        result['queued'] += chunk_result['queued']
+        result['skipped'].extend(chunk_result['skipped'])
+
+
+def raise_balances(model, amounts):
+    """Add amounts to the balances of rows by id, bumping their versions."""
+    if not amounts:
+        return
+    table = model.__table__
+    db.session.execute(table.update().where(
+        table.c.id.in_(amounts)).values(
+            balance=func.coalesce(table.c.balance, 0.0) + case(
+                amounts, value=table.c.id),
+            version=table.c.version + 1))
+
+
+def apply_batch(deposits):
+    """
+    Apply deposits in one transaction, skipping recorded keys.
+
+    Their pending rows are deleted, or marked failed if their payment no
+    longer exists.
+    """
+    keys = [deposit['idempotency_key'] for deposit in deposits]
+    recorded = {key for (key,) in db.session.query(
+        Deposit.idempotency_key).filter(Deposit.idempotency_key.in_(keys))}
+    wallets = dict(db.session.query(Payment.id, Payment.wallet_id).filter(
+        Payment.id.in_({deposit['payment_id'] for deposit in deposits})))
+    now = time()
+    rows, skipped, errors = [], [], []
+    payments, owners = {}, {}
+    for deposit in deposits:
+        key, payment_id = deposit['idempotency_key'], deposit['payment_id']
+        if key in recorded:
+            skipped.append(key)
+            continue
+        if payment_id not in wallets:
+            errors.append({
+                'idempotency_key': key,
+                'message': 'The payment does not exist.'
+            })
+            continue
+        recorded.add(key)
+        row = {'period_start': now, 'period_end': now, 'timestamp': now}
+        row.update(deposit)
+        rows.append(row)
+        payments[payment_id] = payments.get(payment_id, 0.0) + row['amount']
+        wallet_id = wallets[payment_id]
+        if wallet_id is not None:
+            owners[wallet_id] = owners.get(wallet_id, 0.0) + row['amount']
+    pending = PendingDeposit.__table__
+    if rows:
+        db.session.execute(Deposit.__table__.insert(), rows)
+        raise_balances(Payment, payments)
+        raise_balances(Wallet, owners)
+    handled = [row['idempotency_key'] for row in rows] + skipped
+    if handled:
+        db.session.execute(pending.delete().where(
+            pending.c.idempotency_key.in_(handled)))
+    if errors:
+        db.session.execute(pending.update().where(
+            pending.c.idempotency_key.in_(
+                [error['idempotency_key'] for error in errors])).values(
+                    error='The payment does not exist.'))
+    commit()
+    if rows:
+        evict_fragments(fragment_keys_of(
+            {Payment: set(payments), Wallet: set(owners)}))
+    return {'applied': len(rows), 'skipped': skipped, 'errors': errors}
+
+
+def apply_chunk(deposits):
+    """
+    Apply a chunk of deposits, retrying it once if a key was taken.
+
+    A key recorded by another process meanwhile fails the chunk, which is
+    then tried again, skipping that key.
+    """
+    try:
+        return apply_batch(deposits)
+    except IntegrityError:
+        rollback()
+    return apply_batch(deposits)
+
+
+def drain_deposits(chunk_size=500):
+    """
+    Apply pending deposits, oldest first, in chunks of one transaction.
+
+    Rows another worker has locked are left to it. Returns the number of
+    deposits applied, the keys skipped as already applied, and errors for
+    deposits whose payment no longer exists, which are kept as failed.
+    """
+    columns = [PendingDeposit.idempotency_key, PendingDeposit.amount,
+               PendingDeposit.payment_id, PendingDeposit.period_start,
+               PendingDeposit.period_end]
+    result = {'applied': 0, 'skipped': [], 'errors': []}
+    while True:
+        chunk = db.session.query(*columns).filter(
+            PendingDeposit.error.is_(None)).order_by(
+                PendingDeposit.id).limit(chunk_size).with_for_update(
+                    skip_locked=True).all()
+        if not chunk:
+            rollback()
+            return result
+        chunk_result = apply_chunk([
+            {key: value for key, value in row._asdict().items()
+             if value is not None} for row in chunk])
+        result['applied'] += chunk_result['applied']
+        result['skipped'].extend(chunk_result['skipped'])
+        result['errors'].extend(chunk_result['errors'])
+
+
+def find_deposit(idempotency_key):
+    """
+    Get the state of the deposit submitted with a key, and the deposit.
+
+    The state is 'applied', 'pending', or 'failed' for a pending deposit
+    which could not be applied.
+    """
+    deposit = Deposit.get(idempotency_key=idempotency_key)
+    if not isinstance(deposit, dict):
+        return 'applied', deposit
+    deposit = PendingDeposit.get(idempotency_key=idempotency_key)
+    if not isinstance(deposit, dict):
+        return 'failed' if deposit.error else 'pending', deposit
+    return {
+        'status': 'fail',
+        'message': 'No deposit was submitted with the key.',
+        'help': 'Submit the deposit again with the same key.'
+    }
+
+
+def clear_deposits(payment_id):
+    """
+    Delete a payment's deposits, taking them off the balances they raised.
+
+    The payment row is locked first, so deposits being applied to it
+    meanwhile are either cleared too or kept with their amounts.
+    """
+    wallet_id = db.session.query(Payment.wallet_id).filter(
+        Payment.id == payment_id).with_for_update().scalar()
+    total = db.session.query(func.sum(Deposit.amount)).filter(
+        Deposit.payment_id == payment_id).scalar() or 0.0
+    deleted = Deposit.query.filter(Deposit.payment_id == payment_id).delete(
+        synchronize_session=False)
+    table = Payment.__table__
+    db.session.execute(table.update().where(table.c.id == payment_id).values(
+        balance=0.0, version=table.c.version + 1))
+    if wallet_id is not None:
+        raise_balances(Wallet, {wallet_id: -total})
+    commit()
+    evict_fragments(fragment_keys_of(
+        {Payment: {payment_id}, Wallet: {wallet_id} - {None}}))
+    return deleted
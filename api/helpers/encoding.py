@@ -0,0 +1,64 @@
+"""JSON encoding of responses."""
+
+from json import dumps
+
+from flask import make_response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def encode_json(data):
+    """Encode data with the standard library."""
+    return dumps(data).encode('utf-8')
+
+
+def encode_orjson(data):
+    """Encode data with orjson, accepting keys stdlib json would."""
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+
+def encode_ujson(data):
+    """Encode data with ujson."""
+    return ujson.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+# Installed encoders by name, and the order 'auto' picks them in.
+encoders = {'json': encode_json}
+if ujson is not None:
+    encoders['ujson'] = encode_ujson
+if orjson is not None:
+    encoders['orjson'] = encode_orjson
+PREFERENCE = ('orjson', 'ujson', 'json')
+
+# The encoder chosen for the running application.
+active = {'encode': encode_json}
+
+
+def encode(data):
+    """Encode data to JSON bytes with the active encoder."""
+    return active['encode'](data)
+
+
+def init_encoding(app, api):
+    """Choose the configured encoder and render responses with it."""
+    name = app.config['JSON_ENCODER']
+    if name == 'auto':
+        name = [i for i in PREFERENCE if i in encoders][0]
+    active['encode'] = encoders[name]
+    api.representations['application/json'] = output_json
+
+
+def output_json(data, code, headers=None):
+    """Render a resource's return value as a JSON response."""
+    response = make_response(encode(data), code)
+    response.headers.extend(headers or {})
+    response.mimetype = 'application/json'
+    return response
@@ -4,14 +4,14 @@ from hashlib import sha512
 
 
 def is_substring(sub, main):
-    """Check if a string is a substring of another."""
-    sub, main = sub.lower(), main.lower()
-    subs = []
-    for i in range(0, len(main) - len(sub)):
-        subs.append(main[i: i + len(sub)])
-    if sub in subs:
-        return True
-    return False
+    """Check if a string is a substring of another, ignoring case."""
+    return sub.lower() in main.lower()
+
+
+def escape_like(string):
+    """Escape LIKE wildcards so a string is matched literally."""
+    return string.replace('\\', '\\\\').replace(
+        '%', '\\%').replace('_', '\\_')
 
 
 def digest(string):
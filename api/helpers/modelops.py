@@ -1,13 +1,17 @@
 """Repetated model operations from a view function's persepective."""
-from api.helpers.auth import view_token
+from flask import g
+from werkzeug.http import quote_etag
+
 from api.helpers.validation import validate_json
-from api.models import Board, Estate, Role, Unit, User
+from api.models import (
+    ALL, Board, Conversation, Estate, Fields, Message, Role, Unit, User)
 
 
-def get_boards(board_id=None):
+def get_boards(board_id=None, after_id=None, limit=None, profile=None,
+               fields=ALL):
     """Get board(s)."""
     if board_id:
-        board = Board.get(id=board_id)
+        board = Board.get(profile=profile, fields=fields, id=board_id)
         if isinstance(board, dict):
             return {
                 'status': 'fail',
@@ -17,7 +21,7 @@ def get_boards(board_id=None):
         else:
             return board
     else:
-        boards = Board.get_all()
+        boards = Board.get_page(after_id, limit, profile, fields)
         if isinstance(boards, dict):
             return {
                 'status': 'fail',
@@ -28,37 +32,37 @@ def get_boards(board_id=None):
             return boards
 
 
-def get_conversations(request, conversation_id=None):
+def get_conversations(conversation_id=None, profile=None, fields=ALL):
     """Get conversation(s) of a user."""
-    user = User.get(id=view_token(
-        request.headers.get('Authorization'))['id'])
-    conversations = user.conversations
-    if conversations:
-        if conversation_id:
-            try:
-                conversation = [conversation for conversation in conversations
-                                if conversation.id == conversation_id][0]
-                return conversation
-            except IndexError:
-                return {
-                    'status': 'fail',
-                    'message': 'The conversation does not exist.',
-                    'help': 'Ensure conversation_id is existent.'
-                }
-        else:
-            return conversations
+    conversations = Conversation.of_participant(
+        g.identity['id'], profile, fields)
+    if conversation_id:
+        conversation = conversations.filter(
+            Conversation.id == conversation_id).first()
+        if conversation:
+            return conversation
     else:
+        conversations = conversations.order_by(Conversation.id).all()
+        if conversations:
+            return conversations
+    if Conversation.of_participant(g.identity['id']).first() is None:
         return {
             'status': 'fail',
             'message': 'The user has no conversations.',
             'help': 'Open at least one conversation.'
         }
+    return {
+        'status': 'fail',
+        'message': 'The conversation does not exist.',
+        'help': 'Ensure conversation_id is existent.'
+    }
 
 
-def get_estates(estate_id=None):
+def get_estates(estate_id=None, after_id=None, limit=None, profile=None,
+                fields=ALL):
     """Get estate(s)."""
     if estate_id:
-        estate = Estate.get(id=estate_id)
+        estate = Estate.get(profile=profile, fields=fields, id=estate_id)
         if isinstance(estate, dict):
             return {
                 'status': 'fail',
@@ -68,7 +72,7 @@ def get_estates(estate_id=None):
         else:
             return estate
     else:
-        estates = Estate.get_all()
+        estates = Estate.get_page(after_id, limit, profile, fields)
         if isinstance(estates, dict):
             return {
                 'status': 'fail',
@@ -79,39 +83,50 @@ def get_estates(estate_id=None):
             return estates
 
 
-def get_messages(request, conversation_id, message_id=None):
-    """Get message(s)."""
-    conversation = get_conversations(request, conversation_id)
+def get_messages(conversation_id, message_id=None, before=None, limit=None):
+    """Get a message, or a page of a conversation's message history."""
+    if message_id:
+        message = Message.of_participant(g.identity['id']).filter(
+            Message.conversation_id == conversation_id,
+            Message.id == message_id).first()
+        if message:
+            return message
+    else:
+        result = Message.history(
+            g.identity['id'], conversation_id, before, limit)
+        if isinstance(result, dict):
+            return {
+                'status': 'fail',
+                'message': result['message'],
+                'help': result['help']
+            }
+        messages, next_cursor = result
+        if messages:
+            return messages, next_cursor
+    conversation = get_conversations(conversation_id)
     if isinstance(conversation, dict):
         return conversation
+    elif message_id:
+        return {
+            'status': 'fail',
+            'message': 'The message does not exist.',
+            'help': 'Ensure message_id is existent.'
+        }
+    elif before:
+        return [], None
     else:
-        if message_id:
-            try:
-                message = [
-                    message for message in conversation.messages
-                    if message.id == message_id][0]
-                return message
-            except IndexError:
-                return {
-                    'status': 'fail',
-                    'message': 'The message does not exist.',
-                    'help': 'Ensure message_id is existent.'
-                }
-        else:
-            if conversation.messages:
-                return conversation.messages
-            else:
-                return {
-                    'status': 'fail',
-                    'message': 'The conversation has no messages.',
-                    'help': 'Send at least one message.'
-                }
+        return {
+            'status': 'fail',
+            'message': 'The conversation has no messages.',
+            'help': 'Send at least one message.'
+        }
 
 
-def get_roles(role_id=None):
+def get_roles(role_id=None, after_id=None, limit=None, profile=None,
+              fields=ALL):
     """Get role(s)."""
     if role_id:
-        role = Role.get(id=role_id)
+        role = Role.get(profile=profile, fields=fields, id=role_id)
         if isinstance(role, dict):
             return {
                 'status': 'fail',
@@ -121,7 +136,7 @@ def get_roles(role_id=None):
         else:
             return role
     else:
-        roles = Role.get_all()
+        roles = Role.get_page(after_id, limit, profile, fields)
         if isinstance(roles, dict):
             return {
                 'status': 'fail',
@@ -132,10 +147,11 @@ def get_roles(role_id=None):
             return roles
 
 
-def get_units(unit_id=None):
+def get_units(unit_id=None, after_id=None, limit=None, profile=None,
+              fields=ALL):
     """Get unit(s)."""
     if unit_id:
-        unit = Unit.get(id=unit_id)
+        unit = Unit.get(profile=profile, fields=fields, id=unit_id)
         if isinstance(unit, dict):
             return {
                 'status': 'fail',
@@ -145,7 +161,7 @@ def get_units(unit_id=None):
         else:
             return unit
     else:
-        units = Unit.get_all()
+        units = Unit.get_page(after_id, limit, profile, fields)
         if isinstance(units, dict):
             return {
                 'status': 'fail',
@@ -156,57 +172,90 @@ def get_units(unit_id=None):
             return units
 
 
-def get_user(request, user_id=None):
-    """Get user(s)."""
-    if user_id:
-        user = User.get(id=user_id)
-        if isinstance(user, dict):
-            return {
-                'status': 'fail',
-                'message': 'The user does not exist.',
-                'help': 'Ensure arguments are of existent object.'
-            }
-        else:
-            return user
+def get_user(user_id=None, profile=None, fields=ALL):
+    """Get a user, or the user making the request if no id is given."""
+    user_id = user_id or g.identity['id']
+    if profile:
+        user = User.get(profile=profile, fields=fields, id=user_id)
     else:
-        user = User.get(id=view_token(
-            request.headers.get('Authorization'))['id'])
-        if isinstance(user, dict):
-            return {
-                'status': 'fail',
-                'message': 'The user does not exist.',
-                'help': 'Ensure arguments are of existent object.'
-            }
-        else:
-            return user
+        user = User.lookup(user_id)
+    if isinstance(user, dict):
+        return {
+            'status': 'fail',
+            'message': 'The user does not exist.',
+            'help': 'Ensure arguments are of existent object.'
+        }
+    else:
+        return user
 
 
-def get_users():
-    """Get users."""
-    users = User.get_all()
+def get_users(after_id=None, limit=None, fields=ALL):
+    """Get a page of users."""
+    users = User.get_page(after_id, limit)
     if isinstance(users, dict):
         return {
             'status': 'fail',
             'message': 'There are no users in the database.',
             'help': 'Ensure there are some users in the database'}
     else:
+        users, next_id = users
         return {
             'status': 'success',
             'data': {
-                'users': [user.__repr__() for user in users]
-            }
+                'users': [user.serialize('summary', fields) for user in users]
+            },
+            'next': next_id
         }
 
 
-def search_users(name):
+def page_args(request):
+    """Get the keyset pagination arguments of a request."""
+    return {
+        'after_id': request.args.get('after_id', type=int),
+        'limit': request.args.get('limit', type=int)
+    }
+
+
+def conditional(request, model, ident, profile=None, fields=ALL):
+    """
+    Get the ETag header of an object's view, whether the client has it, and
+    the ETag itself.
+
+    The ETag is computed from row versions alone, so a matching
+    If-None-Match can be answered before the object is loaded.
+    """
+    etag = model.etag(ident, profile, fields)
+    if etag is None:
+        return {}, False, None
+    return {'ETag': quote_etag(etag, weak=True)}, \
+        request.if_none_match.contains_weak(etag), etag
+
+
+def streamed(request):
+    """Check whether a request asks for its collection to be streamed."""
+    return request.args.get('stream', '').lower() in ('1', 'true')
+
+
+def view_fields(request):
+    """Get the fields a request asks views to render."""
+    def keys(name):
+        """Split a comma separated argument into keys."""
+        value = request.args.get(name, '')
+        return [key.strip() for key in value.split(',') if key.strip()]
+    return Fields(keys('fields'), keys('expand'))
+
+
+def search_users(name, limit=None, offset=None, fields=ALL):
     """Search for user."""
-    users = User.search(name=name)
+    users = User.search_page(limit=limit, offset=offset, name=name)
     if isinstance(users, dict) is False:
+        users, next_offset = users
         return {
             'status': 'success',
             'data': {
-                'users': [user.__repr__() for user in users]
-            }
+                'users': [user.serialize('summary', fields) for user in users]
+            },
+            'next': next_offset
         }
     else:
         return {
@@ -0,0 +1,136 @@
+"""
+Password hashing.
+
+Passwords are stored as "<hasher>$<cost>$<salt>$<hash>". Hashing is CPU
+bound, so it runs in a bounded process pool, keeping request threads and
+the GIL free while a password is hashed or checked. Hashes made by the old
+unsalted SHA-512 digest are still accepted, and are replaced on the next
+successful sign in.
+"""
+
+from base64 import b64encode
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import pbkdf2_hmac
+from hmac import compare_digest
+from os import urandom
+
+from api.helpers.general import digest
+
+try:
+    from hashlib import scrypt
+except ImportError:
+    scrypt = None
+
+SEPARATOR = '$'
+
+
+def hash_pbkdf2_sha256(password, salt, cost):
+    """Hash a password with PBKDF2-HMAC-SHA256, cost being the rounds."""
+    return pbkdf2_hmac('sha256', password, salt, cost)
+
+
+def hash_scrypt(password, salt, cost):
+    """Hash a password with scrypt, cost being the CPU/memory cost n."""
+    return scrypt(password, salt=salt, n=cost, r=8, p=1, maxmem=2 ** 26)
+
+
+# Installed hashers by name, and the cost each uses unless configured.
+hashers = {'pbkdf2_sha256': hash_pbkdf2_sha256}
+costs = {'pbkdf2_sha256': 260000}
+if scrypt is not None:
+    hashers['scrypt'] = hash_scrypt
+    costs['scrypt'] = 2 ** 14
+
+# The hasher, cost and number of hashing processes of the application.
+active = {'hasher': 'pbkdf2_sha256', 'cost': 260000, 'workers': 0}
+
+# Worker pools keyed by their number of workers.
+pools = {}
+
+
+def get_pool(workers):
+    """Get a process pool, creating it on first use."""
+    try:
+        return pools[workers]
+    except KeyError:
+        return pools.setdefault(workers, ProcessPoolExecutor(workers))
+
+
+def init_passwords(app):
+    """Choose the configured hasher, its cost and the pool size."""
+    hasher = app.config['PASSWORD_HASHER']
+    active['hasher'] = hasher
+    active['cost'] = app.config['PASSWORD_COST'] or costs[hasher]
+    active['workers'] = app.config['HASH_WORKERS']
+
+
+def run(function, *args):
+    """Run a function in the hashing pool, or inline without one."""
+    workers = active['workers']
+    if not workers or workers < 2:
+        return function(*args)
+    return get_pool(workers).submit(function, *args).result()
+
+
+def make_password(password, hasher, cost, salt):
+    """Hash a password into its stored form."""
+    hashed = hashers[hasher](password.encode('utf-8'), salt.encode(), cost)
+    return SEPARATOR.join(
+        [hasher, str(cost), salt, b64encode(hashed).decode('ascii')])
+
+
+def verify_password(password, stored):
+    """Check a password against its stored form in constant time."""
+    if SEPARATOR not in stored:
+        return compare_digest(digest(password), stored)
+    try:
+        hasher, cost, salt, _ = stored.split(SEPARATOR)
+    except ValueError:
+        return False
+    if hasher not in hashers:
+        return False
+    return compare_digest(
+        make_password(password, hasher, int(cost), salt), stored)
+
+
+def new_salt():
+    """Make a random salt."""
+    return b64encode(urandom(12)).decode('ascii')
+
+
+def hash_password(password):
+    """Hash a password with the configured hasher."""
+    return run(make_password, password, active['hasher'], active['cost'],
+               new_salt())
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash many passwords, spreading the work over a process pool."""
+    arguments = [
+        (password, active['hasher'], active['cost'], new_salt())
+        for password in passwords]
+    if not workers or workers < 2 or len(arguments) < 2:
+        return [make_password(*args) for args in arguments]
+    chunksize = max(1, len(arguments) // (workers * 4))
+    return list(get_pool(workers).map(
+        make_password, *zip(*arguments), chunksize=chunksize))
+
+
+def outdated(stored):
+    """Check whether a stored password uses another hasher or cost."""
+    return not stored.startswith('{}{}{}{}'.format(
+        active['hasher'], SEPARATOR, active['cost'], SEPARATOR))
+
+
+def check_password(password, stored):
+    """
+    Check a password, rehashing it if its stored form is outdated.
+
+    Returns whether the password matches, and the new stored form when it
+    matches and should be replaced, or None.
+    """
+    if not run(verify_password, password, stored):
+        return False, None
+    if outdated(stored):
+        return True, hash_password(password)
+    return True, None
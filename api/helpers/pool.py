@@ -0,0 +1,41 @@
+"""Database connection pool metrics."""
+
+from sqlalchemy import event
+
+from api.models import db
+
+# Pool events counted since the process started.
+EVENTS = ('connect', 'checkout', 'checkin', 'invalidate')
+
+
+def init_pool_metrics(app):
+    """Count the pool events of an application's engine."""
+    counts = app.extensions['pool_metrics'] = dict.fromkeys(EVENTS, 0)
+    pool = db.get_engine(app).pool
+
+    def counter(name):
+        """Make a listener counting an event."""
+        def count(*args):
+            """Count one event."""
+            counts[name] += 1
+        return count
+
+    for name in EVENTS:
+        event.listen(pool, name, counter(name))
+
+
+def pool_metrics(app):
+    """
+    Report the sizing and use of an application's connection pool.
+
+    The counts are kept by each process, so under gunicorn they describe
+    the worker which served the request.
+    """
+    pool = db.get_engine(app).pool
+    metrics = {'pool': type(pool).__name__, 'status': pool.status()}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        value = getattr(pool, name, None)
+        if callable(value):
+            metrics[name] = value()
+    metrics.update(app.extensions['pool_metrics'])
+    return metrics
@@ -0,0 +1,108 @@
+"""Rate limiting of requests."""
+
+from threading import Lock
+from time import time
+
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from api.helpers.cache import LRUCache, redis
+
+
+class LocalBuckets(object):
+    """
+    Token buckets kept by each process.
+
+    A key's bucket holds up to limit tokens and refills at limit tokens per
+    period. Beyond maxsize keys, the least recently used bucket is dropped,
+    which only forgets keys that have been quiet.
+    """
+
+    def __init__(self, maxsize=65536):
+        """Create an empty store."""
+        self.buckets = LRUCache(maxsize)
+        self.lock = Lock()
+
+    def hit(self, key, limit, period, now=None):
+        """Take a token, returning 0, or the seconds until one is free."""
+        now = time() if now is None else now
+        rate = limit / period
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self.buckets.set(key, (tokens, now))
+                return (1 - tokens) / rate
+            self.buckets.set(key, (tokens - 1, now))
+            return 0
+
+
+class RedisWindows(object):
+    """
+    Sliding window counters shared between processes, kept in Redis.
+
+    It has the interface of LocalBuckets. Hits are counted in windows of a
+    period, and the previous window's count is weighted by how much of it
+    the sliding window still covers.
+    """
+
+    def __init__(self, client, prefix='ratelimit:'):
+        """Use a Redis client for the counters."""
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Connect to the Redis server at a URL."""
+        if redis is None:
+            raise RuntimeError('A shared rate limit needs redis installed.')
+        return cls(redis.StrictRedis.from_url(url), **kwargs)
+
+    def hit(self, key, limit, period, now=None):
+        """Count a hit, returning 0, or the seconds until one is allowed."""
+        now = time() if now is None else now
+        window, elapsed = divmod(now, period)
+        current = '{}{}:{}'.format(self.prefix, key, int(window))
+        previous = '{}{}:{}'.format(self.prefix, key, int(window) - 1)
+        pipeline = self.client.pipeline()
+        pipeline.incr(current)
+        pipeline.expire(current, int(period * 2) + 1)
+        pipeline.get(previous)
+        count, _, before = pipeline.execute()
+        weight = 1 - elapsed / period
+        if count - 1 + int(before or 0) * weight < limit:
+            return 0
+        return period - elapsed
+
+
+# The store and the limits, as (hits, seconds), of the application.
+active = {'store': LocalBuckets(), 'limits': {}}
+
+
+def init_rate_limits(app):
+    """
+    Create the configured store and read the limits.
+
+    Behind PROXY_COUNT proxies, the client address is taken from the
+    X-Forwarded-For entry the outermost of them added, so addresses are
+    not shared by every client of a proxy nor made up by clients.
+    """
+    if app.config['PROXY_COUNT'] and not isinstance(app.wsgi_app, ProxyFix):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'])
+    if app.config['RATE_LIMIT_URL']:
+        active['store'] = RedisWindows.from_url(app.config['RATE_LIMIT_URL'])
+    else:
+        active['store'] = LocalBuckets(app.config['RATE_LIMIT_SIZE'])
+    active['limits'] = dict(app.config['RATE_LIMITS'])
+
+
+def throttle(name, value):
+    """
+    Count a hit against a named limit for a value, such as an address.
+
+    Returns 0 if the hit is allowed, or the seconds to wait otherwise.
+    Limits which are not configured allow every hit.
+    """
+    limit = active['limits'].get(name)
+    if limit is None:
+        return 0
+    return active['store'].hit('{}:{}'.format(name, value), *limit)
@@ -0,0 +1,34 @@
+"""Streamed responses for large collections."""
+
+from json import dumps
+
+from flask import Response, stream_with_context
+
+from api.helpers.encoding import encode
+
+
+def stream_collection(key, objects, render):
+    """
+    Stream a success envelope holding a collection as it is rendered.
+
+    Each object is encoded and sent on its own, so the response starts
+    straight away and only one object is held at a time. Returns None
+    when there are no objects, so callers can answer as they would for
+    an empty page.
+    """
+    objects = iter(objects)
+    first = next(objects, None)
+    if first is None:
+        return None
+
+    def generate():
+        """Yield the envelope around the encoded objects."""
+        yield '{{"status": "success", "data": {{{}: ['.format(
+            dumps(key)).encode('utf-8')
+        yield encode(render(first))
+        for item in objects:
+            yield b', ' + encode(render(item))
+        yield b']}}'
+
+    return Response(
+        stream_with_context(generate()), mimetype='application/json')
@@ -1,11 +1,14 @@
 """Import all models here to ease imports from elsewhere in the application."""
-from .base import db
+from .base import (
+    ALL, BaseModel, Fields, compile_serializers, db, init_fragment_cache,
+    init_row_caches)
 from .board import Board
 from .conversation import Conversation
 from .deposit import Deposit
 from .estate import Estate
 from .message import Message
 from .payment import Payment
+from .pending_deposit import PendingDeposit
 from .role import Role
 from .unit import Unit
 from .user import User
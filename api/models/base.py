@@ -1,34 +1,149 @@
 """Base model."""
 
+from contextlib import contextmanager
+from hashlib import sha1
+from operator import attrgetter
+
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, literal
+from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.orm import Load, aliased, make_transient_to_detached
 from sqlalchemy.orm.collections import InstrumentedList
+from sqlalchemy.orm.exc import StaleDataError
 
-from api.helpers.general import is_substring
+from api.helpers.cache import LRUCache, RedisCache
+from api.helpers.general import escape_like
 
 # pylint:disable=no-member, invalid-name, broad-except, no-else-return
 
 db = SQLAlchemy()
 
+# Compiled column extractors keyed by model class and view shape.
+serializers = {}
+
+# Paths from cached views to the objects they render, keyed by the class of
+# the rendered objects.
+dependents = {}
+
+
+class Fields(object):
+    """
+    The keys of a view to render, as asked for by ?fields= and ?expand=.
+
+    fields lists the columns and relationships to render, and expand adds
+    relationships to all of the columns. With neither, everything is
+    rendered. Relationships which are not rendered are not loaded either.
+    """
+
+    def __init__(self, fields=None, expand=None):
+        """Store the requested keys."""
+        self.fields = set(fields) if fields else None
+        self.expand = set(expand) if expand else set()
+
+    def column(self, key):
+        """Check whether a column is rendered."""
+        return self.fields is None or key in self.fields
+
+    def relation(self, key):
+        """Check whether a relationship is rendered."""
+        if self.fields is None:
+            return not self.expand or key in self.expand
+        return key in self.fields or key in self.expand
+
+    @property
+    def complete(self):
+        """Check whether every key is rendered."""
+        return self.fields is None and not self.expand
+
+
+# Render every key of a view.
+ALL = Fields()
+
+
+class Batch:
+    """The outcome of a batch, known once its outermost block ends."""
+
+    def __init__(self):
+        """Start out as not failed."""
+        self.failed = False
+
+
+def commit():
+    """Commit the session, or only flush it while a batch is open."""
+    if db.session.info.get('batch'):
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def rollback():
+    """Roll the session back, failing the open batch if there is one."""
+    if db.session.info.get('batch'):
+        db.session.info['batch'].failed = True
+    db.session.rollback()
+
 
 class BaseModel(db.Model):
     """Base model with all main requirements of a model."""
 
     __abstract__ = True
 
+    # Bumped by every update of the row, and used to detect changed views.
+    version = db.Column(db.Integer(),
+                        nullable=False,
+                        server_default='1')
+
+    @declared_attr
+    def __mapper_args__(cls):
+        """Have the ORM maintain each row's version."""
+        return {'version_id_col': cls.version}
+
+    # Relationships eager loaded by each named loading profile. Entries are
+    # dotted relationship paths; "path:profile" also loads the given profile
+    # of the objects at the end of the path.
+    loading_profiles = {}
+
+    # Columns rendered by each named view shape. The 'columns' shape, which
+    # renders every column, is always available.
+    serializer_shapes = {}
+
+    # Keys under which views render relationships, by relationship name,
+    # where the two differ.
+    view_keys = {}
+
+    # Process-wide cache of column values by id, used by lookup. Models opt
+    # in by setting an LRUCache here; writes through the model evict rows.
+    row_cache = None
+
+    # Cache of full views by model and id, shared by every model. Models opt
+    # in by naming the loading profile their view renders, and writes evict
+    # the views of every object they change through the relationship graph.
+    fragment_cache = None
+    fragment_profile = None
+
     def delete(self):
         """Delete an object from the database."""
         try:
+            stale = fragment_keys([self])
+            self.forget()
             db.session.delete(self)
-            db.session.commit()
+            commit()
+            evict_fragments(stale)
             return True
         except Exception as e:
-            db.session.rollback()
+            rollback()
             return {
                 "message": "Error encountered during deletion.",
                 "help": "Ensure the database is running properly.",
                 "exception": str(e)
             }
 
+    def forget(self):
+        """Evict the object from its model's row cache."""
+        if self.row_cache is not None:
+            self.row_cache.delete(self.id)
+
     def get_field(self, field):
         """Get the value in an object's field."""
         try:
@@ -45,7 +160,11 @@ class BaseModel(db.Model):
         current_values = self.get_field(field)
         if isinstance(current_values, dict):
             return current_values
-        elif isinstance(current_values, InstrumentedList):
+        changed = list(values)
+        if not isinstance(current_values, InstrumentedList):
+            changed.append(current_values)
+        stale = fragment_keys(changed)
+        if isinstance(current_values, InstrumentedList):
             try:
                 current_values.extend(list(values))
             except Exception as e:
@@ -54,16 +173,17 @@ class BaseModel(db.Model):
                     "help": "The objects should relate to the inserted field.",
                     "exception": str(e)
                 }
-            self.save()
-        try:
-            setattr(self, field, values[0])
-        except Exception as e:
-            return {
-                "message": "Ensure the values you're inserting are valid.",
-                "help": "The objects should relate to the inserted field.",
-                "exception": str(e)
-            }
+        else:
+            try:
+                setattr(self, field, values[0])
+            except Exception as e:
+                return {
+                    "message": "Ensure the values you're inserting are valid.",
+                    "help": "The objects should relate to the inserted field.",
+                    "exception": str(e)
+                }
         self.save()
+        evict_fragments(stale | fragment_keys(changed))
 
     def remove(self, field, **kwargs):
         """
@@ -75,7 +195,12 @@ class BaseModel(db.Model):
         current_values = self.get_field(field)
         if isinstance(current_values, dict):
             return current_values
-        elif isinstance(current_values, InstrumentedList):
+        if isinstance(current_values, InstrumentedList):
+            changed = list(current_values)
+        else:
+            changed = [current_values]
+        stale = fragment_keys(changed)
+        if isinstance(current_values, InstrumentedList):
             if kwargs:
                 key = [i for i in kwargs][0]
                 try:
@@ -95,41 +220,120 @@ class BaseModel(db.Model):
         else:
             setattr(self, field, None)
         self.save()
+        evict_fragments(stale | fragment_keys(changed))
+
+    def render(self, fields=ALL):
+        """
+        Render the object's view, keeping full views in the fragment cache.
+
+        Views are cached with the ETag of the rows they were rendered from,
+        and a cached view is only used while the loaded rows still have that
+        ETag. Cached views are shared, so they must not be modified.
+        """
+        if self.fragment_profile is None or self.fragment_cache is None or \
+                not fields.complete:
+            return self.view(fields)
+        key = self.fragment_key(self.id)
+        etag = self.loaded_etag(self.fragment_profile)
+        entry = self.fragment_cache.get(key)
+        if entry is not None and entry[0] == etag:
+            return entry[1]
+        view = self.view()
+        self.fragment_cache.set(key, [etag, view])
+        return view
 
     def save(self):
         """Save an object in the database."""
         try:
+            stale = fragment_keys([self])
             db.session.add(self)
-            db.session.commit()
+            commit()
+            self.forget()
+            evict_fragments(stale | fragment_keys([self]))
             return self.id
+        except StaleDataError as e:
+            rollback()
+            return {
+                "message": "The object was changed by another request.",
+                "help": "Fetch the object again and repeat the update.",
+                "exception": str(e)
+            }
         except Exception as e:
-            db.session.rollback()
+            rollback()
             return {
                 "message": "Ensure the object you're saving is valid",
                 "help": "Has all fields and doesn't repeat unique values.",
                 "exception": str(e)
             }
 
-    def serialize(self):
+    def serialize(self, shape='columns', fields=ALL):
         """Convert sqlalchemy object to dictionary."""
-        return {
-            column.name: getattr(self, column.name)
-            for column in self.__table__.columns
-        }
+        values = self.serializer(shape)(self)
+        if fields.fields is None:
+            return values
+        return {key: values[key] for key in values if key in fields.fields}
 
     def update(self, new_data):
         """Update an object with new information."""
         all_keys = [key for key in self.__dict__]
         keys = [key for key in new_data]
         for key in keys:
-            if key in all_keys:
+            if key in all_keys and key != 'version':
                 setattr(self, key, new_data[key])
             else:
                 return {
                     "message": "Error encountered when setting attributes.",
                     "help": "Ensure all fields you're updating are valid."
                 }
-        self.save()
+        result = self.save()
+        if isinstance(result, dict):
+            return result
+
+    @classmethod
+    @contextmanager
+    def batch(cls):
+        """
+        Group the writes made inside a block into a single transaction.
+
+        Writes in the block only flush, and the block commits once at its
+        end. If any write failed, or an exception escapes the block, all of
+        it is rolled back instead. Nested batches join the outermost one.
+        The block is given a Batch whose failed flag tells, after the
+        outermost block ends, whether its writes were rolled back.
+        """
+        info = db.session.info
+        if info.get('batch'):
+            yield info['batch']
+            return
+        batch = info['batch'] = Batch()
+        try:
+            yield batch
+        except Exception:
+            info['batch'], batch.failed = None, True
+            db.session.rollback()
+            raise
+        info['batch'] = None
+        if batch.failed:
+            db.session.rollback()
+        else:
+            commit()
+
+    @classmethod
+    def cached_view(cls, ident, etag, fields=ALL):
+        """
+        Get an object's full view if it is in the fragment cache.
+
+        The view is only returned if it was rendered from rows with the
+        given ETag, as computed by etag() for the fragment profile, so a
+        view cached before a write another process made is not served.
+        """
+        if cls.fragment_profile is None or cls.fragment_cache is None or \
+                not fields.complete or etag is None:
+            return None
+        entry = cls.fragment_cache.get(cls.fragment_key(ident))
+        if entry is None or entry[0] != etag:
+            return None
+        return entry[1]
 
     @classmethod
     def check_exists(cls, **kwargs):
@@ -148,9 +352,95 @@ class BaseModel(db.Model):
             return True
 
     @classmethod
-    def get(cls, **kwargs):
+    def etag(cls, ident, profile=None, fields=ALL):
+        """
+        Fingerprint the rows a view of an object is rendered from.
+
+        Only the ids and versions of the object and of each relationship
+        path its view loads are read, in one UNION ALL query, so a client
+        polling an unchanged object can be answered without rendering it.
+        Returns None when the object does not exist.
+        """
+        queries = [db.session.query(
+            literal(0).label('path'), cls.id, cls.version).filter(
+                cls.id == ident)]
+        paths = cls.loading_paths(profile, fields)
+        for index, path in enumerate(paths, 1):
+            query, target = cls.join_path(
+                db.session.query(cls).filter(cls.id == ident), path)
+            queries.append(query.with_entities(
+                literal(index).label('path'), target.id, target.version))
+        rows = sorted(queries[0].union_all(*queries[1:]).all())
+        if not rows or rows[0][0] != 0:
+            return None
+        return cls.fingerprint(profile, fields, rows)
+
+    @classmethod
+    def fingerprint(cls, profile, fields, rows):
+        """Hash the (path, id, version) rows a view is rendered from."""
+        key = (cls.__name__, profile, sorted(fields.fields or ()),
+               sorted(fields.expand), [tuple(row) for row in rows])
+        return sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def loaded_etag(self, profile=None, fields=ALL):
+        """
+        Get the ETag of the object's view from its loaded rows.
+
+        It walks the same relationship paths as etag(), reading versions
+        from the objects in memory instead of the database.
+        """
+        rows = [(0, self.id, self.version)]
+        paths = self.loading_paths(profile, fields)
+        for index, path in enumerate(paths, 1):
+            objects = [self]
+            for key in path:
+                found = []
+                for instance in objects:
+                    value = getattr(instance, key)
+                    if isinstance(value, list):
+                        found.extend(value)
+                    elif value is not None:
+                        found.append(value)
+                objects = found
+            rows.extend((index, i.id, i.version) for i in objects)
+        return self.fingerprint(profile, fields, sorted(rows))
+
+    @classmethod
+    def fragment_dependents(cls):
+        """
+        Get the cached views which render objects of the model.
+
+        Each entry pairs a model whose views are cached with a relationship
+        path from it, as loaded for its view, which ends at this model.
+        """
+        try:
+            return dependents[cls]
+        except KeyError:
+            pass
+        found = []
+        for model in BaseModel.__subclasses__():
+            if model.fragment_profile is None:
+                continue
+            for path in model.loading_paths(model.fragment_profile):
+                target = model
+                for index, key in enumerate(path, 1):
+                    target = target.__mapper__.relationships[
+                        key].mapper.class_
+                    entry = (model, path[:index])
+                    if target is cls and entry not in found:
+                        found.append(entry)
+        return dependents.setdefault(cls, found)
+
+    @classmethod
+    def fragment_key(cls, ident):
+        """Get the fragment cache key of an object's view."""
+        return '{}:{}'.format(cls.__tablename__, ident)
+
+    @classmethod
+    def get(cls, profile=None, fields=ALL, **kwargs):
         """Get a specific object from the database."""
-        result = cls.query.filter_by(**kwargs).first()
+        result = cls.query.options(
+            *cls.loading_options(profile, fields)).filter_by(**kwargs).first()
         if not result:
             return {
                 "message": "The object does not exist",
@@ -159,9 +449,11 @@ class BaseModel(db.Model):
         return result
 
     @classmethod
-    def get_all(cls):
-        """Get all objects of a specific table."""
-        result = cls.query.all()
+    def get_all(cls, profile=None, fields=ALL, **kwargs):
+        """Get all objects of a specific table, or those matching filters."""
+        result = cls.query.options(
+            *cls.loading_options(profile, fields)).filter_by(
+                **kwargs).order_by(cls.id).all()
         if not result:
             return {
                 "message": "The class of objects do not exist",
@@ -170,19 +462,309 @@ class BaseModel(db.Model):
         return result
 
     @classmethod
-    def search(cls, **kwargs):
-        """Search through values of string fields."""
+    def get_page(cls, after_id=None, limit=None, profile=None, fields=ALL):
+        """
+        Get a page of objects ordered by id, starting after a cursor.
+
+        Returns the objects with the cursor of the following page, which is
+        None on the last page. A cursor past the last object gives an empty
+        page.
+        """
+        limit = cls.page_size(limit)
+        query = cls.query.options(
+            *cls.loading_options(profile, fields)).order_by(cls.id)
+        if after_id:
+            query = query.filter(cls.id > after_id)
+        result = query.limit(limit + 1).all()
+        if not result and not after_id:
+            return {
+                "message": "The class of objects do not exist",
+                "help": "Ensure the class required has objects."
+            }
+        if len(result) > limit:
+            return result[:limit], result[limit - 1].id
+        return result, None
+
+    @classmethod
+    def join_path(cls, query, path):
+        """
+        Join a query of the model along a path of relationships.
+
+        Each object on the path is joined under an alias, and the query is
+        returned with the alias of the path's last model.
+        """
+        source, mapper = cls, cls.__mapper__
+        for key in path:
+            relationship = mapper.relationships[key]
+            target = aliased(relationship.mapper.class_)
+            query = query.join(target, getattr(source, key))
+            source, mapper = target, relationship.mapper
+        return query, source
+
+    @classmethod
+    def loading_options(cls, profile=None, fields=ALL):
+        """
+        Build the query options which eager load a loading profile.
+
+        Collections are loaded with one SELECT ... IN query per path and
+        single objects are joined in, so the number of queries a view
+        issues does not depend on how many rows it renders.
+        """
+        options = []
+        for path in cls.loading_paths(profile, fields):
+            option, mapper = Load(cls), cls.__mapper__
+            for key in path:
+                relationship = mapper.relationships[key]
+                attribute = getattr(mapper.class_, key)
+                if relationship.uselist:
+                    option = option.selectinload(attribute)
+                else:
+                    option = option.joinedload(attribute)
+                mapper = relationship.mapper
+            options.append(option)
+        return options
+
+    @classmethod
+    def loading_paths(cls, profile=None, fields=ALL):
+        """
+        Expand a loading profile into lists of relationship names.
+
+        Paths starting at a relationship the view will not render are left
+        out, so it is not queried at all.
+        """
+        paths = []
+        for entry in cls.loading_profiles.get(profile, ()):
+            path, _, nested = entry.partition(':')
+            keys = path.split('.')
+            if not fields.relation(cls.view_keys.get(keys[0], keys[0])):
+                continue
+            paths.append(keys)
+            if nested:
+                target = cls
+                for key in keys:
+                    target = target.__mapper__.relationships[key].mapper.class_
+                paths.extend(
+                    keys + nested_path
+                    for nested_path in target.loading_paths(nested))
+        return paths
+
+    @classmethod
+    def serializer(cls, shape='columns'):
+        """
+        Get the column extractor of a view shape, compiling it once.
+
+        The extractor reads all the shape's columns with a single attrgetter
+        call instead of reflecting over the table on every serialization.
+        """
+        try:
+            return serializers[cls, shape]
+        except KeyError:
+            pass
+        if shape == 'columns':
+            fields = tuple(column.name for column in cls.__table__.columns
+                           if column.name != 'version')
+        else:
+            fields = tuple(cls.serializer_shapes[shape])
+        getter = attrgetter(*fields)
+        if len(fields) == 1:
+            def extract(instance):
+                """Extract a single column."""
+                return {fields[0]: getter(instance)}
+        else:
+            def extract(instance):
+                """Extract several columns."""
+                return dict(zip(fields, getter(instance)))
+        serializers[cls, shape] = extract
+        return extract
+
+    @classmethod
+    def lookup(cls, ident):
+        """
+        Get an object by id, only querying when it is not already known.
+
+        The session's identity map is consulted first, then the model's row
+        cache if it has one, and the database last.
+        """
+        key = cls.__mapper__.identity_key_from_primary_key([ident])
+        result = db.session.identity_map.get(key)
+        if result is None and cls.row_cache is not None:
+            row = cls.row_cache.get(ident)
+            if row is not None:
+                result = cls(**row)
+                make_transient_to_detached(result)
+                result = db.session.merge(result, load=False)
+        if result is None:
+            result = cls.query.get(ident)
+            if result is not None and cls.row_cache is not None:
+                cls.row_cache.set(ident, result.serialize())
+        if result is None:
+            return {
+                "message": "The object does not exist",
+                "help": "Ensure arguments are of existent objects and unique."
+            }
+        return result
+
+    @classmethod
+    def page_size(cls, limit=None):
+        """Clamp a requested page size to the configured bounds."""
+        if not limit or limit < 1:
+            return current_app.config['PAGE_SIZE']
+        return min(limit, current_app.config['MAX_PAGE_SIZE'])
+
+    @classmethod
+    def search(cls, limit=None, offset=None, **kwargs):
+        """Search through values of string fields, returning one page."""
+        result = cls.search_page(limit, offset, **kwargs)
+        if isinstance(result, dict):
+            return result
+        return result[0]
+
+    @classmethod
+    def search_page(cls, limit=None, offset=None, **kwargs):
+        """
+        Search through values of string fields, a page at a time.
+
+        The substring match runs in the database so only matching rows
+        are loaded. Returns the page with the offset of the following page,
+        which is None on the last page.
+        """
         key = [key for key in kwargs][0]
-        objects = cls.get_all()
-        if isinstance(objects, dict):
-            return objects
-        results = []
-        for i in objects:
-            if is_substring(kwargs[key], getattr(i, key)):
-                results.append(i)
+        pattern = '%{}%'.format(escape_like(kwargs[key]))
+        limit, offset = cls.page_size(limit), max(offset or 0, 0)
+        results = cls.query.filter(
+            getattr(cls, key).ilike(pattern, escape='\\')
+        ).order_by(cls.id).offset(offset).limit(limit + 1).all()
         if not results:
             return {
                 "message": "No objects match the searched value.",
                 "help": "Ensure arguments are of existent objects."
             }
-        return results
+        if len(results) > limit:
+            return results[:limit], offset + limit
+        return results, None
+
+    @classmethod
+    def stream(cls, profile=None, query=None, fields=ALL):
+        """
+        Iterate over objects ordered by id, fetching them in batches.
+
+        Rows come from a server-side cursor where the driver supports one,
+        so memory stays flat however many objects there are.
+        """
+        query = cls.query if query is None else query
+        return query.options(
+            *cls.loading_options(profile, fields)).order_by(
+            cls.id).yield_per(current_app.config['STREAM_BATCH_SIZE'])
+
+
+def compile_serializers():
+    """Compile the column extractors of every model and view shape."""
+    for model in BaseModel.__subclasses__():
+        model.serializer()
+        for shape in model.serializer_shapes:
+            model.serializer(shape)
+
+
+def init_row_caches(app):
+    """Size and empty the row caches of every model which has one."""
+    for model in BaseModel.__subclasses__():
+        if model.row_cache is not None:
+            model.row_cache.maxsize = app.config['ROW_CACHE_SIZE']
+            model.row_cache.ttl = app.config['ROW_CACHE_TTL']
+            model.row_cache.clear()
+
+
+def evict_fragments(keys):
+    """
+    Remove views from the fragment cache.
+
+    Inside a batch the writes are not committed yet, so the keys are kept
+    until the outermost commit, when evict_pending removes them.
+    """
+    if BaseModel.fragment_cache is None:
+        return
+    if db.session.info.get('batch'):
+        db.session.info.setdefault('evict', set()).update(keys)
+        return
+    for key in keys:
+        BaseModel.fragment_cache.delete(key)
+
+
+@event.listens_for(db.session, 'after_commit')
+def evict_pending(session):
+    """Remove the views a committed batch changed from the cache."""
+    keys = session.info.pop('evict', ())
+    if BaseModel.fragment_cache is not None:
+        for key in keys:
+            BaseModel.fragment_cache.delete(key)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_pending(session):
+    """Drop the evictions of a batch which was rolled back."""
+    session.info.pop('evict', None)
+
+
+def fragment_keys(objects):
+    """
+    Get the keys of the cached views which render any of the objects.
+
+    The views are found with one query following each cached model's loading
+    paths to the objects, without flushing changes not yet written.
+    """
+    if BaseModel.fragment_cache is None:
+        return set()
+    idents = {}
+    for instance in objects:
+        if not isinstance(instance, BaseModel):
+            continue
+        identity = inspect(instance).identity
+        if identity is None:
+            continue
+        idents.setdefault(type(instance), set()).add(identity[0])
+    return fragment_keys_of(idents)
+
+
+def fragment_keys_of(idents):
+    """
+    Get the keys of the cached views which render rows, given by their ids.
+
+    idents maps each model to the ids of its rows, as for rows changed by
+    set-based SQL, which never loads them.
+    """
+    if BaseModel.fragment_cache is None:
+        return set()
+    keys = set(
+        model.fragment_key(ident) for model in idents
+        if model.fragment_profile is not None for ident in idents[model])
+    queries = []
+    for model in idents:
+        for owner, path in model.fragment_dependents():
+            query, target = owner.join_path(db.session.query(owner), path)
+            queries.append(query.filter(
+                target.id.in_(idents[model])).with_entities(
+                    literal(owner.__tablename__).label('owner'), owner.id))
+    if queries:
+        with db.session.no_autoflush:
+            rows = queries[0].union_all(*queries[1:]).all()
+        keys.update('{}:{}'.format(owner, ident) for owner, ident in rows)
+    return keys
+
+
+def init_fragment_cache(app):
+    """
+    Create the fragment cache an application's views are cached in.
+
+    A Redis cache is shared when FRAGMENT_CACHE_URL is set, otherwise each
+    process keeps its own, and a size of 0 turns view caching off.
+    """
+    if app.config['FRAGMENT_CACHE_URL']:
+        BaseModel.fragment_cache = RedisCache.from_url(
+            app.config['FRAGMENT_CACHE_URL'],
+            ttl=app.config['FRAGMENT_CACHE_TTL'])
+    elif app.config['FRAGMENT_CACHE_SIZE'] > 0:
+        BaseModel.fragment_cache = LRUCache(
+            app.config['FRAGMENT_CACHE_SIZE'],
+            app.config['FRAGMENT_CACHE_TTL'])
+    else:
+        BaseModel.fragment_cache = None
@@ -1,5 +1,7 @@
 """Board."""
-from .base import BaseModel, db
+from .base import (
+    ALL, BaseModel, commit, db, evict_fragments, fragment_keys, rollback)
+from .user import User, user_boards, user_conversations
 
 
 class Board(BaseModel):
@@ -21,18 +23,119 @@ class Board(BaseModel):
                                    uselist=False,
                                    cascade="all,delete")
 
+    loading_profiles = {
+        'summary': ('members',),
+        'detail': ('members', 'estates_owned', 'units_owned.estate'),
+        'conversation': ('conversation:detail',)
+    }
+
+    fragment_profile = 'detail'
+
+    serializer_shapes = {
+        'summary': ('id',)
+    }
+
     def __repr__(self):
         """Summarized view of a board."""
-        return {
-            'id': self.id,
-            'members': [i.__repr__() for i in self.members]
-        }
+        board = self.serialize('summary')
+        board['members'] = [i.__repr__() for i in self.members]
+        return board
+
+    def add_members(self, user_ids):
+        """
+        Add users to the board and its conversation.
+
+        All ids are checked with one query, and existing members are
+        skipped, so the write takes the same few statements for any
+        number of users.
+        """
+        user_ids = set(user_ids)
+        found = {i for i, in db.session.query(User.id).filter(
+            User.id.in_(user_ids))} if user_ids else set()
+        if found != user_ids:
+            rollback()
+            return {
+                "message": "Ensure the users exist.",
+                "help": "The ids should be of existent users.",
+                "missing": sorted(user_ids - found)
+            }
+        return self.write_members(user_ids, self.add_rows)
+
+    def member_ids(self, user_ids):
+        """Get which of the given users are members of the board."""
+        if not user_ids:
+            return set()
+        return {i for i, in db.session.query(user_boards.c.user_id).filter(
+            user_boards.c.board_id == self.id,
+            user_boards.c.user_id.in_(user_ids))}
+
+    def remove_members(self, user_ids):
+        """Remove members from the board and its conversation."""
+        user_ids = set(user_ids)
+        members = self.member_ids(user_ids)
+        if members != user_ids:
+            rollback()
+            return {
+                "message": "Ensure the users are members of the board.",
+                "help": "The ids should be of the board's members.",
+                "missing": sorted(user_ids - members)
+            }
+        return self.write_members(user_ids, self.delete_rows)
+
+    def write_members(self, user_ids, write):
+        """Apply a membership write to the board and its conversation."""
+        if not user_ids:
+            return True
+        conversation = self.conversation
+        try:
+            write(user_boards, user_boards.c.board_id, self.id, user_ids)
+            if conversation is not None:
+                write(user_conversations,
+                      user_conversations.c.conversation_id,
+                      conversation.id, user_ids)
+            commit()
+        except Exception as e:
+            rollback()
+            return {
+                "message": "Ensure the members are valid.",
+                "help": "The ids should be of existent users.",
+                "exception": str(e)
+            }
+        # The rows were written behind the ORM's back, so drop any
+        # collections already loaded from them.
+        db.session.expire(self, ['members'])
+        if conversation is not None:
+            db.session.expire(conversation, ['participants'])
+        for key, user in db.session.identity_map.items():
+            if key[0] is User and key[1][0] in user_ids:
+                db.session.expire(user, ['boards', 'conversations'])
+        evict_fragments(fragment_keys([self]))
+        return True
+
+    @staticmethod
+    def add_rows(table, owner_column, owner_id, user_ids):
+        """Insert association rows for the users not already present."""
+        present = {i for i, in db.session.query(table.c.user_id).filter(
+            owner_column == owner_id, table.c.user_id.in_(user_ids))}
+        rows = [{'user_id': i, owner_column.name: owner_id}
+                for i in sorted(user_ids - present)]
+        if rows:
+            db.session.execute(table.insert(), rows)
+
+    @staticmethod
+    def delete_rows(table, owner_column, owner_id, user_ids):
+        """Delete the association rows of the users."""
+        db.session.execute(table.delete().where(
+            (owner_column == owner_id) & table.c.user_id.in_(user_ids)))
 
-    def view(self):
+    def view(self, fields=ALL):
         """Detailed view of a board."""
-        board = self.serialize()
-        board.update({'members': [i.__repr__() for i in self.members]})
-        board.update({'estates_owned': [i.__repr__()
-                                        for i in self.estates_owned]})
-        board.update({'units_owned': [i.__repr__() for i in self.units_owned]})
+        board = self.serialize(fields=fields)
+        if fields.relation('members'):
+            board['members'] = [i.__repr__() for i in self.members]
+        if fields.relation('estates_owned'):
+            board['estates_owned'] = [
+                i.__repr__() for i in self.estates_owned]
+        if fields.relation('units_owned'):
+            board['units_owned'] = [i.__repr__() for i in self.units_owned]
         return board
@@ -1,9 +1,9 @@
 """Conversation."""
 
-from operator import itemgetter
 from time import time
 
-from .base import BaseModel, db
+from .base import ALL, BaseModel, db
+from .user import user_conversations
 
 
 class Conversation(BaseModel):
@@ -12,17 +12,24 @@ class Conversation(BaseModel):
     id = db.Column(db.Integer(),
                    primary_key=True)
     timestamp = db.Column(db.Float(),
-                          default=time())
+                          default=time)
     title = db.Column(db.String(),
                       nullable=True)
     messages = db.relationship('Message',
                                backref='conversation',
                                lazy=True,
                                uselist=True,
-                               cascade="all,delete")
+                               cascade="all,delete",
+                               order_by='[Message.timestamp, Message.id]')
     board_id = db.Column(db.Integer(),
                          db.ForeignKey('board.id'),
-                         nullable=True)
+                         nullable=True,
+                         index=True)
+
+    loading_profiles = {
+        'summary': ('messages',),
+        'detail': ('participants', 'messages')
+    }
 
     def __repr__(self):
         """Summarized view of a conversation."""
@@ -35,13 +42,21 @@ class Conversation(BaseModel):
             'last_message': last_message
         }
 
-    def view(self):
+    def view(self, fields=ALL):
         """Detailed view of a conversation."""
-        conversation = self.serialize()
-        conversation.update({'participants': [i.__repr__()
-                                              for i in self.participants]})
-        conversation.update(
-            {'messages': sorted(
-                [i.serialize() for i in self.messages],
-                key=itemgetter('timestamp'))})
+        conversation = self.serialize(fields=fields)
+        if fields.relation('participants'):
+            conversation['participants'] = [
+                i.__repr__() for i in self.participants]
+        if fields.relation('messages'):
+            conversation['messages'] = [i.serialize() for i in self.messages]
         return conversation
+
+    @classmethod
+    def of_participant(cls, user_id, profile=None, fields=ALL):
+        """Query the conversations a user participates in."""
+        return cls.query.options(
+            *cls.loading_options(profile, fields)).join(
+            user_conversations,
+            user_conversations.c.conversation_id == cls.id).filter(
+                user_conversations.c.user_id == user_id)
@@ -13,14 +13,19 @@ class Deposit(BaseModel):
     amount = db.Column(db.Float(),
                        default=0.0)
     period_end = db.Column(db.Float(),
-                           default=time())
+                           default=time)
     period_start = db.Column(db.Float(),
-                             default=time())
+                             default=time)
     timestamp = db.Column(db.Float(),
-                          default=time())
+                          default=time)
+    idempotency_key = db.Column(db.String(64),
+                                nullable=True,
+                                index=True,
+                                unique=True)
     payment_id = db.Column(db.Integer(),
                            db.ForeignKey('payment.id'),
-                           nullable=True)
+                           nullable=True,
+                           index=True)
 
     def view(self):
         """Detailed view of a deposit."""
@@ -1,5 +1,5 @@
 """Estate."""
-from .base import BaseModel, db
+from .base import ALL, BaseModel, db
 
 
 class Estate(BaseModel):
@@ -19,16 +19,33 @@ class Estate(BaseModel):
                               uselist=False)
     board_id = db.Column(db.Integer(),
                          db.ForeignKey('board.id'),
-                         nullable=True)
+                         nullable=True,
+                         index=True)
+
+    loading_profiles = {
+        'detail': ('board:summary', 'payment', 'estate_units:detail'),
+        'payment': ('payment:detail',)
+    }
+
+    fragment_profile = 'detail'
+
+    view_keys = {'estate_units': 'units'}
+
+    serializer_shapes = {
+        'summary': ('id', 'address')
+    }
 
     def __repr__(self):
         """Summarized view of an estate."""
-        return {'id': self.id, 'address': self.address}
+        return self.serialize('summary')
 
-    def view(self):
+    def view(self, fields=ALL):
         """Detailed view of an estate."""
-        estate = self.serialize()
-        estate.update({'board': self.board.__repr__()})
-        estate.update({'payment': self.payment.__repr__()})
-        estate.update({'units': [unit.view() for unit in self.estate_units]})
+        estate = self.serialize(fields=fields)
+        if fields.relation('board'):
+            estate['board'] = self.board.__repr__()
+        if fields.relation('payment'):
+            estate['payment'] = self.payment.__repr__()
+        if fields.relation('units'):
+            estate['units'] = [unit.view() for unit in self.estate_units]
         return estate
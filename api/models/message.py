@@ -1,12 +1,20 @@
 """Message."""
 from time import time
 
-from .base import BaseModel, db
+from sqlalchemy import and_, or_
+
+from .base import ALL, BaseModel, db
+from .user import user_conversations
 
 
 class Message(BaseModel):
     """Message model."""
 
+    __table_args__ = (
+        db.Index('ix_message_conversation_id_timestamp',
+                 'conversation_id', 'timestamp', 'id'),
+    )
+
     id = db.Column(db.Integer(),
                    primary_key=True)
     content = db.Column(db.String(),
@@ -16,11 +24,61 @@ class Message(BaseModel):
     sender = db.Column(db.Integer(),
                        nullable=False)
     timestamp = db.Column(db.Float(),
-                          default=time())
+                          default=time)
     conversation_id = db.Column(db.Integer(),
                                 db.ForeignKey('conversation.id'),
                                 nullable=True)
 
-    def view(self):
+    @property
+    def cursor(self):
+        """Position of the message in its conversation's history."""
+        return '{!r}:{}'.format(self.timestamp, self.id)
+
+    def view(self, fields=ALL):
         """Detailed view of a message."""
-        return self.serialize()
+        return self.serialize(fields=fields)
+
+    @classmethod
+    def history(cls, user_id, conversation_id, before=None, limit=None):
+        """
+        Get a page of a conversation's messages, walking back in time.
+
+        The page is returned oldest first, with the cursor of the page of
+        older messages, or None when there are no older messages. A
+        malformed cursor gives an error instead.
+        """
+        limit = cls.page_size(limit)
+        query = cls.of_participant(user_id).filter(
+            cls.conversation_id == conversation_id)
+        if before:
+            position = cls.parse_cursor(before)
+            if isinstance(position, dict):
+                return position
+            timestamp, message_id = position
+            query = query.filter(or_(
+                cls.timestamp < timestamp,
+                and_(cls.timestamp == timestamp, cls.id < message_id)))
+        result = query.order_by(
+            cls.timestamp.desc(), cls.id.desc()).limit(limit + 1).all()
+        next_cursor = result[limit - 1].cursor if len(result) > limit else None
+        return result[limit - 1::-1], next_cursor
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """Split a history cursor into its timestamp and message id."""
+        try:
+            timestamp, message_id = cursor.split(':')
+            return float(timestamp), int(message_id)
+        except (AttributeError, ValueError):
+            return {
+                "message": "The cursor is not valid.",
+                "help": "Use the next cursor of a page of messages."
+            }
+
+    @classmethod
+    def of_participant(cls, user_id):
+        """Query the messages of conversations a user participates in."""
+        return cls.query.join(
+            user_conversations,
+            user_conversations.c.conversation_id == cls.conversation_id
+        ).filter(user_conversations.c.user_id == user_id)
@@ -1,6 +1,6 @@
 """Payment."""
 
-from .base import BaseModel, db
+from .base import ALL, BaseModel, db
 
 
 class Payment(BaseModel):
@@ -19,25 +19,32 @@ class Payment(BaseModel):
                                cascade="all,delete")
     estate_id = db.Column(db.Integer(),
                           db.ForeignKey('estate.id'),
-                          nullable=True)
+                          nullable=True,
+                          index=True)
     unit_id = db.Column(db.Integer(),
                         db.ForeignKey('unit.id'),
-                        nullable=True)
+                        nullable=True,
+                        index=True)
     wallet_id = db.Column(db.Integer(),
                           db.ForeignKey('wallet.id'),
-                          nullable=True)
+                          nullable=True,
+                          index=True)
+
+    loading_profiles = {
+        'detail': ('deposits',)
+    }
+
+    serializer_shapes = {
+        'summary': ('id', 'required', 'balance')
+    }
 
     def __repr__(self):
         """Summarized view of a payment."""
-        return {
-            'id': self.id,
-            'required': self.required,
-            'balance': self.balance
-        }
+        return self.serialize('summary')
 
-    def view(self):
+    def view(self, fields=ALL):
         """Detailed view of a payment."""
-        payment = self.serialize()
-        deposits = [i.view() for i in self.deposits]
-        payment.update({'deposits': deposits})
+        payment = self.serialize(fields=fields)
+        if fields.relation('deposits'):
+            payment['deposits'] = [i.view() for i in self.deposits]
         return payment
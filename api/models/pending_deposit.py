@@ -0,0 +1,32 @@
+"""Pending deposit."""
+
+from time import time
+
+from .base import BaseModel, db
+
+
+class PendingDeposit(BaseModel):
+    """A deposit accepted but not applied yet."""
+
+    id = db.Column(db.Integer(),
+                   primary_key=True)
+    amount = db.Column(db.Float(),
+                       nullable=False)
+    period_end = db.Column(db.Float(),
+                           nullable=True)
+    period_start = db.Column(db.Float(),
+                             nullable=True)
+    timestamp = db.Column(db.Float(),
+                          default=time)
+    idempotency_key = db.Column(db.String(64),
+                                nullable=False,
+                                index=True,
+                                unique=True)
+    payment_id = db.Column(db.Integer(),
+                           nullable=False)
+    error = db.Column(db.String(),
+                      nullable=True)
+
+    def view(self):
+        """Detailed view of a pending deposit."""
+        return self.serialize()
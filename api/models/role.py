@@ -1,6 +1,8 @@
 """Role."""
 
-from .base import BaseModel, db
+from api.helpers.cache import LRUCache
+
+from .base import ALL, BaseModel, db
 
 
 class Role(BaseModel):
@@ -9,14 +11,77 @@ class Role(BaseModel):
     id = db.Column(db.Integer(),
                    primary_key=True)
     title = db.Column(db.String(),
-                      nullable=False)
+                      nullable=False,
+                      index=True)
+
+    loading_profiles = {
+        'detail': ('users',)
+    }
+
+    # Rendered lists of roles keyed by their ids. Roles are seeded and
+    # rarely change, so any write to a role clears the whole cache.
+    list_cache = LRUCache(maxsize=256)
+
+    # Role ids by title and titles by id, loaded on first use. A write to a
+    # role drops it, and it expires after ROLE_REGISTRY_TTL seconds so the
+    # writes of other processes are seen too.
+    registry = LRUCache(maxsize=1)
+
+    row_cache = LRUCache()
 
     def __repr__(self):
         """Summarized view of a role."""
         return self.serialize()
 
-    def view(self):
+    def forget(self):
+        """Evict the role, every cached list holding it and the registry."""
+        super(Role, self).forget()
+        self.list_cache.clear()
+        self.registry.clear()
+
+    def view(self, fields=ALL):
         """Detailed view of a role."""
-        role = self.serialize()
-        role.update({'users': [i.__repr__() for i in self.users]})
+        role = self.serialize(fields=fields)
+        if fields.relation('users'):
+            role['users'] = [i.__repr__() for i in self.users]
         return role
+
+    @classmethod
+    def id_of(cls, title):
+        """Get the id of the role with a title, or None if there is none."""
+        return cls.registered()[0].get(title)
+
+    @staticmethod
+    def mask(role_ids):
+        """Pack role ids into an integer with the bit of each id set."""
+        mask = 0
+        for role_id in role_ids:
+            mask |= 1 << role_id
+        return mask
+
+    @classmethod
+    def registered(cls):
+        """Get the ids by title and titles by id, loading them if needed."""
+        registry = cls.registry.get('roles')
+        if registry is None:
+            ids = dict(db.session.query(cls.title, cls.id))
+            titles = {role_id: title for title, role_id in ids.items()}
+            registry = (ids, titles)
+            cls.registry.set('roles', registry)
+        return registry
+
+    @classmethod
+    def rendered_list(cls, roles):
+        """Get the serialized roles, rendering each set of roles once."""
+        key = tuple(role.id for role in roles)
+        rendered = cls.list_cache.get(key)
+        if rendered is None:
+            rendered = tuple(role.serialize() for role in roles)
+            cls.list_cache.set(key, rendered)
+        return rendered
+
+    @classmethod
+    def titles(cls, mask):
+        """Unpack a mask of role ids into the titles of the roles."""
+        titles = cls.registered()[1]
+        return [titles[i] for i in sorted(titles) if mask >> i & 1]
@@ -1,6 +1,6 @@
 """Unit."""
 
-from .base import BaseModel, db
+from .base import ALL, BaseModel, db
 
 
 class Unit(BaseModel):
@@ -16,24 +16,38 @@ class Unit(BaseModel):
                               uselist=False)
     board_id = db.Column(db.Integer(),
                          db.ForeignKey('board.id'),
-                         nullable=True)
+                         nullable=True,
+                         index=True)
     estate_id = db.Column(db.Integer(),
                           db.ForeignKey('estate.id'),
-                          nullable=True)
+                          nullable=True,
+                          index=True)
     user_id = db.Column(db.Integer(),
                         db.ForeignKey('user.id'),
-                        nullable=True)
+                        nullable=True,
+                        index=True)
+
+    loading_profiles = {
+        'summary': ('estate',),
+        'detail': ('board:summary', 'estate', 'payment', 'resident')
+    }
+
+    fragment_profile = 'detail'
+
+    serializer_shapes = {
+        'summary': ('id', 'name')
+    }
 
     def __repr__(self):
         """Summarized view of a unit."""
-        return {'id': self.id, 'name': self.name,
-                'estate': self.estate.__repr__()}
+        unit = self.serialize('summary')
+        unit['estate'] = self.estate.__repr__()
+        return unit
 
-    def view(self):
+    def view(self, fields=ALL):
         """Detailed view of a unit."""
-        unit = self.serialize()
-        unit.update({'board': self.board.__repr__()})
-        unit.update({'estate': self.estate.__repr__()})
-        unit.update({'payment': self.payment.__repr__()})
-        unit.update({'resident': self.resident.__repr__()})
+        unit = self.serialize(fields=fields)
+        for key in ('board', 'estate', 'payment', 'resident'):
+            if fields.relation(key):
+                unit[key] = getattr(self, key).__repr__()
         return unit
@@ -1,20 +1,27 @@
 """User."""
 
-from .base import BaseModel, db
+from sqlalchemy import DDL, event
 
-# Association tables.
+from api.helpers.cache import LRUCache
+
+from .base import ALL, BaseModel, db
+from .role import Role
+
+# Association tables. Each pair is stored once, and the primary key also
+# indexes lookups by user, so only the other column has its own index.
 user_conversations = db.Table(
     'user_conversations',
     db.Column(
         'user_id',
         db.Integer(),
         db.ForeignKey('user.id'),
-        nullable=False),
+        primary_key=True),
     db.Column(
         'conversation_id',
         db.Integer(),
         db.ForeignKey('conversation.id'),
-        nullable=False))
+        primary_key=True,
+        index=True))
 
 user_boards = db.Table(
     'user_boards',
@@ -22,12 +29,13 @@ user_boards = db.Table(
         'user_id',
         db.Integer(),
         db.ForeignKey('user.id'),
-        nullable=False),
+        primary_key=True),
     db.Column(
         'board_id',
         db.Integer(),
         db.ForeignKey('board.id'),
-        nullable=False))
+        primary_key=True,
+        index=True))
 
 user_roles = db.Table(
     'user_roles',
@@ -35,12 +43,13 @@ user_roles = db.Table(
         'user_id',
         db.Integer(),
         db.ForeignKey('user.id'),
-        nullable=False),
+        primary_key=True),
     db.Column(
         'role_id',
         db.Integer(),
         db.ForeignKey('role.id'),
-        nullable=False))
+        primary_key=True,
+        index=True))
 
 
 # Regular tables.
@@ -83,23 +92,54 @@ class User(BaseModel):
                              uselist=False,
                              cascade="all,delete")
 
+    loading_profiles = {
+        'detail': ('boards', 'conversations:detail', 'roles', 'wallet'),
+        'boards': ('boards:detail',),
+        'roles': ('roles',),
+        'wallet': ('wallet:detail',)
+    }
+
+    serializer_shapes = {
+        'summary': ('id', 'email', 'name', 'phone_number')
+    }
+
+    row_cache = LRUCache()
+
     def __repr__(self):
         """Summarized view of a user."""
-        user = self.serialize()
-        del user['password']
-        return user
+        return self.serialize('summary')
+
+    def role_ids(self):
+        """Get the ids of the user's roles without loading the roles."""
+        return [i for i, in db.session.query(user_roles.c.role_id).filter(
+            user_roles.c.user_id == self.id)]
 
-    def view(self):
+    def view(self, fields=ALL):
         """Detailed view of a user."""
-        boards = [board.serialize() for board in self.boards]
-        conversations = [conversation.view()
-                         for conversation in self.conversations]
-        roles = [role.serialize() for role in self.roles]
-        try:
-            wallet = self.wallet.serialize()
-        except AttributeError:
-            wallet = None
-        user = self.__repr__()
-        user.update({'roles': roles, 'wallet': wallet,
-                     'conversations': conversations, 'boards': boards})
+        user = self.serialize('summary', fields)
+        if fields.relation('roles'):
+            user['roles'] = Role.rendered_list(self.roles)
+        if fields.relation('wallet'):
+            try:
+                user['wallet'] = self.wallet.serialize()
+            except AttributeError:
+                user['wallet'] = None
+        if fields.relation('conversations'):
+            user['conversations'] = [
+                conversation.view() for conversation in self.conversations]
+        if fields.relation('boards'):
+            user['boards'] = [board.serialize() for board in self.boards]
         return user
+
+
+# Trigram index so substring searches on names use an index on Postgres.
+event.listen(
+    User.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+        dialect='postgresql'))
+event.listen(
+    User.__table__,
+    'after_create',
+    DDL('CREATE INDEX ix_user_name_trgm ON "user" '
+        'USING gin (name gin_trgm_ops)').execute_if(dialect='postgresql'))
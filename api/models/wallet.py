@@ -1,6 +1,6 @@
 """Wallet."""
 
-from .base import BaseModel, db
+from .base import ALL, BaseModel, db
 
 
 class Wallet(BaseModel):
@@ -16,18 +16,24 @@ class Wallet(BaseModel):
                                uselist=True)
     user_id = db.Column(db.Integer(),
                         db.ForeignKey('user.id'),
-                        nullable=True)
+                        nullable=True,
+                        index=True)
+
+    loading_profiles = {
+        'detail': ('payments:detail',)
+    }
+
+    serializer_shapes = {
+        'summary': ('id', 'balance')
+    }
 
     def __repr__(self):
         """Summarized view of a wallet."""
-        return {
-            'id': self.id,
-            'balance': self.balance
-        }
+        return self.serialize('summary')
 
-    def view(self):
+    def view(self, fields=ALL):
         """Detailed view of a wallet."""
-        wallet = self.serialize()
-        payments = [i.view() for i in self.payments]
-        wallet.update({'payments': payments})
+        wallet = self.serialize(fields=fields)
+        if fields.relation('payments'):
+            wallet['payments'] = [i.view() for i in self.payments]
         return wallet
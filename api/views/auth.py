@@ -1,10 +1,13 @@
 """Authorization functionality."""
 
+from math import ceil
+
 from flask import request
 from flask_restful import Resource
 
 from api.helpers.auth import create_token
-from api.helpers.general import digest
+from api.helpers.passwords import check_password
+from api.helpers.ratelimit import throttle
 from api.helpers.validation import validate_json
 from api.models import User
 
@@ -20,7 +23,15 @@ class AuthResource(Resource):
         required = ['email', 'password']
         result = validate_json(required, payload)
         if isinstance(result, bool):
-            password = digest(payload['password'])
+            email = str(payload['email']).strip().lower()
+            wait = max([throttle('signin_address', request.remote_addr),
+                        throttle('signin_email', email)])
+            if wait:
+                return {
+                    'status': 'fail',
+                    'message': 'Too many sign in attempts.',
+                    'help': 'Try again in {} seconds.'.format(ceil(wait))
+                }, 429, {'Retry-After': str(ceil(wait))}
             user = User.get(email=payload['email'])
             if isinstance(user, dict):
                 return {
@@ -28,12 +39,16 @@ class AuthResource(Resource):
                     'message': 'The user does not exist.',
                     'help': 'Ensure arguments are of existent object.'
                 }, 404
-            if user.password != password:
+            matches, rehashed = check_password(
+                payload['password'], user.password)
+            if not matches:
                 return {
                     'status': 'fail',
                     'message': 'Wrong password.',
                     'help': 'Recover the password if necessary.'
                 }, 400
+            if rehashed:
+                user.update({'password': rehashed})
             token = create_token(payload['email'])
             return {
                 'status': 'success',
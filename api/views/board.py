@@ -3,9 +3,11 @@
 from flask import request
 from flask_restful import Resource
 
-from api.helpers.modelops import get_boards
+from api.helpers.modelops import (
+    conditional, get_boards, page_args, streamed, view_fields)
+from api.helpers.streaming import stream_collection
 from api.helpers.validation import validate_json
-from api.models import Board, Conversation, User
+from api.models import BaseModel, Board, Conversation, Estate, Unit, User
 
 
 class BoardResource(Resource):
@@ -13,23 +15,47 @@ class BoardResource(Resource):
 
     def get(self, board_id=None):
         """View a board."""
-        result = get_boards(board_id)
+        fields = view_fields(request)
+        if board_id is None and streamed(request):
+            response = stream_collection(
+                'boards', Board.stream('detail', fields=fields),
+                lambda board: board.render(fields))
+            if response is not None:
+                return response
+        headers = {}
+        if board_id:
+            headers, fresh, etag = conditional(
+                request, Board, board_id, 'detail', fields)
+            if fresh:
+                return None, 304, headers
+            board = Board.cached_view(board_id, etag, fields)
+            if board is not None:
+                return {
+                    'status': 'success',
+                    'data': {
+                        'board': board
+                    }
+                }, 200, headers
+        result = get_boards(
+            board_id, profile='detail', fields=fields, **page_args(request))
         if isinstance(result, dict):
             return result, 404
-        elif isinstance(result, list):
+        elif isinstance(result, tuple):
+            boards, next_id = result
             return {
                 'status': 'success',
                 'data': {
-                    'boards': [board.view() for board in result]
-                }
+                    'boards': [board.render(fields) for board in boards]
+                },
+                'next': next_id
             }, 200
         else:
             return {
                 'status': 'success',
                 'data': {
-                    'board': result.view()
+                    'board': result.render(fields)
                 }
-            }, 200
+            }, 200, headers
 
     def post(self):
         """Create a board."""
@@ -53,10 +79,17 @@ class BoardResource(Resource):
                             'members'][members.index(i)]
                     }, 404
             board = Board()
-            board.insert('members', *members)
             board_conversation = Conversation()
             board_conversation.participants.extend(members)
-            board.insert('conversation', board_conversation)
+            with BaseModel.batch() as batch:
+                board.insert('members', *members)
+                board.insert('conversation', board_conversation)
+            if batch.failed:
+                return {
+                    'status': 'fail',
+                    'message': 'The board could not be created.',
+                    'help': 'Ensure the members still exist.'
+                }, 409
             return {
                 'status': 'success',
                 'data': {
@@ -82,14 +115,15 @@ class BoardConversationResource(Resource):
 
     def get(self, board_id):
         """View a board's conversation."""
-        result = get_boards(board_id)
+        result = get_boards(board_id, profile='conversation')
         if isinstance(result, dict):
             return result, 404
         else:
             return {
                 'status': 'success',
                 'data': {
-                    'conversation': result.conversation.view()
+                    'conversation': result.conversation.view(
+                        view_fields(request))
                 }
             }, 200
 
@@ -103,11 +137,15 @@ class BoardEstatesResource(Resource):
         if isinstance(result, dict):
             return result, 404
         else:
+            fields = view_fields(request)
+            estates = Estate.get_all('detail', fields, board_id=board_id)
+            if isinstance(estates, dict):
+                estates = []
             return {
                 'status': 'success',
                 'data': {
                     'estates': [
-                        estate.view() for estate in result.estates_owned]
+                        estate.render(fields) for estate in estates]
                 }
             }, 200
 
@@ -117,7 +155,7 @@ class BoardMembersResource(Resource):
 
     def get(self, board_id):
         """View members of a board."""
-        board = Board.get(id=board_id)
+        board = Board.get(profile='summary', id=board_id)
         if isinstance(board, dict):
             return {
                 'status': 'fail',
@@ -159,32 +197,26 @@ class BoardMembersResource(Resource):
             if isinstance(result, dict):
                 return result, 404
             else:
-                if payload['new_data']['add']:
-                    for i in payload['new_data']['add']:
-                        i_user = User.get(id=i)
-                        if isinstance(i_user, dict):
-                            return {
-                                'status': 'fail',
-                                'message': 'The user does not exist.',
-                                'help': 'Ensure ids are of existent users.'
-                            }, 404
-                        else:
-                            result.insert('members', i_user)
-                            result.conversation.insert(
-                                'participants', i_user)
-                if payload['new_data']['remove']:
-                    members = [i.id for i in result.members]
-                    for i in payload['new_data']['remove']:
-                        if i not in members:
-                            return {
-                                'status': 'fail',
-                                'message': 'The user is not in the board.',
-                                'help': 'Ensure ids are of board members.'
-                            }, 400
-                        else:
-                            result.remove('members', id=i)
-                            result.conversation.remove('participants', id=i)
-                updated_members = Board.get(id=board_id).members
+                removed = None
+                with BaseModel.batch():
+                    added = result.add_members(
+                        payload['new_data']['add'] or [])
+                    if not isinstance(added, dict):
+                        removed = result.remove_members(
+                            payload['new_data']['remove'] or [])
+                if isinstance(added, dict):
+                    return {
+                        'status': 'fail',
+                        'message': 'The user does not exist.',
+                        'help': 'Ensure ids are of existent users.'
+                    }, 404
+                elif isinstance(removed, dict):
+                    return {
+                        'status': 'fail',
+                        'message': 'The user is not in the board.',
+                        'help': 'Ensure ids are of board members.'
+                    }, 400
+                updated_members = result.members
                 return {
                     'status': 'success',
                     'data': {
@@ -202,11 +234,21 @@ class BoardUnitsResource(Resource):
         result = get_boards(board_id)
         if isinstance(result, dict):
             return result, 404
-        else:
-            return {
-                'status': 'success',
-                'data': {
-                    'units': [
-                        unit.view() for unit in result.units_owned]
-                }
-            }, 200
+        fields = view_fields(request)
+        if streamed(request):
+            response = stream_collection(
+                'units',
+                Unit.stream('detail', Unit.query.filter_by(board_id=board_id),
+                            fields),
+                lambda unit: unit.render(fields))
+            if response is not None:
+                return response
+        units = Unit.get_all('detail', fields, board_id=board_id)
+        if isinstance(units, dict):
+            units = []
+        return {
+            'status': 'success',
+            'data': {
+                'units': [unit.render(fields) for unit in units]
+            }
+        }, 200
@@ -1,11 +1,11 @@
 """Conversation and Message manipulation functionality."""
 
-from flask import request
+from flask import g, request
 from flask_restful import Resource
 
 
-from api.helpers.auth import token_required, view_token
-from api.helpers.modelops import get_conversations
+from api.helpers.auth import token_required
+from api.helpers.modelops import get_conversations, view_fields
 from api.helpers.validation import validate_json
 from api.models import Conversation, User
 
@@ -26,8 +26,7 @@ class ConversationResource(Resource):
                 'help': 'It can be empty if conversing with oneself.'
             }, 400
         else:
-            current_user_id = view_token(
-                request.headers.get('Authorization'))['id']
+            current_user_id = g.identity['id']
             if current_user_id not in payload['participants']:
                 payload['participants'].append(current_user_id)
             participants = [User.get(id=i) for i in payload['participants']]
@@ -49,27 +48,30 @@ class ConversationResource(Resource):
     @token_required
     def get(self, conversation_id=None):
         """Get a user's conversation(s)."""
-        result = get_conversations(request, conversation_id)
+        fields = view_fields(request)
+        result = get_conversations(
+            conversation_id, profile='detail', fields=fields)
         if isinstance(result, dict):
             return result, 404
         elif isinstance(result, list):
             return {
                 'status': 'success',
-                'data': {'conversations': [i.view() for i in result]}
+                'data': {'conversations': [i.view(fields) for i in result]}
             }, 200
         else:
             return {
                 'status': 'success',
-                'data': {'conversation': result.view()}
+                'data': {'conversation': result.view(fields)}
             }, 200
 
+    @token_required
     def delete(self, conversation_id):
         """
         Delete a conversation.
 
         Remove user, only delete if last member deletes.
         """
-        result = get_conversations(request, conversation_id)
+        result = get_conversations(conversation_id)
         if isinstance(result, dict):
             return result, 404
         else:
@@ -77,8 +79,7 @@ class ConversationResource(Resource):
             if no_participants == 1:
                 result.delete()
             else:
-                user = User.get(email=view_token(
-                    request.headers.get('Authorization'))['email'])
+                user = User.get(id=g.identity['id'])
                 user.remove('conversations', id=conversation_id)
             return {
                 'status': 'success',
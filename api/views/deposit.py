@@ -0,0 +1,62 @@
+"""Deposit ingestion functionality."""
+
+from flask import current_app, request
+from flask_restful import Resource
+
+from api.helpers.auth import requires_role
+from api.helpers.deposits import (
+    find_deposit, queue_deposits, validate_deposits)
+
+# pylint:disable=no-self-use
+
+
+class DepositsResource(Resource):
+    """View functions for submitting deposits."""
+
+    @requires_role('admin')
+    def post(self):
+        """Accept deposits, to be applied by the deposit worker."""
+        payload = request.get_json(silent=True) or {}
+        rows = payload.get('deposits')
+        if not isinstance(rows, list) or not rows:
+            return {
+                'status': 'fail',
+                'message': 'A list of deposits is required.',
+                'help': 'Send deposits as a JSON list.'
+            }, 400
+        deposits, errors = validate_deposits(rows)
+        if not deposits:
+            return {
+                'status': 'fail',
+                'message': 'No deposits were accepted.',
+                'errors': errors
+            }, 400
+        result = queue_deposits(
+            deposits, current_app.config['DEPOSIT_BATCH_SIZE'])
+        worker = current_app.extensions['deposit_worker']
+        if worker is not None and result['queued']:
+            worker.wake()
+        return {
+            'status': 'success',
+            'data': {
+                'queued': result['queued'],
+                'skipped': len(result['skipped']),
+                'errors': errors
+            }
+        }, 202
+
+
+class DepositResource(Resource):
+    """View functions for a deposit."""
+
+    @requires_role('admin')
+    def get(self, idempotency_key):
+        """View whether the deposit submitted with a key was applied."""
+        result = find_deposit(idempotency_key)
+        if isinstance(result, dict):
+            return result, 404
+        state, deposit = result
+        return {
+            'status': 'success',
+            'data': {'state': state, 'deposit': deposit.view()}
+        }, 200
@@ -3,9 +3,13 @@
 from flask import request
 from flask_restful import Resource
 
-from api.helpers.modelops import get_boards, get_estates
+from api.helpers.auth import requires_role
+from api.helpers.deposits import clear_deposits
+from api.helpers.modelops import (
+    conditional, get_boards, get_estates, page_args, streamed, view_fields)
+from api.helpers.streaming import stream_collection
 from api.helpers.validation import validate_json
-from api.models import Estate
+from api.models import BaseModel, Estate
 
 
 class EstateResource(Resource):
@@ -13,19 +17,43 @@ class EstateResource(Resource):
 
     def get(self, estate_id=None):
         """View an estate(s)."""
-        result = get_estates(estate_id)
+        fields = view_fields(request)
+        if estate_id is None and streamed(request):
+            response = stream_collection(
+                'estates', Estate.stream('detail', fields=fields),
+                lambda estate: estate.render(fields))
+            if response is not None:
+                return response
+        headers = {}
+        if estate_id:
+            headers, fresh, etag = conditional(
+                request, Estate, estate_id, 'detail', fields)
+            if fresh:
+                return None, 304, headers
+            estate = Estate.cached_view(estate_id, etag, fields)
+            if estate is not None:
+                return {
+                    'status': 'success',
+                    'data': {'estate': estate}
+                }, 200, headers
+        result = get_estates(
+            estate_id, profile='detail', fields=fields, **page_args(request))
         if isinstance(result, dict):
             return result, 404
-        elif isinstance(result, list):
+        elif isinstance(result, tuple):
+            estates, next_id = result
             return {
                 'status': 'success',
-                'data': {'estates': [estate.view() for estate in result]}
+                'data': {
+                    'estates': [
+                        estate.render(fields) for estate in estates]},
+                'next': next_id
             }, 200
         else:
             return {
                 'status': 'success',
-                'data': {'estate': result.view()}
-            }, 200
+                'data': {'estate': result.render(fields)}
+            }, 200, headers
 
     def post(self):
         """Create an estate."""
@@ -39,8 +67,15 @@ class EstateResource(Resource):
             else:
                 new_estate = Estate(
                     address=payload['address'])
-                new_id = new_estate.save()
-                board.insert('estates_owned', [Estate.get(id=new_id)])
+                with BaseModel.batch() as batch:
+                    new_id = new_estate.save()
+                    board.insert('estates_owned', new_estate)
+                if batch.failed:
+                    return {
+                        'status': 'fail',
+                        'message': 'The estate could not be created.',
+                        'help': 'Ensure the board still exists.'
+                    }, 409
                 return {
                     'status': 'success',
                     'message': 'Estate with id {} created.'.format(new_id)
@@ -66,24 +101,31 @@ class EstatePaymentResource(Resource):
 
     def get(self, estate_id):
         """View an estate's payment details."""
-        result = get_estates(estate_id)
+        result = get_estates(estate_id, profile='payment')
         if isinstance(result, dict):
             return result, 404
         else:
-            payment = result.payment.view()
+            payment = result.payment.view(view_fields(request))
             return {
                 'status': 'success',
                 'data': {'payment': payment}
             }, 200
 
+    @requires_role('admin')
     def delete(self, estate_id):
         """Clear an estate's payment history."""
         result = get_estates(estate_id)
         if isinstance(result, dict):
             return result, 404
+        elif result.payment is None:
+            return {
+                'status': 'fail',
+                'message': 'The estate has no payment.',
+                'help': 'Add a payment to the estate.'
+            }, 404
         else:
-            result.delete()
+            clear_deposits(result.payment.id)
             return {
                 'status': 'success',
-                'message': 'The estate has been deleted.'
+                'message': 'The payment history has been cleared.'
             }, 200
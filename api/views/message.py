@@ -1,18 +1,19 @@
 """Message manipulation functionality."""
-from flask import request
+from flask import g, request
 from flask_restful import Resource
 
 
-from api.helpers.auth import view_token
+from api.helpers.auth import token_required
 from api.helpers.validation import validate_json
 from api.helpers.modelops import (
-    get_conversations, get_messages, update_resource)
-from api.models import Conversation, Message
+    get_conversations, get_messages, update_resource, view_fields)
+from api.models import Message
 
 
 class MessageResource(Resource):
     """Message view functions."""
 
+    @token_required
     def post(self, conversation_id):
         """Send a message into a conversation."""
         payload = request.get_json()
@@ -24,63 +25,81 @@ class MessageResource(Resource):
                 'message': 'Content required for a message.'
             }, 400
         else:
-            result = get_conversations(request, conversation_id)
+            result = get_conversations(conversation_id)
             if isinstance(result, dict):
                 return result, 404
             else:
-                current_user_id = view_token(
-                    request.headers.get('Authorization'))['id']
                 message = Message(
-                    sender=current_user_id,
-                    content=payload['content'])
-                result.insert('messages', message)
+                    sender=g.identity['id'],
+                    content=payload['content'],
+                    conversation_id=result.id)
+                message.save()
                 return {
                     'status': 'success',
-                    'data': {'updated_conversation': result.view()}
+                    'data': {'message': message.view()},
+                    'next': message.cursor
                 }, 201
 
+    @token_required
     def get(self, conversation_id, message_id=None):
-        """View message(s)."""
-        result = get_messages(request, conversation_id, message_id)
+        """View a message, or a page of the message history."""
+        before = request.args.get('before')
+        if not message_id and before and isinstance(
+                Message.parse_cursor(before), dict):
+            return {
+                'status': 'fail',
+                'message': 'The cursor is not valid.',
+                'help': 'Use the next cursor of a page of messages.'
+            }, 400
+        result = get_messages(
+            conversation_id, message_id, before=before,
+            limit=request.args.get('limit', type=int))
+        fields = view_fields(request)
         if isinstance(result, dict):
             return result, 404
-        elif isinstance(result, list):
+        elif isinstance(result, tuple):
+            messages, next_cursor = result
             return {
                 'status': 'success',
-                'data': {'messages': [message.view() for message in result]}
+                'data': {
+                    'messages': [
+                        message.view(fields) for message in messages]},
+                'next': next_cursor
             }, 200
         else:
             return {
                 'status': 'success',
-                'data': {'message': result.view()}
+                'data': {'message': result.view(fields)}
             }, 200
 
+    @token_required
     def delete(self, conversation_id, message_id):
         """Delete message."""
-        result = get_messages(request, conversation_id, message_id)
+        result = get_messages(conversation_id, message_id)
         if isinstance(result, dict):
             return result, 404
         else:
+            message, cursor = result.view(), result.cursor
             result.delete()
-            updated_conversation = Conversation.get(id=conversation_id).view()
             return {
                 'status': 'success',
-                'data': {'updated_conversation': updated_conversation}
+                'data': {'message': message},
+                'next': cursor
             }, 200
 
+    @token_required
     def patch(self, conversation_id, message_id):
         """Edit a message."""
-        result = get_messages(request, conversation_id, message_id)
+        result = get_messages(conversation_id, message_id)
         if isinstance(result, dict):
             return result, 404
         else:
             update_result = update_resource(request, result)
             if isinstance(update_result, bool):
-                updated_conversation = Conversation.get(
-                    id=conversation_id).view()
                 return {
                     'status': 'success',
-                    'data': {'updated_conversation': updated_conversation}
+                    'data': {'message': result.view()},
+                    'next': result.cursor
                 }, 200
             else:
                 return update_result, 400
@@ -0,0 +1,21 @@
+"""Operational metrics."""
+
+from flask import current_app
+from flask_restful import Resource
+
+from api.helpers.auth import requires_role
+from api.helpers.pool import pool_metrics
+
+# pylint:disable=no-self-use
+
+
+class PoolMetricsResource(Resource):
+    """View functions for database connection pool metrics."""
+
+    @requires_role('admin')
+    def get(self):
+        """View the connection pool's sizing and use."""
+        return {
+            'status': 'success',
+            'data': {'pool': pool_metrics(current_app)}
+        }, 200
@@ -1,9 +1,10 @@
 """Role manipulation functionality."""
 
+from flask import request
 from flask_restful import Resource
 
 from api.helpers.auth import token_required
-from api.helpers.modelops import get_roles
+from api.helpers.modelops import get_roles, page_args, view_fields
 
 
 class RoleResource(Resource):
@@ -12,18 +13,23 @@ class RoleResource(Resource):
     @token_required
     def get(self, role_id=None):
         """View basic role(s) information."""
-        result = get_roles(role_id)
+        fields = view_fields(request)
+        result = get_roles(role_id, **page_args(request))
         if isinstance(result, dict):
             return result, 404
-        elif isinstance(result, list):
+        elif isinstance(result, tuple):
+            roles, next_id = result
             return {
                 'status': 'success',
-                'data': {'roles': [role.__repr__() for role in result]}
+                'data': {
+                    'roles': [role.serialize(fields=fields) for role in roles]
+                },
+                'next': next_id
             }, 200
         else:
             return {
                 'status': 'success',
-                'data': {'role': result.__repr__()}
+                'data': {'role': result.serialize(fields=fields)}
             }, 200
 
 
@@ -33,7 +39,7 @@ class RoleUsersResource(Resource):
     @token_required
     def get(self, role_id):
         """View the user's of a role."""
-        result = get_roles(role_id)
+        result = get_roles(role_id, profile='detail')
         if isinstance(result, dict):
             return result, 404
         else:
@@ -1,14 +1,16 @@
 """User manipulation functionality."""
 
-from flask import request
+from flask import current_app, g, request
 from flask_restful import Resource
 
-from api.helpers.auth import token_required, view_token
-from api.helpers.general import digest
+from api.helpers.auth import requires_role, token_required
+from api.helpers.bulk import import_users, read_users
+from api.helpers.passwords import hash_password
 from api.helpers.modelops import (
-    get_user, get_users, search_users, update_resource)
+    get_user, get_users, page_args, search_users, update_resource,
+    view_fields)
 from api.helpers.validation import validate_json
-from api.models import Role, User, Wallet
+from api.models import BaseModel, Role, User, Wallet
 
 # pylint:disable=no-self-use
 
@@ -26,13 +28,21 @@ class UserResource(Resource):
                 name=payload['name'],
                 phone_number=payload['phone_number'],
                 email=payload['email'],
-                password=digest(payload['password'])
+                password=hash_password(payload['password'])
             )
-            basic_role = Role.get(title='basic')
+            basic_role_id = Role.id_of('basic')
             new_wallet = Wallet()
-            new_user.insert('roles', basic_role)
-            new_user.insert('wallet', new_wallet)
-            new_user_id = new_user.save()
+            with BaseModel.batch() as batch:
+                if basic_role_id is not None:
+                    new_user.insert('roles', Role.lookup(basic_role_id))
+                new_user.insert('wallet', new_wallet)
+                new_user_id = new_user.save()
+            if batch.failed:
+                return {
+                    'status': 'fail',
+                    'message': 'The user could not be created.',
+                    'help': 'Ensure the email and phone number are unused.'
+                }, 409
             return {
                 'status': 'success',
                 'message': 'User with id {} was created.'.format(new_user_id)
@@ -46,47 +56,54 @@ class UserResource(Resource):
     @token_required
     def get(self, user_id=None):
         """View a user's information."""
+        fields = view_fields(request)
         if request.args.get('q'):
-            result = search_users(request.args.get('q'))
+            result = search_users(
+                request.args.get('q'),
+                limit=request.args.get('limit', type=int),
+                offset=request.args.get('offset', type=int),
+                fields=fields)
             if 'message' in result:
                 return result, 404
             else:
                 return result, 200
         else:
-            result = get_user(request, user_id)
+            result = get_user(user_id)
             if isinstance(result, dict):
                 return result, 404
             else:
                 return {
                     'status': 'success',
-                    'data': result.__repr__()
+                    'data': result.serialize('summary', fields)
                 }, 200
 
+    @token_required
     def patch(self):
         """Edit a user's information."""
-        result = get_user(request)
+        result = get_user()
         if isinstance(result, dict):
             return result, 404
         else:
             update_result = update_resource(request, result)
             if isinstance(update_result, bool):
-                updated_user = User.get(id=view_token(
-                    request.headers.get('Authorization'))['id'])
+                fields = view_fields(request)
+                updated_user = User.get(
+                    profile='detail', fields=fields, id=g.identity['id'])
                 return {
                     'status': 'success',
-                    'data': {'user': updated_user.view()}
+                    'data': {'user': updated_user.view(fields)}
                 }, 200
             else:
                 return update_result, 400
 
+    @token_required
     def delete(self):
         """Delete a user."""
-        result = get_user(request)
+        result = get_user()
         if isinstance(result, dict):
             return result, 404
         else:
-            user_id = view_token(
-                request.headers.get('Authorization'))['id']
+            user_id = g.identity['id']
             result.delete()
             return {
                 'status': 'success',
@@ -99,20 +116,58 @@ class UsersResource(Resource):
 
     def get(self):
         """Get several users."""
-        result = get_users()
+        result = get_users(fields=view_fields(request), **page_args(request))
         if 'message' in result:
             return result, 404
         else:
             return result, 200
 
 
+class UsersBulkResource(Resource):
+    """View functions for creating users in bulk."""
+
+    formats = {'text/csv': 'csv', 'application/x-ndjson': 'jsonl'}
+
+    @requires_role('admin')
+    def post(self):
+        """Create users from a JSON list, CSV or JSON lines body."""
+        if request.mimetype in self.formats:
+            rows = read_users(request.stream, self.formats[request.mimetype])
+        else:
+            payload = request.get_json(silent=True) or {}
+            rows = payload.get('users')
+            if not isinstance(rows, list):
+                return {
+                    'status': 'fail',
+                    'message': 'A list of users is required.',
+                    'help': 'Send users as a JSON list, CSV or JSON lines.'
+                }, 400
+        result = import_users(
+            rows,
+            chunk_size=current_app.config['IMPORT_CHUNK_SIZE'],
+            workers=current_app.config['HASH_WORKERS'])
+        if not result['created'] and result['errors']:
+            return {
+                'status': 'fail',
+                'message': 'No users were created.',
+                'errors': result['errors']
+            }, 400
+        return {
+            'status': 'success',
+            'data': {
+                'created': len(result['created']),
+                'errors': result['errors']
+            }
+        }, 201
+
+
 class UserBoardsResource(Resource):
     """View functions for a user's boards."""
 
     @token_required
     def get(self, user_id):
         """View a user's boards."""
-        result = get_user(request, user_id)
+        result = get_user(user_id, profile='boards')
         if isinstance(result, dict):
             return result, 404
         else:
@@ -124,9 +179,11 @@ class UserBoardsResource(Resource):
                     'help': 'Suggest a board if necessary.'
                 }, 404
             else:
+                fields = view_fields(request)
                 return {
                     'status': 'success',
-                    'data': {'boards': [board.view() for board in boards]}
+                    'data': {
+                        'boards': [board.view(fields) for board in boards]}
                 }, 200
 
 
@@ -136,7 +193,7 @@ class UserRolesResource(Resource):
     @token_required
     def get(self, user_id):
         """View a user's roles."""
-        result = get_user(request, user_id)
+        result = get_user(user_id, profile='roles')
         if isinstance(result, dict):
             return result, 404
         else:
@@ -152,11 +209,11 @@ class UserWalletResource(Resource):
     @token_required
     def get(self):
         """View a user's wallet."""
-        result = get_user(request)
+        result = get_user(profile='wallet')
         if isinstance(result, dict):
             return result, 404
         else:
-            wallet = result.wallet.view()
+            wallet = result.wallet.view(view_fields(request))
             return {
                 'status': 'success',
                 'data': {'wallet': wallet}
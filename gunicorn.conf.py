@@ -0,0 +1,14 @@
+"""gunicorn settings, read from the environment where one is set."""
+
+# pylint:disable=invalid-name
+
+from multiprocessing import cpu_count
+from os import getenv
+
+bind = '0.0.0.0:{}'.format(getenv('PORT', '5000'))
+workers = int(getenv('WEB_CONCURRENCY', str(cpu_count() * 2 + 1)))
+timeout = int(getenv('GUNICORN_TIMEOUT', '30'))
+
+# Load the application in each worker rather than in the master, so no
+# database connection is shared across a fork.
+preload_app = False
@@ -5,26 +5,43 @@ from flask_jwt_extended import JWTManager
 from flask_restful import Api
 
 
-from api.models import db
+from api.helpers.auth import authenticate, init_auth
+from api.helpers.deposits import init_deposits
+from api.helpers.encoding import init_encoding
+from api.helpers.passwords import init_passwords
+from api.helpers.pool import init_pool_metrics
+from api.helpers.ratelimit import init_rate_limits
+from api.models import (
+    compile_serializers, db, init_fragment_cache, init_row_caches)
 
 from .config import configurations
 from .resources import add_resources
 
 
 def create_app(configuration):
-    """Create the flask app."""
+    """
+    Create the flask app.
+
+    Nothing connects to the database here. Tables are made by migrations
+    or "manage.py create_db", and callers working outside a request push
+    an app context of their own.
+    """
     app = Flask(__name__)
     app.config.from_object(configurations[configuration])
-    app_context = app.app_context()
-    app_context.push()
     db.init_app(app)
-    db.create_all()
+    init_pool_metrics(app)
+    compile_serializers()
+    init_row_caches(app)
+    init_fragment_cache(app)
+    init_auth(app)
+    init_passwords(app)
+    init_rate_limits(app)
+    init_deposits(app)
+    app.before_request(authenticate)
 
     JWTManager(app)
     api = Api(app)
+    init_encoding(app, api)
     add_resources(api)
 
     return app
-
-
-app = create_app('development')
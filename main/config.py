@@ -11,6 +11,55 @@ class Config(object):
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = getenv('APP_SECRET_KEY')
+    PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    TOKEN_CACHE_SIZE = 4096
+    TOKEN_CACHE_TTL = 300
+    ROW_CACHE_SIZE = 4096
+    ROW_CACHE_TTL = 60
+    ROLE_REGISTRY_TTL = 60
+    FRAGMENT_CACHE_SIZE = 1024
+    FRAGMENT_CACHE_TTL = 300
+    FRAGMENT_CACHE_URL = getenv('FRAGMENT_CACHE_URL')
+    IMPORT_CHUNK_SIZE = 500
+    STREAM_BATCH_SIZE = 100
+    JSON_ENCODER = 'auto'
+    HASH_WORKERS = 4
+    PASSWORD_HASHER = 'pbkdf2_sha256'
+    PASSWORD_COST = None
+    RATE_LIMITS = {
+        'signin_email': (10, 60),
+        'signin_address': (100, 60)
+    }
+    RATE_LIMIT_SIZE = 65536
+    RATE_LIMIT_URL = getenv('RATE_LIMIT_URL')
+    PROXY_COUNT = int(getenv('PROXY_COUNT', '0'))
+    DEPOSIT_WORKER = True
+    DEPOSIT_BATCH_SIZE = 500
+    DEPOSIT_BATCH_INTERVAL = 1.0
+
+
+class ProductionConfig(Config):
+    """
+    Configuration for production, served by gunicorn.
+
+    Each worker process has its own pool, so the database must accept
+    workers * (DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW) connections.
+    The sync workers serve one request at a time, so passwords are hashed
+    inline unless HASH_WORKERS is set.
+    """
+
+    DEBUG = False
+    HASH_WORKERS = int(getenv('HASH_WORKERS', '0'))
+    PROXY_COUNT = int(getenv('PROXY_COUNT', '1'))
+    SQLALCHEMY_DATABASE_URI = getenv('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(getenv('DATABASE_POOL_SIZE', '5')),
+        'max_overflow': int(getenv('DATABASE_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(getenv('DATABASE_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(getenv('DATABASE_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': getenv('DATABASE_POOL_PRE_PING', '1') == '1'
+    }
 
 
 class TestingConfig(Config):
@@ -18,6 +67,9 @@ class TestingConfig(Config):
 
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    HASH_WORKERS = 0
+    PASSWORD_COST = 1000
+    DEPOSIT_WORKER = False
 
 
 class DevelopmentConfig(Config):
@@ -29,5 +81,6 @@ class DevelopmentConfig(Config):
 
 configurations = {
     "testing": TestingConfig,
-    "development": DevelopmentConfig
+    "development": DevelopmentConfig,
+    "production": ProductionConfig
 }
@@ -4,11 +4,13 @@ from api.views.board import (
     BoardMembersResource, BoardConversationResource,
     BoardEstatesResource, BoardResource, BoardUnitsResource)
 from api.views.conversation import ConversationResource
+from api.views.deposit import DepositResource, DepositsResource
 from api.views.estate import EstatePaymentResource, EstateResource
 from api.views.message import MessageResource
+from api.views.metrics import PoolMetricsResource
 from api.views.role import RoleResource, RoleUsersResource
 from api.views.user import (
-    UserResource, UsersResource, UserBoardsResource,
+    UserResource, UsersBulkResource, UsersResource, UserBoardsResource,
     UserRolesResource, UserWalletResource)
 from api.views.welcome import WelcomeResource
 
@@ -54,6 +56,16 @@ def add_resources(api):
         '/api/v1/conversations/<int:conversation_id>',
         '/api/v1/conversations/<int:conversation_id>/')
 
+    api.add_resource(
+        DepositsResource,
+        '/api/v1/deposits',
+        '/api/v1/deposits/')
+
+    api.add_resource(
+        DepositResource,
+        '/api/v1/deposits/<string:idempotency_key>',
+        '/api/v1/deposits/<string:idempotency_key>/')
+
     api.add_resource(
         EstateResource,
         '/api/v1/estates',
@@ -99,6 +111,16 @@ def add_resources(api):
         '/api/v1/users/all',
         '/api/v1/users/all/')
 
+    api.add_resource(
+        PoolMetricsResource,
+        '/api/v1/metrics/pool',
+        '/api/v1/metrics/pool/')
+
+    api.add_resource(
+        UsersBulkResource,
+        '/api/v1/users/bulk',
+        '/api/v1/users/bulk/')
+
     api.add_resource(
         UserBoardsResource,
         '/api/v1/users/<int:user_id>/boards',
@@ -2,15 +2,18 @@
 
 # pylint:disable=invalid-name, too-many-locals, too-many-statements
 
-from os import environ, system
+from os import cpu_count, environ, getenv
 
-from flask_migrate import Migrate, MigrateCommand
+from flask_migrate import Migrate, MigrateCommand, stamp
 from flask_script import Manager
 
 from api.helpers.auth import create_token
+from api.helpers.bulk import import_users as import_user_rows, read_users
+from api.helpers.deposits import drain_deposits as drain_pending
 from api.models import (db, Role, User)
-from main import app
+from main import create_app
 
+app = create_app(getenv('APP_CONFIG', 'development'))
 migrate = Migrate(app, db)
 manager = Manager(app)
 manager.add_command('db', MigrateCommand)
@@ -18,14 +21,19 @@ manager.add_command('db', MigrateCommand)
 
 @manager.command
 def init():
-    """Delete current migrations and recreate migrations."""
-    system('rm -rf migrations')
-    system('python manage.py db init')
-    system('python manage.py db migrate')
-    system('python manage.py db upgrade')
+    """Create the tables and mark the migrations as applied to them."""
+    db.create_all()
+    stamp()
     print('\n Database ready for use.\n')
 
 
+@manager.command
+def create_db():
+    """Create any missing tables, without migrations."""
+    db.create_all()
+    print('\nTables created.\n')
+
+
 @manager.command
 def seed_roles():
     """Add initial roles to the database."""
@@ -50,5 +58,38 @@ def create_test_token():
           '\nThe token is saved in the environment.\n')
 
 
+@manager.option('path', help='CSV or JSON lines file of users.')
+@manager.option('-f', '--format', dest='file_format', default=None,
+                help='csv or jsonl, guessed from the extension if omitted.')
+@manager.option('-c', '--chunk-size', dest='chunk_size', type=int,
+                default=None, help='Rows inserted per batch.')
+@manager.option('-w', '--workers', dest='workers', type=int,
+                default=cpu_count(), help='Password hashing processes.')
+def import_users(path, file_format=None, chunk_size=None, workers=None):
+    """Create users from a CSV or JSON lines file."""
+    file_format = file_format or path.rsplit('.', 1)[-1].lower()
+    with open(path, newline='') as users_file:
+        result = import_user_rows(
+            read_users(users_file, file_format),
+            chunk_size=chunk_size or app.config['IMPORT_CHUNK_SIZE'],
+            workers=workers)
+    for error in result['errors']:
+        print('Row {}: {}'.format(error['row'], error['message']))
+    print('\n{} users created, {} rows failed.\n'.format(
+        len(result['created']), len(result['errors'])))
+
+
+@manager.option('-c', '--chunk-size', dest='chunk_size', type=int,
+                default=None, help='Deposits applied per transaction.')
+def drain_deposits(chunk_size=None):
+    """Apply the pending deposits."""
+    result = drain_pending(chunk_size or app.config['DEPOSIT_BATCH_SIZE'])
+    for error in result['errors']:
+        print('Deposit {}: {}'.format(
+            error['idempotency_key'], error['message']))
+    print('\n{} deposits applied, {} skipped, {} failed.\n'.format(
+        result['applied'], len(result['skipped']), len(result['errors'])))
+
+
 if __name__ == '__main__':
     manager.run()
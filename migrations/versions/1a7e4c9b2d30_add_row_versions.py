@@ -0,0 +1,37 @@
+"""Add the row version of every model table.
+
+Revision ID: 1a7e4c9b2d30
+Revises:
+Create Date: 2026-10-18 09:05:12.630918
+
+Rows start at version 1, and the ORM bumps the version with each update,
+refusing updates made from an outdated copy of the row. Tables which
+already have the column are left alone.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a7e4c9b2d30'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLES = ['board', 'conversation', 'deposit', 'estate', 'message',
+          'payment', 'role', 'unit', 'user', 'wallet']
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        columns = {column['name'] for column in inspector.get_columns(table)}
+        if 'version' not in columns:
+            op.add_column(table, sa.Column(
+                'version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
@@ -0,0 +1,102 @@
+"""Add indexes for foreign keys and lookup columns.
+
+Revision ID: 5c1d0a6e8f21
+Revises: 1a7e4c9b2d30
+Create Date: 2026-10-18 10:12:44.102394
+
+Databases created before the models declared these indexes are brought up
+to date, and anything already present is left alone, so the revision is
+safe on a database created by "manage.py create_db" too.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1d0a6e8f21'
+down_revision = '1a7e4c9b2d30'
+branch_labels = None
+depends_on = None
+
+# Association tables and the columns of their primary keys.
+ASSOCIATIONS = {
+    'user_boards': ['user_id', 'board_id'],
+    'user_conversations': ['user_id', 'conversation_id'],
+    'user_roles': ['user_id', 'role_id']
+}
+
+# Columns with an index of their own, by table.
+INDEXES = {
+    'conversation': ['board_id'],
+    'deposit': ['payment_id'],
+    'estate': ['board_id'],
+    'payment': ['estate_id', 'unit_id', 'wallet_id'],
+    'role': ['title'],
+    'unit': ['board_id', 'estate_id', 'user_id'],
+    'user_boards': ['board_id'],
+    'user_conversations': ['conversation_id'],
+    'user_roles': ['role_id'],
+    'wallet': ['user_id']
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, columns in sorted(ASSOCIATIONS.items()):
+        if inspector.get_pk_constraint(table)['constrained_columns']:
+            continue
+        remove_duplicates(bind, table, columns)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_primary_key('{}_pkey'.format(table), columns)
+    inspector = sa.inspect(bind)
+    for table, columns in sorted(INDEXES.items()):
+        present = index_names(inspector, table)
+        for column in columns:
+            name = 'ix_{}_{}'.format(table, column)
+            if name not in present:
+                op.create_index(name, table, [column])
+    if 'ix_message_conversation_id_timestamp' not in index_names(
+            inspector, 'message'):
+        op.create_index('ix_message_conversation_id_timestamp', 'message',
+                        ['conversation_id', 'timestamp', 'id'])
+    if bind.dialect.name == 'postgresql' and \
+            'ix_user_name_trgm' not in index_names(inspector, 'user'):
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_user_name_trgm ON "user" '
+                   'USING gin (name gin_trgm_ops)')
+
+
+def downgrade():
+    # The primary keys of the association tables are kept, since dropping
+    # them would let repeated rows back in, and so is the pg_trgm extension,
+    # which other indexes may use.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, columns in sorted(INDEXES.items()):
+        present = index_names(inspector, table)
+        for column in columns:
+            name = 'ix_{}_{}'.format(table, column)
+            if name in present:
+                op.drop_index(name, table)
+    if 'ix_message_conversation_id_timestamp' in index_names(
+            inspector, 'message'):
+        op.drop_index('ix_message_conversation_id_timestamp', 'message')
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_user_name_trgm')
+
+
+def index_names(inspector, table):
+    """Get the names of a table's indexes."""
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def remove_duplicates(bind, table, columns):
+    """Delete repeated rows, which the primary key will not allow."""
+    if bind.dialect.name == 'postgresql':
+        op.execute('DELETE FROM {0} a USING {0} b WHERE a.ctid < b.ctid '
+                   'AND {1}'.format(table, ' AND '.join(
+                       'a.{0} = b.{0}'.format(column) for column in columns)))
+    else:
+        op.execute('DELETE FROM {0} WHERE rowid NOT IN (SELECT min(rowid) '
+                   'FROM {0} GROUP BY {1})'.format(table, ', '.join(columns)))
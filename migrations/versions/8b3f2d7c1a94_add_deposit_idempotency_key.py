@@ -0,0 +1,36 @@
+"""Add the idempotency key of deposits.
+
+Revision ID: 8b3f2d7c1a94
+Revises: 5c1d0a6e8f21
+Create Date: 2026-10-18 16:40:21.518207
+
+Deposits recorded before this revision have no key, and keep none.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3f2d7c1a94'
+down_revision = '5c1d0a6e8f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('deposit')}
+    if 'idempotency_key' not in columns:
+        with op.batch_alter_table('deposit') as batch_op:
+            batch_op.add_column(
+                sa.Column('idempotency_key', sa.String(64), nullable=True))
+    indexes = {index['name'] for index in inspector.get_indexes('deposit')}
+    if 'ix_deposit_idempotency_key' not in indexes:
+        op.create_index('ix_deposit_idempotency_key', 'deposit',
+                        ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('deposit') as batch_op:
+        batch_op.drop_index('ix_deposit_idempotency_key')
+        batch_op.drop_column('idempotency_key')
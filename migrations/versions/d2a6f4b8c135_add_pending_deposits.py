@@ -0,0 +1,44 @@
+"""Add the table of pending deposits.
+
+Revision ID: d2a6f4b8c135
+Revises: 8b3f2d7c1a94
+Create Date: 2026-10-18 22:14:37.905162
+
+Deposits are accepted into this table and applied from it by the deposit
+worker. The table is left alone if "manage.py create_db" made it already.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6f4b8c135'
+down_revision = '8b3f2d7c1a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'pending_deposit' in inspector.get_table_names():
+        return
+    op.create_table(
+        'pending_deposit',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('period_end', sa.Float(), nullable=True),
+        sa.Column('period_start', sa.Float(), nullable=True),
+        sa.Column('timestamp', sa.Float(), nullable=True),
+        sa.Column('idempotency_key', sa.String(64), nullable=False),
+        sa.Column('payment_id', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False,
+                  server_default='1'),
+        sa.PrimaryKeyConstraint('id'))
+    op.create_index('ix_pending_deposit_idempotency_key', 'pending_deposit',
+                    ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_pending_deposit_idempotency_key', 'pending_deposit')
+    op.drop_table('pending_deposit')
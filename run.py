@@ -1,5 +1,6 @@
 """Run the application."""
 
-from main import app
+from main import create_app
 
-app.run(debug=True, host='127.0.0.1', port=5000)
+if __name__ == '__main__':
+    create_app('development').run(debug=True, host='127.0.0.1', port=5000)
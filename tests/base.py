@@ -4,7 +4,7 @@
 from os import getenv
 from unittest import TestCase
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 
 from api.helpers.general import digest
 from api.models import (
@@ -15,6 +15,23 @@ from main import create_app
 create_engine('sqlite:///:memory:')
 
 
+class QueryCounter(object):
+    """Count the SQL statements executed while in use."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self.increment)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(db.engine, 'before_cursor_execute', self.increment)
+
+    def increment(self, *args):
+        self.count += 1
+
+
 class BaseCase(TestCase):
     """Base class to be inherited by all other testcases."""
 
@@ -0,0 +1,62 @@
+"""
+Benchmark the authentication overhead of a request.
+
+Needs the same environment as the test suite (JWT_KEY, CRYPTOGRAPHIC_KEY and
+TEST_TOKEN). Run with ``python -m tests.benchmarks.bench_auth [requests]``.
+"""
+# pylint:disable=invalid-name, eval-used
+
+from os import getenv
+from sys import argv
+from time import time
+from timeit import default_timer
+
+from cryptography.fernet import Fernet
+from flask import g
+from jwt import decode
+
+from api.helpers.auth import authenticate, token_cache
+from main import create_app
+
+
+def legacy_authenticate(token):
+    """Decode a token the way token_required and view_token used to."""
+    decoded = decode(token, getenv('JWT_KEY'), algorithms=['HS256'])
+    if decoded['expires'] < time():
+        raise ValueError('Expired token.')
+    for _ in range(2):
+        decoded = decode(token, getenv('JWT_KEY'), algorithms=['HS256'])
+        cipher = Fernet(getenv('CRYPTOGRAPHIC_KEY').encode('utf-8'))
+        claims = eval(cipher.decrypt(decoded['data'].encode('utf-8')))
+    return claims
+
+
+def timed(label, function, requests):
+    """Run a function once per simulated request and report the cost."""
+    start = default_timer()
+    for _ in range(requests):
+        function()
+    elapsed = default_timer() - start
+    print('{:<24}{:>10.1f}us per request'.format(
+        label, elapsed / requests * 1e6))
+
+
+def main(requests=10000):
+    """Compare the old and new authentication paths."""
+    app = create_app('testing')
+    token = getenv('TEST_TOKEN')
+    headers = {'Authorization': token}
+    token_cache.clear()
+    with app.test_request_context(headers=headers):
+        timed('legacy (3 decodes)', lambda: legacy_authenticate(token),
+              requests)
+
+        def single_pass():
+            """Authenticate as a fresh request would."""
+            g.pop('token_claims', None)
+            authenticate()
+        timed('before_request stage', single_pass, requests)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in argv[1:2]])
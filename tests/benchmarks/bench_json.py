@@ -0,0 +1,83 @@
+"""
+Benchmark the JSON encoders on real view payloads.
+
+Needs the same environment as the test suite. Run with
+``python -m tests.benchmarks.bench_json [boards]``.
+"""
+# pylint:disable=invalid-name
+
+from sys import argv
+from timeit import default_timer
+
+from api.helpers.encoding import encoders
+from api.models import (
+    db, Board, Conversation, Estate, Message, Payment, Role, Unit, User)
+from main import create_app
+
+
+def seed_boards(number):
+    """Add boards with members, estates, units and a busy conversation."""
+    roles = [Role(title=title) for title in ('basic', 'admin', 'landlord')]
+    for i in range(number):
+        board = Board()
+        board.members.extend([
+            User(name='Member {} {}'.format(i, j), password='password',
+                 phone_number='{}-{}'.format(i, j), roles=roles,
+                 email='member.{}.{}@email.com'.format(i, j))
+            for j in range(5)])
+        for j in range(3):
+            estate = Estate(address='{} Estate Road'.format(j),
+                            payment=Payment())
+            estate.estate_units.extend([
+                Unit(name='Unit {}'.format(k), board=board, payment=Payment(),
+                     resident=board.members[k]) for k in range(4)])
+            board.estates_owned.append(estate)
+        board.conversation = Conversation(
+            title='Board {}'.format(i), participants=board.members)
+        board.conversation.messages.extend([
+            Message(sender=i * 5 + k % 5 + 1,
+                    content='Message number {} about the estate.'.format(k))
+            for k in range(50)])
+        db.session.add(board)
+    db.session.commit()
+
+
+def payloads():
+    """Render the heaviest views the way their resources do."""
+    boards = Board.get_all('detail')
+    conversations = Conversation.get_all('detail')
+    users = User.get_all('detail')
+    return {
+        'boards': {'status': 'success',
+                   'data': {'boards': [i.view() for i in boards]}},
+        'conversations': {
+            'status': 'success',
+            'data': {'conversations': [i.view() for i in conversations]}},
+        'users': {'status': 'success',
+                  'data': {'users': [i.view() for i in users]}}
+    }
+
+
+def timed(label, function, payload, rounds):
+    """Encode a payload repeatedly and report the cost of one encoding."""
+    start = default_timer()
+    for _ in range(rounds):
+        size = len(function(payload))
+    elapsed = default_timer() - start
+    print('{:<28}{:>10.1f}us {:>10} bytes'.format(
+        label, elapsed / rounds * 1e6, size))
+
+
+def main(boards=20, rounds=200):
+    """Compare the installed encoders on each payload."""
+    with create_app('testing').app_context():
+        db.create_all()
+        seed_boards(boards)
+        for name, payload in payloads().items():
+            print('\n{}'.format(name))
+            for encoder, function in sorted(encoders.items()):
+                timed(encoder, function, payload, rounds)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in argv[1:2]])
@@ -0,0 +1,54 @@
+"""
+Benchmark password checks of concurrent sign ins.
+
+Each sign in checks a password the way AuthResource does, from a pool of
+request threads as a threaded gunicorn worker would. Run with
+``python -m tests.benchmarks.bench_signin [sign_ins] [threads]``.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count
+from sys import argv
+from timeit import default_timer
+
+from api.helpers.general import digest
+from api.helpers.passwords import (
+    active, check_password, costs, hashers, make_password, new_salt,
+    verify_password)
+
+
+def timed(label, check, sign_ins, threads):
+    """Run password checks concurrently, reporting throughput and latency."""
+    latencies = []
+
+    def sign_in(_):
+        """Check one password, timing it."""
+        start = default_timer()
+        check('password')
+        latencies.append(default_timer() - start)
+
+    start = default_timer()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(sign_in, range(sign_ins)))
+    elapsed = default_timer() - start
+    print('{:<36}{:>10.1f}/s {:>10.1f}ms mean latency'.format(
+        label, sign_ins / elapsed, sum(latencies) / len(latencies) * 1e3))
+
+
+def main(sign_ins=200, threads=8):
+    """Compare the legacy digest with each hasher, inline and pooled."""
+    legacy = digest('password')
+    timed('legacy sha512', lambda password: verify_password(
+        password, legacy), sign_ins, threads)
+    for hasher in sorted(hashers):
+        active.update(hasher=hasher, cost=costs[hasher])
+        stored = make_password('password', hasher, costs[hasher], new_salt())
+        for workers in (0, max(2, cpu_count())):
+            active['workers'] = workers
+            timed('{} ({} processes)'.format(hasher, workers),
+                  lambda password: check_password(password, stored),
+                  sign_ins, threads)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in argv[1:3]])
@@ -0,0 +1,42 @@
+"""
+Benchmark the cold start of a fresh process.
+
+Needs the same environment as the test suite. Each step runs in a new
+interpreter, as a gunicorn worker or a test run would. Run with
+``python -m tests.benchmarks.bench_startup [rounds]``.
+"""
+
+from statistics import median
+from subprocess import DEVNULL, check_call
+from sys import argv, executable
+from timeit import default_timer
+
+STEPS = (
+    ('import main', [executable, '-c', 'import main']),
+    ('build an app', [
+        executable, '-c',
+        "from main import create_app; create_app('testing')"]),
+    ('collect the tests', [
+        executable, '-m', 'pytest', '--collect-only', '-q', '--no-cov',
+        '-p', 'no:cacheprovider'])
+)
+
+
+def timed(label, command, rounds):
+    """Run a command in new processes and report its median duration."""
+    durations = []
+    for _ in range(rounds):
+        start = default_timer()
+        check_call(command, stdout=DEVNULL)
+        durations.append(default_timer() - start)
+    print('{:<24}{:>10.1f}ms'.format(label, median(durations) * 1e3))
+
+
+def main(rounds=5):
+    """Time each step of starting up."""
+    for label, command in STEPS:
+        timed(label, command, rounds)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in argv[1:2]])
@@ -0,0 +1,60 @@
+"""
+Benchmark substring matching over a column of names.
+
+Run with ``python -m tests.benchmarks.bench_substring [rows]``.
+"""
+# pylint:disable=invalid-name
+
+from random import choice, seed
+from sys import argv
+from timeit import default_timer
+
+from api.helpers.general import is_substring
+
+FIRST_NAMES = ['Amina', 'Brian', 'Chebet', 'David', 'Esther', 'Faith',
+               'George', 'Halima', 'Irene', 'James', 'Kevin', 'Lilian']
+LAST_NAMES = ['Achieng', 'Barasa', 'Chege', 'Kamau', 'Mutua', 'Njoroge',
+              'Ochieng', 'Otieno', 'Wafula', 'Wanjiru']
+
+
+def legacy_is_substring(sub, main):
+    """The previous window-list implementation, kept for comparison."""
+    sub, main = sub.lower(), main.lower()
+    subs = []
+    for i in range(0, len(main) - len(sub)):
+        subs.append(main[i: i + len(sub)])
+    if sub in subs:
+        return True
+    return False
+
+
+def make_names(rows):
+    """Generate a reproducible column of full names."""
+    seed(rows)
+    return ['{} {} {}'.format(choice(FIRST_NAMES), choice(FIRST_NAMES),
+                              choice(LAST_NAMES)) for _ in range(rows)]
+
+
+def timed(label, function):
+    """Run a function once and report its wall time."""
+    start = default_timer()
+    result = function()
+    print('{:<24}{:>8.3f}s{:>10} matches'.format(
+        label, default_timer() - start, len(result)))
+    return result
+
+
+def main(rows=1000000, needle='wanj'):
+    """Compare the matchers on a generated name column."""
+    names = make_names(rows)
+    print('{} rows, needle {!r}'.format(rows, needle))
+    legacy = timed('legacy is_substring', lambda: [
+        i for i, name in enumerate(names)
+        if legacy_is_substring(needle, name)])
+    current = timed('is_substring', lambda: [
+        i for i, name in enumerate(names) if is_substring(needle, name)])
+    assert set(legacy) <= set(current)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in argv[1:2]])
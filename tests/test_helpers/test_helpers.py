@@ -2,9 +2,79 @@
 # pylint:disable=missing-docstring, invalid-name
 
 
-from api.helpers.general import digest, is_substring
+from io import BytesIO, StringIO
+from json import loads
+from os import getenv
+from time import time
+
+from flask import current_app, g
+from flask_restful import Api
+
+from api.helpers.auth import (
+    authenticate, create_token, decrypt, encrypt, get_cipher, requires_role,
+    token_cache, view_token)
+from api.helpers.bulk import import_users, read_users
+from api.helpers.cache import LRUCache, RedisCache
+from api.helpers.deposits import (
+    DepositWorker, clear_deposits, drain_deposits, find_deposit,
+    queue_deposits, validate_deposits)
+from api.helpers.encoding import encode, encoders, init_encoding
+from api.helpers.passwords import (
+    active, check_password, hash_password, hash_passwords, verify_password)
+from api.helpers.ratelimit import (
+    LocalBuckets, RedisWindows, active as limits, throttle)
+from api.helpers.general import (
+    digest, escape_like, is_substring)
 from api.helpers.validation import validate_json
-from tests.base import BaseCase
+from api.models import (
+    Deposit, Payment, PendingDeposit, Role, User, Wallet, db)
+from main import create_app
+from tests.base import BaseCase, QueryCounter
+
+
+class FakeRedis(object):
+    """A dictionary standing in for a Redis client."""
+
+    def __init__(self):
+        self.values, self.expiry = {}, {}
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def expire(self, key, seconds):
+        self.expiry[key] = seconds
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def scan_iter(self, match):
+        return [key for key in self.values if key.startswith(match[:-1])]
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.expiry[key] = ex
+
+
+class FakePipeline(object):
+    """Commands queued for a FakeRedis, run by execute."""
+
+    def __init__(self, client):
+        self.client, self.commands = client, []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args)
+                for name, args in self.commands]
 
 
 class TestHelpers(BaseCase):
@@ -28,7 +98,444 @@ class TestHelpers(BaseCase):
         """Test substring in search."""
         self.assertTrue(is_substring('First', 'FirstOne'))
         self.assertFalse(is_substring('First', 'SecondOne'))
+        self.assertTrue(is_substring('One', 'FirstOne'))
+        self.assertTrue(is_substring('firstone', 'FirstOne'))
+
+    def test_escape_like(self):
+        """Test escaping of LIKE wildcards."""
+        self.assertEqual('100\\%', escape_like('100%'))
+        self.assertEqual('a\\_b', escape_like('a_b'))
+        self.assertEqual('a\\\\b', escape_like('a\\b'))
 
     def test_digest(self):
         """Test hashing."""
         self.assertEqual(128, len(digest('a')))
+
+    def test_lru_cache_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)
+        self.assertEqual(None, cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+        cache.delete('a')
+        self.assertEqual('missing', cache.get('a', 'missing'))
+        self.assertEqual(1, len(cache))
+
+    def test_lru_cache_expiry(self):
+        """Test expired entries are not returned."""
+        cache = LRUCache(ttl=60)
+        cache.set('a', 1, expires=time() - 1)
+        cache.set('b', 2)
+        self.assertEqual(None, cache.get('a'))
+        self.assertEqual(2, cache.get('b'))
+        cache.ttl = 0
+        cache.set('b', 2)
+        self.assertEqual(None, cache.get('b'))
+
+    def test_create_app_has_no_side_effects(self):
+        """Test building an app neither connects nor pushes a context."""
+        app = create_app('testing')
+        self.assertEqual(0, app.extensions['pool_metrics']['connect'])
+        self.assertIs(self.app, current_app._get_current_object())
+
+    def test_redis_cache(self):
+        """Test the shared cache stores JSON under its prefix."""
+        client = FakeRedis()
+        cache = RedisCache(client, ttl=60, prefix='views:')
+        cache.set('board:1', {'id': 1})
+        cache.set('board:2', {'id': 2}, expires=time() + 10)
+        self.assertEqual({'id': 1}, cache.get('board:1'))
+        self.assertEqual('{"id": 1}', client.values['views:board:1'])
+        self.assertEqual(60, client.expiry['views:board:1'])
+        self.assertLessEqual(client.expiry['views:board:2'], 10)
+        cache.delete('board:1')
+        self.assertEqual('missing', cache.get('board:1', 'missing'))
+        client.values['other'] = 'kept'
+        cache.clear()
+        self.assertEqual({'other': 'kept'}, client.values)
+
+    def test_encrypt_decrypt(self):
+        """Test claims are encrypted as JSON."""
+        claims = {'id': 1, 'roles': ['basic']}
+        self.assertEqual(claims, decrypt(encrypt(claims)))
+        self.assertIs(get_cipher(), get_cipher())
+        legacy = get_cipher().encrypt(str(claims).encode('utf-8'))
+        self.assertEqual(claims, decrypt(legacy.decode('utf-8')))
+
+    def test_view_token_is_cached(self):
+        """Test token claims are decoded once and then cached."""
+        token_cache.clear()
+        token = getenv('TEST_TOKEN')
+        claims = view_token(token)
+        self.assertEqual(1, len(token_cache))
+        self.assertIs(claims, view_token(token))
+        self.assertEqual(1, len(token_cache))
+
+    def test_authenticate(self):
+        """Test the request's identity is resolved before dispatch."""
+        with self.app.test_request_context(headers=self.headers):
+            authenticate()
+            self.assertEqual(1, g.identity['id'])
+            self.assertEqual(None, g.auth_error)
+        with self.app.test_request_context(headers=self.bad_headers2):
+            authenticate()
+            self.assertEqual(None, g.identity)
+            self.assertEqual('Expired token.', g.auth_error)
+        with self.app.test_request_context():
+            authenticate()
+            self.assertEqual(None, g.identity)
+            self.assertEqual(None, g.auth_error)
+
+    def test_requires_role(self):
+        """Test role checks read the request's identity."""
+        allowed = requires_role('admin')(lambda: ('allowed', 200))
+        denied = requires_role('landlord')(lambda: ('allowed', 200))
+        with self.app.test_request_context(headers=self.headers):
+            authenticate()
+            self.assertEqual(('allowed', 200), allowed())
+            self.assertEqual(401, denied()[1])
+        with self.app.test_request_context():
+            authenticate()
+            self.assertEqual(400, allowed()[1])
+
+    def test_requires_role_with_role_mask(self):
+        """Test tokens carry role ids, checked without querying."""
+        self.role1.save()
+        self.role2.save()
+        self.role3.save()
+        self.user1.save()
+        User.get(id=1).insert('roles', Role.get(id=1), Role.get(id=3))
+        token = create_token(self.user1.email)
+        self.assertEqual(0b1010, view_token(token)['roles'])
+        allowed = requires_role('super_admin')(lambda: ('allowed', 200))
+        denied = requires_role('admin')(lambda: ('allowed', 200))
+        with self.app.test_request_context(headers={'Authorization': token}):
+            authenticate()
+            Role.registered()
+            with QueryCounter() as counter:
+                self.assertEqual(('allowed', 200), allowed())
+                self.assertEqual(401, denied()[1])
+            self.assertEqual(0, counter.count)
+
+    def test_read_users(self):
+        csv = StringIO('email,name,password,phone_number\n'
+                       'a@email.com,A,pass,001\n')
+        self.assertEqual(
+            [{'email': 'a@email.com', 'name': 'A',
+              'password': 'pass', 'phone_number': '001'}],
+            list(read_users(csv, 'csv')))
+        jsonl = BytesIO(b'{"name": "A"}\n\nnot json\n')
+        rows = list(read_users(jsonl, 'jsonl'))
+        self.assertEqual({'name': 'A'}, rows[0])
+        self.assertTrue(isinstance(rows[1], str))
+        self.assertRaises(ValueError, list, read_users(csv, 'xml'))
+
+    def test_hash_passwords(self):
+        passwords = ['pass{}'.format(i) for i in range(10)]
+        for workers in (None, 2):
+            hashed = hash_passwords(passwords, workers=workers)
+            self.assertEqual(len(set(hashed)), len(passwords))
+            self.assertTrue(all(
+                verify_password(password, stored)
+                for password, stored in zip(passwords, hashed)))
+
+    def test_hash_password(self):
+        stored = hash_password('pass')
+        self.assertTrue(stored.startswith('pbkdf2_sha256$1000$'))
+        self.assertNotEqual(stored, hash_password('pass'))
+        self.assertEqual((True, None), check_password('pass', stored))
+        self.assertEqual((False, None), check_password('wrong', stored))
+        self.assertFalse(verify_password('pass', 'unknown$1$salt$hash'))
+        self.assertFalse(verify_password('pass', 'malformed$hash'))
+
+    def test_outdated_passwords_are_rehashed(self):
+        matches, rehashed = check_password('pass', digest('pass'))
+        self.assertTrue(matches)
+        self.assertTrue(verify_password('pass', rehashed))
+        self.assertEqual(
+            (False, None), check_password('wrong', digest('pass')))
+        stored = hash_password('pass')
+        active['cost'] = 2000
+        try:
+            matches, rehashed = check_password('pass', stored)
+        finally:
+            active['cost'] = 1000
+        self.assertTrue(matches)
+        self.assertTrue(rehashed.startswith('pbkdf2_sha256$2000$'))
+
+    def test_import_users(self):
+        self.role1.save()
+        self.user1.save()
+        rows = [{
+            'email': 'user{}@email.com'.format(i),
+            'name': 'User {}'.format(i),
+            'password': 'pass',
+            'phone_number': '100 {}'.format(i)
+        } for i in range(5)]
+        rows[1]['email'] = self.user1.email
+        rows[3]['phone_number'] = rows[2]['phone_number']
+        rows.append({'email': 'missing@email.com'})
+        rows.append(dict(rows[0], email='int@email.com', password=12345))
+        rows.append(dict(rows[0], email=['x'], phone_number=1))
+        result = import_users(rows, chunk_size=2)
+        self.assertEqual([2, 3, 4], result['created'])
+        self.assertEqual(
+            [2, 4, 6, 7, 8], [error['row'] for error in result['errors']])
+        self.assertEqual('password', result['errors'][3]['invalid'])
+        self.assertEqual(
+            'email, phone_number', result['errors'][4]['invalid'])
+        user = User.get(id=4)
+        self.assertEqual('user4@email.com', user.email)
+        self.assertTrue(verify_password('pass', user.password))
+        self.assertEqual(['basic'], [role.title for role in user.roles])
+        self.assertEqual(0.0, user.wallet.balance)
+
+    def test_import_users_failed_insert(self):
+        rows = [{
+            'email': 'user{}@email.com'.format(i),
+            'name': 'User {}'.format(i),
+            'password': 'pass',
+            'phone_number': '100 {}'.format(i)
+        } for i in range(2)]
+        execute = db.session.execute
+
+        def failing(statement, *args):
+            if args and args[0] and 'email' in args[0][0]:
+                raise ValueError('Duplicate {}'.format(args[0][0]['email']))
+            return execute(statement, *args)
+
+        db.session.execute = failing
+        try:
+            with self.assertLogs(current_app.logger, 'ERROR') as logs:
+                result = import_users(rows)
+        finally:
+            del db.session.execute
+        self.assertEqual([], result['created'])
+        self.assertEqual([1, 2], [error['row'] for error in result['errors']])
+        self.assertNotIn('user0@email.com', str(result))
+        self.assertIn('user0@email.com', logs.output[0])
+
+    def test_encoders_agree(self):
+        payload = {'status': 'success', 'data': {
+            'users': [{'id': 1, 'name': 'Ñame', 'roles': ({'id': 1},)}],
+            'balance': 0.5, 'next': None, 'edited': False}}
+        for name, function in encoders.items():
+            self.assertEqual(
+                loads(encoders['json'](payload)), loads(function(payload)),
+                name)
+
+    def test_init_encoding(self):
+        self.app.config['JSON_ENCODER'] = 'json'
+        api = Api(self.app)
+        init_encoding(self.app, api)
+        self.assertEqual(b'{"a": [1]}', encode({'a': [1]}))
+        response = api.representations['application/json'](
+            {'a': 1}, 201, {'X-Test': 'yes'})
+        self.assertEqual(201, response.status_code)
+        self.assertEqual('application/json', response.mimetype)
+        self.assertEqual('yes', response.headers['X-Test'])
+        self.app.config['JSON_ENCODER'] = 'auto'
+        init_encoding(self.app, api)
+        self.assertEqual({'a': [1]}, loads(encode({'a': [1]})))
+
+    def test_local_buckets(self):
+        buckets = LocalBuckets(maxsize=2)
+        self.assertEqual(
+            [0, 0, 0], [buckets.hit('a', 3, 60, now=0) for _ in range(3)])
+        self.assertEqual(20, buckets.hit('a', 3, 60, now=0))
+        self.assertEqual(10, buckets.hit('a', 3, 60, now=10))
+        self.assertEqual(0, buckets.hit('a', 3, 60, now=20))
+        self.assertEqual(0, buckets.hit('b', 3, 60, now=20))
+        buckets.hit('c', 3, 60, now=20)
+        self.assertIsNone(buckets.buckets.get('a'))
+
+    def test_redis_windows(self):
+        client = FakeRedis()
+        windows = RedisWindows(client, prefix='limits:')
+        self.assertEqual(
+            [0, 0, 0], [windows.hit('a', 3, 60, now=50) for _ in range(3)])
+        self.assertEqual(10, windows.hit('a', 3, 60, now=50))
+        self.assertEqual(4, client.values['limits:a:0'])
+        self.assertEqual(121, client.expiry['limits:a:0'])
+        self.assertEqual(50, windows.hit('a', 3, 60, now=70))
+        self.assertEqual(0, windows.hit('a', 3, 60, now=110))
+        self.assertEqual(0, windows.hit('b', 3, 60, now=70))
+
+    def test_throttle(self):
+        self.assertEqual((10, 60), limits['limits']['signin_email'])
+        self.assertEqual(0, throttle('unlimited', 'a'))
+        limits['limits']['test'] = (1, 60)
+        self.assertEqual(0, throttle('test', 'a'))
+        self.assertGreater(throttle('test', 'a'), 0)
+        self.assertEqual(0, throttle('test', 'b'))
+
+    def add_payments(self):
+        wallet = Wallet()
+        db.session.add_all([
+            Payment(wallet=wallet), Payment(wallet=wallet), Payment()])
+        db.session.commit()
+
+    def deposits(self, start, stop, payment_id=1, amount=10):
+        return [{'payment_id': payment_id, 'amount': amount,
+                 'idempotency_key': 'key-{}'.format(i)}
+                for i in range(start, stop)]
+
+    def test_validate_deposits(self):
+        self.add_payments()
+        rows = self.deposits(0, 2) + [
+            'text', {'amount': 1}, dict(self.deposits(0, 1)[0]),
+            dict(self.deposits(5, 6)[0], amount=-1),
+            dict(self.deposits(6, 7)[0], amount=True),
+            dict(self.deposits(7, 8)[0], payment_id=9),
+            dict(self.deposits(8, 9)[0], period_start='today'),
+            dict(self.deposits(9, 10)[0], period_end=5, extra=1)]
+        deposits, errors = validate_deposits(rows)
+        self.assertEqual(['key-0', 'key-1', 'key-9'],
+                         [i['idempotency_key'] for i in deposits])
+        self.assertEqual(5, deposits[2]['period_end'])
+        self.assertNotIn('extra', deposits[2])
+        self.assertEqual([3, 4, 5, 6, 7, 8, 9],
+                         [error['row'] for error in errors])
+        self.assertEqual('The payment does not exist.', errors[5]['message'])
+
+    def apply_deposits(self, deposits, chunk_size=500):
+        queue_deposits(deposits)
+        return drain_deposits(chunk_size)
+
+    def count_apply_queries(self, deposits):
+        queue_deposits(deposits)
+        with QueryCounter() as counter:
+            result = drain_deposits()
+        self.assertEqual(len(deposits), result['applied'])
+        return counter.count
+
+    def test_apply_deposits_with_set_based_updates(self):
+        self.add_payments()
+        few = self.count_apply_queries(
+            self.deposits(0, 2) + self.deposits(2, 3, payment_id=3))
+        many = self.count_apply_queries(
+            self.deposits(3, 20) + self.deposits(20, 30, payment_id=2) +
+            self.deposits(30, 31, payment_id=3, amount=0.5))
+        self.assertEqual(few, many)
+        self.assertEqual(31, Deposit.query.count())
+        self.assertEqual(0, PendingDeposit.query.count())
+        self.assertEqual([190.0, 100.0, 10.5], [
+            payment.balance for payment in Payment.query.order_by(Payment.id)])
+        self.assertEqual(290.0, Wallet.query.get(1).balance)
+        self.assertEqual(3, Payment.query.get(1).version)
+        self.assertEqual(3, Wallet.query.get(1).version)
+        self.assertEqual('key-0', Deposit.query.get(1).idempotency_key)
+
+    def test_queue_deposits_skips_taken_keys(self):
+        self.add_payments()
+        self.apply_deposits(self.deposits(0, 2))
+        result = queue_deposits(self.deposits(1, 4), chunk_size=2)
+        self.assertEqual((2, ['key-1']), (result['queued'], result['skipped']))
+        result = queue_deposits(self.deposits(2, 5))
+        self.assertEqual((1, ['key-2', 'key-3']),
+                         (result['queued'], result['skipped']))
+        self.assertEqual(
+            ['key-2', 'key-3', 'key-4'],
+            [i.idempotency_key for i in PendingDeposit.query.order_by(
+                PendingDeposit.id)])
+        self.assertEqual(20.0, Payment.query.get(1).balance)
+
+    def test_apply_deposits_is_idempotent(self):
+        self.add_payments()
+        self.apply_deposits(self.deposits(0, 3))
+        db.session.add(PendingDeposit(
+            idempotency_key='key-2', amount=10, payment_id=1))
+        db.session.commit()
+        queue_deposits(self.deposits(3, 5) + self.deposits(5, 6, payment_id=9))
+        result = drain_deposits()
+        self.assertEqual(2, result['applied'])
+        self.assertEqual(['key-2'], result['skipped'])
+        self.assertEqual(
+            [{'idempotency_key': 'key-5',
+              'message': 'The payment does not exist.'}], result['errors'])
+        self.assertEqual(50.0, Payment.query.get(1).balance)
+        self.assertEqual(50.0, Wallet.query.get(1).balance)
+        self.assertEqual(['key-5'], [
+            i.idempotency_key for i in PendingDeposit.query])
+        self.assertEqual(0, drain_deposits()['applied'])
+
+    def test_failed_deposits_are_replaced(self):
+        self.add_payments()
+        queue_deposits(self.deposits(0, 1, payment_id=9))
+        drain_deposits()
+        self.assertEqual('failed', find_deposit('key-0')[0])
+        self.assertEqual(
+            1, queue_deposits(self.deposits(0, 1, payment_id=2))['queued'])
+        self.assertEqual('pending', find_deposit('key-0')[0])
+        self.assertEqual(1, drain_deposits()['applied'])
+        self.assertEqual(10.0, Payment.query.get(2).balance)
+
+    def test_apply_deposits_retries_keys_recorded_meanwhile(self):
+        self.add_payments()
+        deposits = self.deposits(0, 3)
+        self.apply_deposits(deposits[1:2])
+        db.session.add(PendingDeposit(
+            idempotency_key='key-1', amount=10, payment_id=1))
+        db.session.commit()
+        queue_deposits(deposits)
+        queries, lookups = db.session.query, []
+
+        def unaware(*entities):
+            query = queries(*entities)
+            if entities[0] is Deposit.idempotency_key:
+                lookups.append(query)
+                if len(lookups) == 1:
+                    query = query.filter(Deposit.id.is_(None))
+            return query
+        db.session.query = unaware
+        try:
+            result = drain_deposits()
+        finally:
+            del db.session.query
+        self.assertEqual(2, result['applied'])
+        self.assertEqual(['key-1'], result['skipped'])
+        self.assertEqual(2, len(lookups))
+        self.assertEqual(30.0, Payment.query.get(1).balance)
+        self.assertEqual(0, PendingDeposit.query.count())
+
+    def test_apply_deposits_in_chunks(self):
+        self.add_payments()
+        result = self.apply_deposits(
+            self.deposits(0, 10) + self.deposits(10, 12, payment_id=2),
+            chunk_size=4)
+        self.assertEqual(12, result['applied'])
+        self.assertEqual(12, Deposit.query.count())
+        self.assertEqual(100.0, Payment.query.get(1).balance)
+        self.assertEqual(120.0, Wallet.query.get(1).balance)
+        state, deposit = find_deposit('key-0')
+        self.assertEqual(('applied', 1), (state, deposit.payment_id))
+        self.assertEqual(
+            'No deposit was submitted with the key.',
+            find_deposit('key-12')['message'])
+
+    def test_deposit_worker(self):
+        self.add_payments()
+        queue_deposits(self.deposits(0, 2))
+        db.session.remove()
+        worker = DepositWorker(self.app, interval=3600)
+        worker.wake()
+        worker.thread.join(0.5)
+        self.assertTrue(worker.thread.is_alive())
+        self.assertEqual(0, PendingDeposit.query.count())
+        self.assertEqual(20.0, Payment.query.get(1).balance)
+
+    def test_clear_deposits(self):
+        self.add_payments()
+        self.apply_deposits(self.deposits(0, 3) + self.deposits(3, 4, 2))
+        version = Payment.query.get(1).version
+        self.assertEqual(3, clear_deposits(1))
+        db.session.expire_all()
+        self.assertEqual(0.0, Payment.query.get(1).balance)
+        self.assertEqual(version + 1, Payment.query.get(1).version)
+        self.assertEqual(10.0, Wallet.query.get(1).balance)
+        self.assertEqual(1, Deposit.query.count())
+        self.assertEqual(0, clear_deposits(3))
@@ -0,0 +1,116 @@
+-- The schema create_all made before the first revision, on SQLite.
+CREATE TABLE board (
+    id INTEGER NOT NULL,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE role (
+    id INTEGER NOT NULL,
+    title VARCHAR NOT NULL,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE user (
+    id INTEGER NOT NULL,
+    email VARCHAR,
+    name VARCHAR NOT NULL,
+    password VARCHAR NOT NULL,
+    phone_number VARCHAR NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (email),
+    UNIQUE (phone_number)
+);
+
+CREATE TABLE conversation (
+    id INTEGER NOT NULL,
+    timestamp FLOAT,
+    title VARCHAR,
+    board_id INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(board_id) REFERENCES board (id)
+);
+
+CREATE TABLE estate (
+    id INTEGER NOT NULL,
+    address VARCHAR NOT NULL,
+    board_id INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(board_id) REFERENCES board (id)
+);
+
+CREATE TABLE user_boards (
+    user_id INTEGER NOT NULL,
+    board_id INTEGER NOT NULL,
+    FOREIGN KEY(user_id) REFERENCES user (id),
+    FOREIGN KEY(board_id) REFERENCES board (id)
+);
+
+CREATE TABLE user_roles (
+    user_id INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    FOREIGN KEY(user_id) REFERENCES user (id),
+    FOREIGN KEY(role_id) REFERENCES role (id)
+);
+
+CREATE TABLE wallet (
+    id INTEGER NOT NULL,
+    balance FLOAT,
+    user_id INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES user (id)
+);
+
+CREATE TABLE message (
+    id INTEGER NOT NULL,
+    content VARCHAR,
+    edited BOOLEAN,
+    sender INTEGER NOT NULL,
+    timestamp FLOAT,
+    conversation_id INTEGER,
+    PRIMARY KEY (id),
+    CHECK (edited IN (0, 1)),
+    FOREIGN KEY(conversation_id) REFERENCES conversation (id)
+);
+
+CREATE TABLE unit (
+    id INTEGER NOT NULL,
+    name VARCHAR NOT NULL,
+    board_id INTEGER,
+    estate_id INTEGER,
+    user_id INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(board_id) REFERENCES board (id),
+    FOREIGN KEY(estate_id) REFERENCES estate (id),
+    FOREIGN KEY(user_id) REFERENCES user (id)
+);
+
+CREATE TABLE user_conversations (
+    user_id INTEGER NOT NULL,
+    conversation_id INTEGER NOT NULL,
+    FOREIGN KEY(user_id) REFERENCES user (id),
+    FOREIGN KEY(conversation_id) REFERENCES conversation (id)
+);
+
+CREATE TABLE payment (
+    id INTEGER NOT NULL,
+    balance FLOAT,
+    required FLOAT,
+    estate_id INTEGER,
+    unit_id INTEGER,
+    wallet_id INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(estate_id) REFERENCES estate (id),
+    FOREIGN KEY(unit_id) REFERENCES unit (id),
+    FOREIGN KEY(wallet_id) REFERENCES wallet (id)
+);
+
+CREATE TABLE deposit (
+    id INTEGER NOT NULL,
+    amount FLOAT,
+    period_end FLOAT,
+    period_start FLOAT,
+    timestamp FLOAT,
+    payment_id INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(payment_id) REFERENCES payment (id)
+);
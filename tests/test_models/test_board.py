@@ -1,7 +1,8 @@
 # pylint:disable=missing-docstring, invalid-name
 
-from api.models import Board, Conversation, Estate, Unit, User
-from tests.base import BaseCase
+from api.models import (
+    db, BaseModel, Board, Conversation, Estate, Fields, Payment, Unit, User)
+from tests.base import BaseCase, QueryCounter
 
 
 class TestBoard(BaseCase):
@@ -19,6 +20,51 @@ class TestBoard(BaseCase):
         board1.remove('members', id=1)
         self.assertEqual(1, len(Board.get(id=1).members))
 
+    def add_users(self, number):
+        db.session.add_all([
+            User(name='User', password='password',
+                 phone_number='member-{}'.format(i),
+                 email='member.{}@email.com'.format(i))
+            for i in range(number)])
+        db.session.commit()
+
+    def count_membership_queries(self, board, add=(), remove=()):
+        db.session.expire_all()
+        with QueryCounter() as counter:
+            added = board.add_members(add)
+            removed = board.remove_members(remove)
+        self.assertTrue(added is True and removed is True)
+        return counter.count
+
+    def test_add_and_remove_members_in_bulk(self):
+        self.add_users(20)
+        self.board1.insert('conversation', self.conversation1)
+        board1 = Board.get(id=1)
+        few = self.count_membership_queries(board1, add=[1, 2])
+        many = self.count_membership_queries(board1, add=range(3, 21))
+        self.assertEqual(few, many)
+        self.assertEqual(20, len(board1.members))
+        self.assertEqual(20, len(board1.conversation.participants))
+        self.assertEqual(1, len(User.get(id=5).boards))
+        self.assertTrue(board1.add_members([1, 2]))
+        self.assertEqual(20, len(board1.members))
+        few = self.count_membership_queries(board1, remove=[1])
+        many = self.count_membership_queries(board1, remove=range(2, 20))
+        self.assertEqual(few, many)
+        self.assertEqual([20], [user.id for user in board1.members])
+        self.assertEqual(
+            [20], [user.id for user in board1.conversation.participants])
+
+    def test_bulk_members_must_be_valid(self):
+        self.add_users(2)
+        self.board1.save()
+        board1 = Board.get(id=1)
+        self.assertEqual([3], board1.add_members([1, 3])['missing'])
+        self.assertEqual([], board1.members)
+        self.assertEqual([1], board1.remove_members([1])['missing'])
+        self.assertTrue(board1.add_members([1, 2]))
+        self.assertEqual(2, len(board1.members))
+
     def test_get_board(self):
         self.board1.save()
         self.assertTrue(isinstance(Board.get(id=1), Board))
@@ -89,3 +135,155 @@ class TestBoard(BaseCase):
         board1.units_owned.append(Unit.get(id=1))
         self.assertEqual(True, Board.get(id=1).delete())
         self.assertEqual(True, isinstance(Board.get(id=1), dict))
+
+    def add_boards(self, number):
+        start = Board.query.count()
+        for i in range(start, start + number):
+            board = Board()
+            board.members.extend([
+                User(name='Member', password='password',
+                     phone_number='{}-{}'.format(i, j),
+                     email='{}.{}@email.com'.format(i, j))
+                for j in range(2)])
+            for j in range(2):
+                estate = Estate(address='Address', payment=Payment())
+                estate.estate_units.extend([
+                    Unit(name='Unit', board=board, payment=Payment(),
+                         resident=board.members[j]) for _ in range(2)])
+                board.estates_owned.append(estate)
+            db.session.add(board)
+        db.session.commit()
+
+    def count_view_queries(self, model, profile, fields=None):
+        fields = fields or Fields()
+        db.session.expire_all()
+        with QueryCounter() as counter:
+            objects, _ = model.get_page(profile=profile, fields=fields)
+            views = [i.view(fields) for i in objects]
+        return counter.count, views
+
+    def test_view_boards_queries_are_bounded(self):
+        self.add_boards(2)
+        few, _ = self.count_view_queries(Board, 'detail')
+        lazy, lazy_views = self.count_view_queries(Board, None)
+        self.add_boards(3)
+        many, views = self.count_view_queries(Board, 'detail')
+        self.assertEqual(few, many)
+        self.assertEqual(5, len(views))
+        self.assertLess(few, lazy)
+        self.assertEqual(lazy_views, views[:2])
+
+    def test_view_estates_queries_are_bounded(self):
+        self.add_boards(2)
+        few, _ = self.count_view_queries(Estate, 'detail')
+        self.add_boards(3)
+        many, views = self.count_view_queries(Estate, 'detail')
+        self.assertEqual(few, many)
+        self.assertEqual(10, len(views))
+        self.assertEqual(2, len(views[0]['units']))
+
+    def test_view_fields(self):
+        fields = Fields(['id', 'members'], ['estates_owned'])
+        self.assertTrue(fields.column('id'))
+        self.assertFalse(fields.column('address'))
+        self.assertTrue(fields.relation('members'))
+        self.assertTrue(fields.relation('estates_owned'))
+        self.assertFalse(fields.relation('units_owned'))
+        fields = Fields(expand=['board'])
+        self.assertTrue(fields.column('address'))
+        self.assertTrue(fields.relation('board'))
+        self.assertFalse(fields.relation('units'))
+        self.assertTrue(Fields().relation('units'))
+        self.assertEqual(
+            [['board'], ['board', 'members']],
+            Estate.loading_paths('detail', fields))
+        self.assertEqual(
+            ['estate_units'],
+            Estate.loading_paths('detail', Fields(['units']))[0])
+
+    def test_etag(self):
+        self.add_boards(2)
+        with QueryCounter() as counter:
+            etag = Estate.etag(1, 'detail')
+        self.assertEqual(1, counter.count)
+        self.assertEqual(etag, Estate.etag(1, 'detail'))
+        self.assertNotEqual(etag, Estate.etag(2, 'detail'))
+        self.assertNotEqual(etag, Estate.etag(1, 'detail', Fields(['id'])))
+        self.assertIsNone(Estate.etag(100, 'detail'))
+        Unit.get(id=1).update({'name': 'Renamed'})
+        self.assertNotEqual(etag, Estate.etag(1, 'detail'))
+        etag = Board.etag(1, 'detail')
+        Board.get(id=1).remove_members([Board.get(id=1).members[0].id])
+        self.assertNotEqual(etag, Board.etag(1, 'detail'))
+
+    def cached(self, model, ident):
+        return model.cached_view(ident, model.etag(ident, 'detail'))
+
+    def test_views_are_cached_until_rendered_rows_change(self):
+        self.add_boards(2)
+        for model in (Board, Estate, Unit):
+            self.assertIsNone(self.cached(model, 1))
+            view = model.get(id=1).render()
+            self.assertEqual(view, self.cached(model, 1))
+        self.assertIsNone(
+            Board.cached_view(1, Board.etag(1, 'detail'), Fields(['id'])))
+        Board.get(id=2).render()
+        Unit.get(id=1).update({'name': 'Renamed'})
+        for model in (Board, Estate, Unit):
+            self.assertIsNone(self.cached(model, 1))
+        self.assertIsNotNone(self.cached(Board, 2))
+        self.assertEqual(
+            'Renamed', Board.get(id=1).render()['units_owned'][0]['name'])
+
+    def test_views_cached_before_other_writes_are_not_used(self):
+        self.add_boards(1)
+        view = Estate.get(id=1).render()
+        db.session.execute(
+            "UPDATE estate SET address = 'Moved', version = version + 1 "
+            "WHERE id = 1")
+        db.session.commit()
+        self.assertIsNone(self.cached(Estate, 1))
+        self.assertEqual(view, Estate.fragment_cache.get('estate:1')[1])
+        self.assertEqual('Moved', Estate.get(id=1).render()['address'])
+        self.assertEqual('Moved', self.cached(Estate, 1)['address'])
+
+    def test_batches_evict_views_when_committed(self):
+        self.add_boards(1)
+        Board.get(id=1).render()
+        with BaseModel.batch():
+            Unit.get(id=1).update({'name': 'Renamed'})
+            self.assertIsNotNone(Board.fragment_cache.get('board:1'))
+        self.assertIsNone(Board.fragment_cache.get('board:1'))
+        Board.get(id=1).render()
+        with self.assertRaises(ValueError):
+            with BaseModel.batch():
+                Unit.get(id=1).update({'name': 'Discarded'})
+                raise ValueError
+        self.assertIsNotNone(Board.fragment_cache.get('board:1'))
+        self.assertNotIn('evict', db.session.info)
+
+    def test_moving_objects_evicts_both_owners(self):
+        self.add_boards(2)
+        Board.get(id=1).render()
+        Board.get(id=2).render()
+        Board.get(id=2).insert('estates_owned', Estate.get(id=1))
+        self.assertIsNone(self.cached(Board, 1))
+        self.assertIsNone(self.cached(Board, 2))
+        Board.get(id=1).render()
+        Board.get(id=1).remove_members([1])
+        self.assertIsNone(self.cached(Board, 1))
+        self.assertEqual(1, len(Board.get(id=1).render()['members']))
+
+    def test_unrendered_relations_are_not_queried(self):
+        self.add_boards(2)
+        full, _ = self.count_view_queries(Estate, 'detail')
+        sparse, views = self.count_view_queries(
+            Estate, 'detail', Fields(['id', 'address']))
+        self.assertEqual(1, sparse)
+        self.assertLess(sparse, full)
+        self.assertEqual({'id': 1, 'address': 'Address'}, views[0])
+        expanded, views = self.count_view_queries(
+            Estate, 'detail', Fields(expand=['board']))
+        self.assertEqual(2, expanded)
+        self.assertEqual(
+            ['address', 'board', 'board_id', 'id'], sorted(views[0]))
@@ -1,6 +1,6 @@
 # pylint:disable=missing-docstring, invalid-name
 
-from api.models import Conversation, Message
+from api.models import Conversation, Message, User
 from tests.base import BaseCase
 
 
@@ -56,3 +56,13 @@ class TestConversation(BaseCase):
         conversation1 = Conversation.get(id=1)
         self.assertTrue(conversation1.delete())
         self.assertFalse(Conversation.check_exists(id=1))
+
+    def test_conversations_of_participant(self):
+        self.user1.save()
+        self.user2.save()
+        self.conversation1.save()
+        self.conversation2.save()
+        User.get(id=1).insert('conversations', Conversation.get(id=2))
+        self.assertEqual(
+            [2], [i.id for i in Conversation.of_participant(1).all()])
+        self.assertEqual([], Conversation.of_participant(2).all())
@@ -1,5 +1,7 @@
 # pylint:disable=missing-docstring, invalid-name
 
+from time import time
+
 from api.models import Deposit, Payment
 from tests.base import BaseCase
 
@@ -9,6 +11,13 @@ class TestDeposit(BaseCase):
     def test_save_deposit(self):
         self.assertTrue(self.deposit1.save())
 
+    def test_deposit_times_default_to_when_it_is_saved(self):
+        start = time()
+        self.deposit1.save()
+        deposit1 = Deposit.get(id=1)
+        for key in ('period_end', 'period_start', 'timestamp'):
+            self.assertGreaterEqual(getattr(deposit1, key), start)
+
     def test_get_deposit(self):
         self.assertEqual(True, isinstance(Deposit.get(id=1), dict))
         self.deposit1.save()
@@ -17,8 +26,8 @@ class TestDeposit(BaseCase):
     def test_view_deposit(self):
         self.deposit1.save()
         deposit1 = Deposit.get(id=1)
-        expected = ['id', 'amount', 'period_end',
-                    'period_start', 'timestamp', 'payment_id']
+        expected = ['id', 'amount', 'period_end', 'period_start',
+                    'timestamp', 'idempotency_key', 'payment_id']
         actual = list(deposit1.view().keys())
         self.assertEqual(expected, actual)
 
@@ -0,0 +1,180 @@
+# pylint:disable=missing-docstring, invalid-name
+
+from importlib.util import module_from_spec, spec_from_file_location
+from os import listdir
+from os.path import dirname, join
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import event, inspect
+
+from api.models import (
+    db, Board, Conversation, Deposit, Estate, Message, Payment, Role, Unit,
+    User, Wallet)
+from tests.base import BaseCase
+
+VERSIONS = join(dirname(dirname(dirname(__file__))), 'migrations',
+                'versions')
+BASELINE = join(dirname(__file__), 'baseline_schema.sql')
+
+
+def load_revision(name='5c1d0a6e8f21_add_lookup_indexes'):
+    spec = spec_from_file_location(name, join(VERSIONS, name + '.py'))
+    revision = module_from_spec(spec)
+    spec.loader.exec_module(revision)
+    return revision
+
+
+def revisions():
+    """Load every revision, ordered from the first to the head."""
+    loaded = {}
+    for name in listdir(VERSIONS):
+        if name.endswith('.py'):
+            revision = load_revision(name[:-3])
+            loaded[revision.down_revision] = revision
+    ordered, current = [], None
+    while current in loaded:
+        ordered.append(loaded[current])
+        current = loaded[current].revision
+    return ordered
+
+
+class TestIndexes(BaseCase):
+
+    def add_graph(self):
+        user = User(name='User', password='password', phone_number='1',
+                    email='user@email.com', roles=[Role(title='basic')],
+                    wallet=Wallet())
+        board = Board(members=[user])
+        estate = Estate(address='Address', board=board, payment=Payment())
+        unit = Unit(name='Unit', board=board, estate=estate, resident=user,
+                    payment=Payment(deposits=[Deposit()]))
+        conversation = Conversation(board=board, participants=[user])
+        conversation.messages.append(Message(sender=1, content='Hi'))
+        db.session.add_all([unit, conversation])
+        db.session.commit()
+
+    def explain(self, load):
+        """Get the query plans of the statements a load runs."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, *args):
+            statements.append((statement, parameters))
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            load()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        cursor = db.session.connection().connection.cursor()
+        return [
+            [row[-1] for row in cursor.execute(
+                'EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()]
+            for statement, parameters in statements]
+
+    def test_relationship_loads_use_indexes(self):
+        self.add_graph()
+        loads = {
+            'board.members': lambda: Board.query.get(1).members,
+            'board.estates_owned': lambda: Board.query.get(1).estates_owned,
+            'board.units_owned': lambda: Board.query.get(1).units_owned,
+            'board.conversation': lambda: Board.query.get(1).conversation,
+            'estate.estate_units': lambda: Estate.query.get(1).estate_units,
+            'estate.payment': lambda: Estate.query.get(1).payment,
+            'unit.payment': lambda: Unit.query.get(1).payment,
+            'payment.deposits': lambda: Payment.query.get(2).deposits,
+            'conversation.messages':
+                lambda: Conversation.query.get(1).messages,
+            'conversation.participants':
+                lambda: Conversation.query.get(1).participants,
+            'user.boards': lambda: User.query.get(1).boards,
+            'user.roles': lambda: User.query.get(1).roles,
+            'user.units': lambda: User.query.get(1).units,
+            'user.wallet': lambda: User.query.get(1).wallet,
+            'role.users': lambda: Role.query.get(1).users,
+            'wallet.payments': lambda: Wallet.query.get(1).payments,
+            'role by title':
+                lambda: Role.query.filter_by(title='basic').first()
+        }
+        for name, load in loads.items():
+            for plan in self.explain(load):
+                self.assertFalse(
+                    [step for step in plan if step.startswith('SCAN')],
+                    '{} scans: {}'.format(name, plan))
+
+    def upgrade(self, revision):
+        """Run a revision's upgrade twice, as it should be idempotent."""
+        for _ in range(2):
+            context = MigrationContext.configure(db.session.connection())
+            with Operations.context(context):
+                revision.upgrade()
+            db.session.commit()
+
+    def test_revision_adds_missing_indexes_and_keys(self):
+        db.session.execute('DROP INDEX ix_unit_board_id')
+        db.session.execute('DROP TABLE user_roles')
+        db.session.execute(
+            'CREATE TABLE user_roles (user_id INTEGER NOT NULL, '
+            'role_id INTEGER NOT NULL)')
+        db.session.execute(
+            'INSERT INTO user_roles VALUES (1, 1), (1, 1), (1, 2)')
+        db.session.commit()
+        self.upgrade(load_revision())
+        inspector = inspect(db.engine)
+        self.assertIn('ix_unit_board_id', [
+            index['name'] for index in inspector.get_indexes('unit')])
+        self.assertIn('ix_user_roles_role_id', [
+            index['name'] for index in inspector.get_indexes('user_roles')])
+        self.assertEqual(
+            ['user_id', 'role_id'],
+            inspector.get_pk_constraint('user_roles')['constrained_columns'])
+        self.assertEqual(
+            [(1, 1), (1, 2)],
+            sorted(db.session.execute('SELECT * FROM user_roles')))
+
+    def test_revision_downgrade_drops_its_indexes(self):
+        revision = load_revision()
+        self.upgrade(revision)
+        context = MigrationContext.configure(db.session.connection())
+        with Operations.context(context):
+            revision.downgrade()
+        db.session.commit()
+        inspector = inspect(db.engine)
+        for table in inspector.get_table_names():
+            self.assertEqual([], [
+                index['name'] for index in inspector.get_indexes(table)
+                if not index['unique']], table)
+
+    def test_upgrade_baseline_database_to_head(self):
+        db.drop_all()
+        with open(BASELINE) as schema:
+            db.session.connection().connection.executescript(schema.read())
+        db.session.execute(
+            "INSERT INTO user (name, password, phone_number, email) "
+            "VALUES ('User', 'password', '1', 'user@email.com')")
+        db.session.execute("INSERT INTO role (title) VALUES ('basic')")
+        db.session.execute('INSERT INTO user_roles VALUES (1, 1), (1, 1)')
+        db.session.execute('INSERT INTO deposit (amount) VALUES (1), (2)')
+        db.session.commit()
+        for revision in revisions():
+            self.upgrade(revision)
+        inspector = inspect(db.engine)
+        for table in inspector.get_table_names():
+            if table in db.metadata.tables:
+                self.assertEqual(
+                    sorted(db.metadata.tables[table].columns.keys()),
+                    sorted(column['name']
+                           for column in inspector.get_columns(table)),
+                    table)
+        self.assertIn(
+            {'name': 'ix_deposit_idempotency_key', 'unique': 1,
+             'column_names': ['idempotency_key']},
+            inspector.get_indexes('deposit'))
+        user = User.query.get(1)
+        self.assertEqual((1, ['basic']),
+                         (user.version, [role.title for role in user.roles]))
+        self.assertEqual(
+            [None, None],
+            [deposit.idempotency_key for deposit in Deposit.query])
+        user.update({'name': 'Renamed'})
+        self.assertEqual(2, User.query.get(1).version)
@@ -1,6 +1,6 @@
 # pylint:disable=missing-docstring, invalid-name
 
-from api.models import Message
+from api.models import Conversation, Message, User
 from tests.base import BaseCase
 
 
@@ -44,3 +44,25 @@ class TestMessage(BaseCase):
         self.assertEqual('new_content', Message.get(id=1).content)
         self.assertTrue(isinstance(
             message1.update({'random': 'bad field'}), dict))
+
+    def test_messages_of_participant(self):
+        self.user1.save()
+        self.user2.save()
+        User.get(id=1).insert('conversations', self.conversation1)
+        Conversation.get(id=1).insert('messages', self.message1)
+        self.conversation2.save()
+        Conversation.get(id=2).insert('messages', self.message2)
+        self.assertEqual([1], [i.id for i in Message.of_participant(1).all()])
+        self.assertEqual([], Message.of_participant(2).all())
+
+    def test_history_malformed_cursor(self):
+        self.user1.save()
+        User.get(id=1).insert('conversations', self.conversation1)
+        Conversation.get(id=1).insert('messages', self.message1)
+        messages, next_cursor = Message.history(1, 1)
+        self.assertEqual([1], [i.id for i in messages])
+        self.assertEqual(([], None), Message.history(
+            1, 1, before=messages[0].cursor))
+        for cursor in ['garbage', '1.5', '1.5:x', 'a:1', '1:2:3']:
+            self.assertTrue(isinstance(
+                Message.history(1, 1, before=cursor), dict))
@@ -0,0 +1,33 @@
+# pylint:disable=missing-docstring, invalid-name
+
+from time import time
+
+from api.models import PendingDeposit
+from tests.base import BaseCase
+
+
+class TestPendingDeposit(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pending1 = PendingDeposit(
+            idempotency_key='a', amount=10, payment_id=1)
+
+    def test_save_pending_deposit(self):
+        start = time()
+        self.assertTrue(self.pending1.save())
+        pending1 = PendingDeposit.get(idempotency_key='a')
+        self.assertGreaterEqual(pending1.timestamp, start)
+        self.assertEqual(None, pending1.error)
+
+    def test_pending_deposit_keys_are_unique(self):
+        self.pending1.save()
+        self.assertTrue(isinstance(PendingDeposit(
+            idempotency_key='a', amount=5, payment_id=1).save(), dict))
+
+    def test_view_pending_deposit(self):
+        self.pending1.save()
+        expected = ['id', 'amount', 'period_end', 'period_start', 'timestamp',
+                    'idempotency_key', 'payment_id', 'error']
+        self.assertEqual(
+            expected, list(PendingDeposit.get(id=1).view().keys()))
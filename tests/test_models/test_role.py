@@ -1,7 +1,7 @@
 # pylint:disable=missing-docstring, invalid-name
 
 from api.models import Role, User
-from tests.base import BaseCase
+from tests.base import BaseCase, QueryCounter
 
 
 class TestRole(BaseCase):
@@ -24,6 +24,33 @@ class TestRole(BaseCase):
         self.assertEqual(True, isinstance(Role.get_all()[1], Role))
         self.assertEqual(3, len(Role.get_all()))
 
+    def test_role_registry(self):
+        self.role1.save()
+        self.role2.save()
+        self.assertEqual(2, Role.id_of('admin'))
+        with QueryCounter() as counter:
+            self.assertEqual(1, Role.id_of('basic'))
+            self.assertIsNone(Role.id_of('landlord'))
+            self.assertEqual(['basic', 'admin'], Role.titles(0b110))
+        self.assertEqual(0, counter.count)
+        self.role3.save()
+        self.assertEqual(3, Role.id_of('super_admin'))
+        self.assertEqual(0b1010, Role.mask([1, 3]))
+        self.assertEqual(['basic', 'super_admin'], Role.titles(0b1010))
+
+    def test_rendered_role_lists_are_cached(self):
+        self.role1.save()
+        self.role2.save()
+        roles = Role.get_all()
+        rendered = Role.rendered_list(roles)
+        self.assertEqual(
+            ({'id': 1, 'title': 'basic'}, {'id': 2, 'title': 'admin'}),
+            rendered)
+        self.assertIs(rendered, Role.rendered_list(roles))
+        roles[1].update({'title': 'landlord'})
+        self.assertEqual(
+            'landlord', Role.rendered_list(Role.get_all())[1]['title'])
+
     def test_role_exists(self):
         self.assertFalse(Role.check_exists(id=1))
         self.role1.save()
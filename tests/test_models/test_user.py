@@ -1,7 +1,9 @@
 # pylint:disable=missing-docstring, invalid-name
 
-from api.models import Board, Conversation, Role, User
-from tests.base import BaseCase
+from sqlalchemy import event
+
+from api.models import db, BaseModel, Board, Conversation, Role, User
+from tests.base import BaseCase, QueryCounter
 
 
 class TestUser(BaseCase):
@@ -21,6 +23,81 @@ class TestUser(BaseCase):
         self.user2.save()
         self.assertEqual(2, len(User.get_all()))
 
+    def test_get_page_of_users(self):
+        self.assertTrue(isinstance(User.get_page(), dict))
+        self.user1.save()
+        self.user2.save()
+        users, next_id = User.get_page(limit=1)
+        self.assertEqual([1], [user.id for user in users])
+        self.assertEqual(1, next_id)
+        users, next_id = User.get_page(after_id=next_id, limit=1)
+        self.assertEqual([2], [user.id for user in users])
+        self.assertEqual(None, next_id)
+        self.assertEqual(([], None), User.get_page(after_id=2))
+
+    def test_lookup_user(self):
+        self.assertTrue(isinstance(User.lookup(1), dict))
+        self.user1.save()
+        with QueryCounter() as counter:
+            self.assertIs(self.user1, User.lookup(1))
+        self.assertEqual(0, counter.count)
+        db.session.remove()
+        User.lookup(1)
+        db.session.remove()
+        with QueryCounter() as counter:
+            user1 = User.lookup(1)
+            self.assertEqual('First1 Middle1 Last1', user1.name)
+        self.assertEqual(0, counter.count)
+        self.assertEqual(0, len(user1.boards))
+
+    def test_lookup_user_cache_is_invalidated(self):
+        self.user1.save()
+        db.session.remove()
+        User.lookup(1).update(self.user_new_data1)
+        self.assertEqual(None, User.row_cache.get(1))
+        db.session.remove()
+        self.assertEqual('000 12 3456783', User.lookup(1).phone_number)
+        User.lookup(1).delete()
+        self.assertTrue(isinstance(User.lookup(1), dict))
+
+    def test_batch_commits_once(self):
+        commits = []
+        session = db.session()
+        record = commits.append
+        event.listen(session, 'after_commit', record)
+        with BaseModel.batch() as batch:
+            self.user1.insert('roles', self.role1)
+            self.user1.insert('wallet', self.wallet1)
+            with BaseModel.batch():
+                self.assertEqual(1, self.user1.save())
+            self.assertEqual([], commits)
+        event.remove(session, 'after_commit', record)
+        self.assertEqual(1, len(commits))
+        self.assertFalse(batch.failed)
+        db.session.remove()
+        user1 = User.get(id=1)
+        self.assertEqual(['basic'], [role.title for role in user1.roles])
+        self.assertEqual(1, user1.wallet.id)
+
+    def test_batch_rolls_back_on_exception(self):
+        with self.assertRaises(ValueError):
+            with BaseModel.batch():
+                self.user1.save()
+                raise ValueError
+        self.assertTrue(isinstance(User.get_all(), dict))
+        self.assertEqual(1, self.user2.save())
+
+    def test_batch_rolls_back_when_a_write_fails(self):
+        with BaseModel.batch() as batch:
+            self.user1.save()
+            self.assertTrue(isinstance(self.user3.save(), dict))
+            with BaseModel.batch() as nested:
+                self.role1.save()
+        self.assertTrue(batch.failed)
+        self.assertIs(batch, nested)
+        self.assertTrue(isinstance(User.get_all(), dict))
+        self.assertTrue(isinstance(Role.get_all(), dict))
+
     def test_check_user_exists(self):
         self.user1.save()
         self.assertEqual(True, User.check_exists(id=1))
@@ -56,6 +133,26 @@ class TestUser(BaseCase):
         self.assertTrue(isinstance(actual[0], User))
         self.assertTrue(isinstance(actual[1], User))
 
+    def test_search_user_limit_and_offset(self):
+        self.user1.save()
+        self.user2.save()
+        actual = User.search(limit=1, name='Middle')
+        self.assertEqual(1, len(actual))
+        self.assertEqual(1, actual[0].id)
+        actual = User.search(limit=1, offset=1, name='Middle')
+        self.assertEqual(1, len(actual))
+        self.assertEqual(2, actual[0].id)
+        self.assertEqual(1, User.search(offset=-1, name='Middle')[0].id)
+        users, next_offset = User.search_page(limit=1, name='Middle')
+        self.assertEqual((1, 1), (users[0].id, next_offset))
+        self.assertIsNone(User.search_page(offset=1, name='Middle')[1])
+
+    def test_search_user_wildcards_are_literal(self):
+        self.user1.save()
+        self.assertTrue(isinstance(User.search(name='%'), dict))
+        self.assertTrue(isinstance(User.search(name='First_'), dict))
+        self.assertEqual(1, len(User.search(name='first1')))
+
     def test_update_user(self):
         self.user1.save()
         user1 = User.get(id=1)
@@ -63,12 +160,37 @@ class TestUser(BaseCase):
         self.assertEqual('000 12 3456783', User.get(id=1).phone_number)
         self.assertTrue(isinstance(user1.update(self.user_new_data2), dict))
 
+    def test_update_user_bumps_version(self):
+        self.user1.save()
+        self.assertEqual(1, User.get(id=1).version)
+        User.get(id=1).update({'name': 'New Name', 'version': 10})
+        self.assertEqual(2, User.get(id=1).version)
+
+    def test_update_outdated_user_fails(self):
+        self.user1.save()
+        user1 = User.get(id=1)
+        db.session.execute('UPDATE user SET version = 5 WHERE id = 1')
+        result = user1.update({'name': 'New Name'})
+        self.assertEqual(
+            'The object was changed by another request.', result['message'])
+        self.assertEqual('First1 Middle1 Last1', User.get(id=1).name)
+
     def test_serialize_user_object(self):
         self.user1.save()
         excepted = sorted(['id', 'name', 'password', 'phone_number', 'email'])
         actual = sorted([key for key in User.get(id=1).serialize()])
         self.assertEqual(excepted, actual)
 
+    def test_serializers_are_compiled_once(self):
+        self.user1.save()
+        user1 = User.get(id=1)
+        self.assertIs(User.serializer('summary'), User.serializer('summary'))
+        self.assertIsNot(User.serializer(), Board.serializer())
+        self.assertEqual(
+            user1.serialize('summary'), User.serializer('summary')(user1))
+        self.assertNotIn('password', user1.serialize('summary'))
+        self.assertRaises(KeyError, User.serializer, 'random')
+
     def test_repr_user(self):
         self.user1.save()
         excepted = {
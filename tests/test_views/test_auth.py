@@ -2,7 +2,9 @@
 
 from json import dumps, loads
 
-from tests.base import BaseCase
+from api.helpers.ratelimit import init_rate_limits
+from api.models import User
+from tests.base import BaseCase, QueryCounter
 
 
 class TestAuth(BaseCase):
@@ -64,3 +66,54 @@ class TestAuth(BaseCase):
         expected = 'Welcome to Real Estate Manager.'
         self.assertEqual(expected, loads(response.data)['data']['message'])
         self.assertEqual(200, response.status_code)
+
+    def test_sign_in_upgrades_legacy_password(self):
+        self.user1.save()
+        data = dumps({'email': 'first1.last1@email.com',
+                      'password': 'ABC123!@#'})
+        response = self.client.post(
+            '/api/v1/signin/', content_type='application/json', data=data)
+        self.assertEqual(200, response.status_code)
+        stored = User.get(id=1).password
+        self.assertTrue(stored.startswith('pbkdf2_sha256$'))
+        response = self.client.post(
+            '/api/v1/signin/', content_type='application/json', data=data)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(stored, User.get(id=1).password)
+
+    def test_sign_in_is_rate_limited(self):
+        self.user1.save()
+        self.app.config['RATE_LIMITS'] = {'signin_email': (2, 60)}
+        init_rate_limits(self.app)
+        data = dumps({'email': 'First1.Last1@email.com', 'password': 'x'})
+        for _ in range(2):
+            response = self.client.post(
+                '/api/v1/signin/', content_type='application/json',
+                data=data)
+            self.assertEqual(404, response.status_code)
+        with QueryCounter() as counter:
+            response = self.client.post(
+                '/api/v1/signin/', content_type='application/json',
+                data=dumps({'email': 'first1.last1@email.com',
+                            'password': 'ABC123!@#'}))
+        self.assertEqual(0, counter.count)
+        self.assertEqual(429, response.status_code)
+        self.assertEqual('30', response.headers['Retry-After'])
+        self.assertEqual(
+            'Too many sign in attempts.', loads(response.data)['message'])
+        response = self.client.post(
+            '/api/v1/signin/', content_type='application/json',
+            data=dumps({'email': 'first2.last2@email.com', 'password': 'x'}))
+        self.assertEqual(404, response.status_code)
+
+    def test_sign_in_is_rate_limited_per_forwarded_address(self):
+        self.app.config['PROXY_COUNT'] = 1
+        self.app.config['RATE_LIMITS'] = {'signin_address': (1, 60)}
+        init_rate_limits(self.app)
+        data = dumps({'email': 'first1.last1@email.com', 'password': 'x'})
+        codes = [self.client.post(
+            '/api/v1/signin/', content_type='application/json', data=data,
+            headers={'X-Forwarded-For': address}).status_code
+            for address in ('10.0.0.1', '10.0.0.1', '10.0.0.2',
+                            '10.0.0.3, 10.0.0.2')]
+        self.assertEqual([404, 429, 404, 429], codes)
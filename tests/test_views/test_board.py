@@ -2,7 +2,8 @@
 
 from json import dumps, loads
 
-from api.models import Board, Unit, User
+from api.models import Board, Payment, Unit, User
+from api.models.base import rollback
 from tests.base import BaseCase
 
 
@@ -24,6 +25,32 @@ class TestBoard(BaseCase):
         self.assertEqual(201, response.status_code)
         self.assertEqual(expected, actual)
 
+    def test_create_board_failed_write(self):
+        self.user1.save()
+        self.user2.save()
+
+        def failing_insert(*_):
+            rollback()
+            return {'message': 'The write failed.'}
+
+        Board.insert = failing_insert
+        try:
+            response = self.client.post(
+                '/api/v1/boards/',
+                content_type='application/json',
+                data=dumps(self.board3_dict),
+                headers=self.headers)
+        finally:
+            del Board.insert
+        expected = {
+            'status': 'fail',
+            'message': 'The board could not be created.',
+            'help': 'Ensure the members still exist.'
+        }
+        self.assertEqual(409, response.status_code)
+        self.assertEqual(expected, loads(response.data))
+        self.assertTrue(isinstance(Board.get_all(), dict))
+
     def test_create_board_no_members(self):
         response = self.client.post(
             '/api/v1/boards/',
@@ -64,6 +91,53 @@ class TestBoard(BaseCase):
         self.assertEqual(200, response.status_code)
         self.assertEqual(expected, actual)
 
+    def test_view_board_not_modified(self):
+        self.board1.save()
+        response = self.client.get('/api/v1/boards/1', headers=self.headers)
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        headers = dict(self.headers, **{'If-None-Match': etag})
+        response = self.client.get('/api/v1/boards/1', headers=headers)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.data)
+        self.assertEqual(etag, response.headers['ETag'])
+        response = self.client.get(
+            '/api/v1/boards/1?fields=id', headers=headers)
+        self.assertEqual(200, response.status_code)
+
+    def test_view_board_modified(self):
+        self.board1.save()
+        self.user1.save()
+        response = self.client.get('/api/v1/boards/1', headers=self.headers)
+        headers = dict(self.headers, **{
+            'If-None-Match': response.headers['ETag']})
+        Board.get(id=1).add_members([1])
+        response = self.client.get('/api/v1/boards/1', headers=headers)
+        self.assertEqual(200, response.status_code)
+        headers['If-None-Match'] = response.headers['ETag']
+        User.get(id=1).update({'name': 'Renamed'})
+        response = self.client.get('/api/v1/boards/1', headers=headers)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            'Renamed',
+            loads(response.data)['data']['board']['members'][0]['name'])
+
+    def test_view_board_cached(self):
+        self.board1.save()
+        self.user1.save()
+        first = loads(self.client.get(
+            '/api/v1/boards/1', headers=self.headers).data)
+        self.assertEqual(
+            first['data']['board'],
+            Board.cached_view(1, Board.etag(1, 'detail')))
+        second = loads(self.client.get(
+            '/api/v1/boards/1', headers=self.headers).data)
+        self.assertEqual(first, second)
+        Board.get(id=1).insert('members', User.get(id=1))
+        response = self.client.get('/api/v1/boards/1', headers=self.headers)
+        self.assertEqual(
+            1, len(loads(response.data)['data']['board']['members']))
+
     def test_view_many_boards(self):
         self.board1.save()
         self.board2.save()
@@ -80,6 +154,24 @@ class TestBoard(BaseCase):
         self.assertEqual(expected, actual1)
         self.assertEqual(expected, actual2)
 
+    def test_stream_many_boards(self):
+        self.user1.save()
+        self.board1.save()
+        self.board2.save()
+        Board.get(id=1).insert('members', User.get(id=1))
+        paged = self.client.get('/api/v1/boards/?limit=100')
+        response = self.client.get('/api/v1/boards/?stream=true')
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.is_streamed)
+        expected = loads(paged.data)
+        del expected['next']
+        self.assertEqual(expected, loads(response.data))
+
+    def test_stream_many_boards_if_none_exist(self):
+        response = self.client.get('/api/v1/boards/?stream=true')
+        self.assertEqual(404, response.status_code)
+        self.assertEqual('No boards exist.', loads(response.data)['message'])
+
     def test_view_many_boards_if_none_exist(self):
         response = self.client.get(
             '/api/v1/boards/',
@@ -236,6 +328,24 @@ class TestBoard(BaseCase):
         actual = loads(response.data)
         self.assertEqual(expected, actual)
 
+    def test_stream_board_units(self):
+        self.board1.save()
+        self.board2.save()
+        for unit in (self.unit1, self.unit2):
+            unit.insert('board', Board.get(id=1))
+            unit.insert('estate', self.estate1)
+            unit.insert('payment', Payment())
+            unit.insert('resident', self.user1)
+        self.unit3.name = 'Random Unit 3'
+        self.unit3.insert('board', Board.get(id=2))
+        expected = loads(self.client.get('/api/v1/boards/1/units/').data)
+        response = self.client.get('/api/v1/boards/1/units/?stream=1')
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(expected, loads(response.data))
+        self.assertEqual(2, len(expected['data']['units']))
+        response = self.client.get('/api/v1/boards/3/units/?stream=1')
+        self.assertEqual(404, response.status_code)
+
     def test_get_board_units(self):
         self.unit1.save()
         self.board1.save()
@@ -367,6 +477,21 @@ class TestBoard(BaseCase):
         actual = loads(response.data)
         self.assertDictEqual(expected, actual)
 
+    def test_add_and_remove_board_members_is_atomic(self):
+        self.board1.save()
+        self.user1.save()
+        self.user2.save()
+        board1 = Board.get(id=1)
+        board1.insert('conversation', self.conversation1)
+        board1.insert('members', User.get(id=1))
+        response = self.client.patch(
+            '/api/v1/boards/1/members/',
+            headers=self.headers,
+            content_type='application/json',
+            data=dumps({'new_data': {'add': [2], 'remove': [3]}}))
+        self.assertEqual(400, response.status_code)
+        self.assertEqual([1], [user.id for user in Board.get(id=1).members])
+
     def test_add_board_members_no_data(self):
         response = self.client.patch(
             '/api/v1/boards/1/members/',
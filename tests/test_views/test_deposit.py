@@ -0,0 +1,94 @@
+# pylint:disable=missing-docstring, invalid-name
+
+from json import dumps, loads
+
+from api.helpers.deposits import drain_deposits
+from api.models import Payment, PendingDeposit, Wallet, db
+from tests.base import BaseCase
+
+
+class TestDeposit(BaseCase):
+    """
+    Deposit resource tests.
+    """
+
+    def post_deposits(self, deposits, headers=None):
+        return self.client.post(
+            '/api/v1/deposits/', content_type='application/json',
+            headers=self.headers if headers is None else headers,
+            data=dumps({'deposits': deposits}))
+
+    def setUp(self):
+        super().setUp()
+        db.session.add(Payment(wallet=Wallet()))
+        db.session.commit()
+        self.deposit_rows = [
+            {'payment_id': 1, 'amount': 10, 'idempotency_key': 'a'},
+            {'payment_id': 1, 'amount': 5.5, 'idempotency_key': 'b'},
+            {'payment_id': 2, 'amount': 1, 'idempotency_key': 'c'}]
+
+    def test_post_deposits(self):
+        response = self.post_deposits(self.deposit_rows)
+        self.assertEqual(202, response.status_code)
+        data = loads(response.data)['data']
+        self.assertEqual((2, 0), (data['queued'], data['skipped']))
+        self.assertEqual([3], [error['row'] for error in data['errors']])
+        self.assertEqual(2, PendingDeposit.query.count())
+        self.assertEqual(0.0, Payment.query.get(1).balance)
+        response = self.post_deposits(self.deposit_rows[:2])
+        self.assertEqual(
+            (0, 2), (loads(response.data)['data']['queued'],
+                     loads(response.data)['data']['skipped']))
+        drain_deposits()
+        response = self.post_deposits(self.deposit_rows[:2])
+        self.assertEqual(2, loads(response.data)['data']['skipped'])
+        self.assertEqual(15.5, Payment.query.get(1).balance)
+        self.assertEqual(15.5, Wallet.query.get(1).balance)
+
+    def test_view_deposit_by_key(self):
+        self.post_deposits(self.deposit_rows)
+        response = self.client.get(
+            '/api/v1/deposits/b', headers=self.headers)
+        self.assertEqual(200, response.status_code)
+        data = loads(response.data)['data']
+        self.assertEqual(
+            ('pending', 5.5, 1),
+            (data['state'], data['deposit']['amount'],
+             data['deposit']['payment_id']))
+        drain_deposits()
+        response = self.client.get(
+            '/api/v1/deposits/b/', headers=self.headers)
+        self.assertEqual('applied', loads(response.data)['data']['state'])
+        response = self.client.get(
+            '/api/v1/deposits/c', headers=self.headers)
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(
+            'No deposit was submitted with the key.',
+            loads(response.data)['message'])
+        response = self.client.get('/api/v1/deposits/b')
+        self.assertEqual(400, response.status_code)
+
+    def test_deposit_routes_take_a_key_only_to_view(self):
+        response = self.client.get('/api/v1/deposits/', headers=self.headers)
+        self.assertEqual(405, response.status_code)
+        response = self.client.post(
+            '/api/v1/deposits/a', content_type='application/json',
+            headers=self.headers,
+            data=dumps({'deposits': self.deposit_rows}))
+        self.assertEqual(405, response.status_code)
+        self.assertEqual(0, PendingDeposit.query.count())
+
+    def test_post_invalid_deposits(self):
+        response = self.post_deposits(self.deposit_rows[2:])
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(
+            'No deposits were accepted.', loads(response.data)['message'])
+        response = self.post_deposits([])
+        self.assertEqual(
+            'A list of deposits is required.',
+            loads(response.data)['message'])
+
+    def test_post_deposits_without_token(self):
+        response = self.post_deposits(self.deposit_rows, headers={})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(0.0, Payment.query.get(1).balance)
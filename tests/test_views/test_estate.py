@@ -2,7 +2,7 @@
 
 from json import dumps, loads
 
-from api.models import Board, Estate, Payment
+from api.models import db, Board, Deposit, Estate, Payment
 from tests.base import BaseCase
 
 
@@ -77,10 +77,42 @@ class TestEstate(BaseCase):
                      'board': {'id': 1, 'members': []},
                      'payment': {
                          'id': 1, 'required': 0.0, 'balance': 0.0},
-                        'units': []}]}}
+                        'units': []}]},
+            'next': None}
         actual = loads(response.data)
         self.assertDictEqual(expected, actual)
 
+    def test_stream_estates(self):
+        self.estate1.save()
+        self.estate2.save()
+        self.board1.save()
+        Estate.get(id=1).insert('board', Board.get(id=1))
+        Estate.get(id=2).insert('payment', self.payment1)
+        expected = loads(self.client.get('/api/v1/estates/').data)
+        del expected['next']
+        response = self.client.get('/api/v1/estates/?stream=true')
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(expected, loads(response.data))
+
+    def test_view_estates_sparse_fields(self):
+        self.estate1.save()
+        self.board1.save()
+        Estate.get(id=1).insert('board', Board.get(id=1))
+        response = self.client.get('/api/v1/estates/?fields=id,address')
+        self.assertEqual(
+            [{'id': 1, 'address': 'Random Address 1'}],
+            loads(response.data)['data']['estates'])
+        response = self.client.get('/api/v1/estates/1?expand=board')
+        self.assertEqual(
+            {'id': 1, 'address': 'Random Address 1', 'board_id': 1,
+             'board': {'id': 1, 'members': []}},
+            loads(response.data)['data']['estate'])
+        response = self.client.get(
+            '/api/v1/estates/?stream=true&fields=id,units')
+        self.assertEqual(
+            [{'id': 1, 'units': []}], loads(response.data)['data']['estates'])
+
     def test_view_estate_payment_nonexistent(self):
         response = self.client.get(
             '/api/v1/estates/1/payment/'
@@ -124,6 +156,7 @@ class TestEstate(BaseCase):
         actual = loads(response.data)
         self.assertEqual(201, response.status_code)
         self.assertEqual(expected, actual)
+        self.assertEqual(1, Estate.get(id=1).board_id)
 
     def test_create_estate_nonexistent_board(self):
         response = self.client.post(
@@ -152,3 +185,43 @@ class TestEstate(BaseCase):
         actual = loads(response.data)
         self.assertEqual(400, response.status_code)
         self.assertEqual(expected, actual)
+
+    def test_clear_estate_payment(self):
+        self.estate1.save()
+        response = self.client.delete('/api/v1/estates/1/payment')
+        self.assertEqual(400, response.status_code)
+        response = self.client.delete(
+            '/api/v1/estates/1/payment', headers=self.headers)
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(
+            'The estate has no payment.', loads(response.data)['message'])
+        estate1 = Estate.get(id=1)
+        estate1.insert('payment', Payment(deposits=[Deposit(amount=5)],
+                                          balance=5))
+        response = self.client.delete(
+            '/api/v1/estates/1/payment', headers=self.headers)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            'The payment history has been cleared.',
+            loads(response.data)['message'])
+        self.assertTrue(Estate.check_exists(id=1))
+        self.assertEqual([], Payment.get(id=1).deposits)
+        self.assertEqual(0.0, Payment.get(id=1).balance)
+
+    def test_view_estate_changed_by_another_worker(self):
+        self.estate1.save()
+        response = self.client.get('/api/v1/estates/1')
+        etag = response.headers['ETag']
+        db.session.execute(
+            "UPDATE estate SET address = 'Moved', version = version + 1 "
+            "WHERE id = 1")
+        db.session.commit()
+        response = self.client.get(
+            '/api/v1/estates/1', headers={'If-None-Match': etag})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            'Moved', loads(response.data)['data']['estate']['address'])
+        response = self.client.get(
+            '/api/v1/estates/1',
+            headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(304, response.status_code)
@@ -19,12 +19,15 @@ class TestMessage(BaseCase):
             content_type='application/json',
             data=dumps(self.message4_dict),
             headers=self.headers)
-        expected = sorted(['id', 'timestamp', 'board_id',
-                           'participants', 'messages', 'title'])
-        actual = sorted([i for i in loads(response.data)['data'][
-            'updated_conversation']])
+        expected = sorted(['id', 'content', 'edited', 'sender',
+                           'timestamp', 'conversation_id'])
+        data = loads(response.data)
+        actual = sorted([i for i in data['data']['message']])
         self.assertEqual(201, response.status_code)
         self.assertEqual(expected, actual)
+        self.assertEqual(
+            '{!r}:1'.format(data['data']['message']['timestamp']),
+            data['next'])
 
     def test_send_message_missing_content(self):
         self.user1.save()
@@ -84,6 +87,22 @@ class TestMessage(BaseCase):
         self.assertEqual(200, response.status_code)
         self.assertEqual(expected, actual)
 
+    def test_view_message_in_conversation_of_others(self):
+        self.user1.save()
+        self.user2.save()
+        User.get(id=1).insert('conversations', self.conversation1)
+        User.get(id=2).insert('conversations', self.conversation2)
+        Conversation.get(id=2).insert('messages', self.message2)
+        response = self.client.get(
+            '/api/v1/conversations/2/messages/1',
+            headers=self.headers)
+        expected = {
+            'status': 'fail',
+            'message': 'The conversation does not exist.',
+            'help': 'Ensure conversation_id is existent.'}
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(expected, loads(response.data))
+
     def test_view_nonexistent_message_in_conversation(self):
         self.user1.save()
         User.get(id=1).insert('conversations', self.conversation1)
@@ -116,6 +135,50 @@ class TestMessage(BaseCase):
         self.assertEqual(expected, actual1)
         self.assertEqual(expected, actual2)
 
+    def test_view_messages_paginated(self):
+        self.user1.save()
+        User.get(id=1).insert('conversations', self.conversation1)
+        for i in range(5):
+            self.client.post(
+                '/api/v1/conversations/1/messages/',
+                content_type='application/json',
+                data=dumps({'content': str(i)}),
+                headers=self.headers)
+        response = self.client.get(
+            '/api/v1/conversations/1/messages/?limit=2',
+            headers=self.headers)
+        page = loads(response.data)
+        self.assertEqual(
+            ['3', '4'], [i['content'] for i in page['data']['messages']])
+        response = self.client.get(
+            '/api/v1/conversations/1/messages/?limit=2&before=' +
+            page['next'], headers=self.headers)
+        page = loads(response.data)
+        self.assertEqual(
+            ['1', '2'], [i['content'] for i in page['data']['messages']])
+        response = self.client.get(
+            '/api/v1/conversations/1/messages/?limit=2&before=' +
+            page['next'], headers=self.headers)
+        page = loads(response.data)
+        self.assertEqual(
+            ['0'], [i['content'] for i in page['data']['messages']])
+        self.assertEqual(None, page['next'])
+
+    def test_view_messages_malformed_cursor(self):
+        self.user1.save()
+        User.get(id=1).insert('conversations', self.conversation1)
+        Conversation.get(id=1).insert('messages', self.message1)
+        response = self.client.get(
+            '/api/v1/conversations/1/messages/?before=latest',
+            headers=self.headers)
+        expected = {
+            'status': 'fail',
+            'message': 'The cursor is not valid.',
+            'help': 'Use the next cursor of a page of messages.'
+        }
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(expected, loads(response.data))
+
     def test_view_messages_none_in_conversation(self):
         self.user1.save()
         self.conversation1.save()
@@ -166,11 +229,11 @@ class TestMessage(BaseCase):
         response = self.client.delete(
             '/api/v1/conversations/1/messages/1',
             headers=self.headers)
-        expected = []
-        actual = loads(response.data)['data'][
-            'updated_conversation']['messages']
+        expected = 'Random Content'
+        actual = loads(response.data)['data']['message']['content']
         self.assertEqual(200, response.status_code)
         self.assertEqual(expected, actual)
+        self.assertEqual([], Conversation.get(id=1).messages)
 
     def test_update_message(self):
         self.user1.save()
@@ -182,8 +245,7 @@ class TestMessage(BaseCase):
             content_type='application/json',
             data=dumps({'new_data': {'content': 'New Content'}}))
         expected = 'New Content'
-        actual = loads(response.data)['data'][
-            'updated_conversation']['messages'][0]['content']
+        actual = loads(response.data)['data']['message']['content']
         self.assertEqual(200, response.status_code)
         self.assertEqual(expected, actual)
 
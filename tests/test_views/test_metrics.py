@@ -0,0 +1,24 @@
+# pylint:disable=missing-docstring, invalid-name
+
+from json import loads
+
+from tests.base import BaseCase
+
+
+class TestMetrics(BaseCase):
+
+    def test_view_pool_metrics(self):
+        response = self.client.get(
+            '/api/v1/metrics/pool', headers=self.headers)
+        self.assertEqual(200, response.status_code)
+        pool = loads(response.data)['data']['pool']
+        self.assertLessEqual(1, pool['checkout'])
+        self.assertEqual(
+            sorted(['checkin', 'checkout', 'connect', 'invalidate', 'pool',
+                    'status']),
+            sorted(key for key in pool if key not in (
+                'size', 'checkedin', 'checkedout', 'overflow')))
+
+    def test_view_pool_metrics_without_token(self):
+        response = self.client.get('/api/v1/metrics/pool')
+        self.assertEqual(400, response.status_code)
@@ -58,11 +58,45 @@ class TestRole(BaseCase):
             'status': 'success',
             'data': {
                 'roles': [
-                    {'id': 1, 'title': 'basic'}, {'id': 2, 'title': 'admin'}]}}
+                    {'id': 1, 'title': 'basic'}, {'id': 2, 'title': 'admin'}]},
+            'next': None}
         actual = loads(response.data)
         self.assertEqual(200, response.status_code)
         self.assertEqual(expected, actual)
 
+    def test_get_roles_paginated(self):
+        self.role1.save()
+        self.role2.save()
+        self.role3.save()
+        response = self.client.get(
+            '/api/v1/roles/?limit=2',
+            headers=self.headers)
+        expected = {
+            'status': 'success',
+            'data': {
+                'roles': [
+                    {'id': 1, 'title': 'basic'}, {'id': 2, 'title': 'admin'}]},
+            'next': 2}
+        self.assertEqual(expected, loads(response.data))
+        response = self.client.get(
+            '/api/v1/roles/?after_id=2&limit=2',
+            headers=self.headers)
+        expected = {
+            'status': 'success',
+            'data': {
+                'roles': [{'id': 3, 'title': 'super_admin'}]},
+            'next': None}
+        self.assertEqual(expected, loads(response.data))
+        response = self.client.get(
+            '/api/v1/roles/?after_id=3&limit=2',
+            headers=self.headers)
+        expected = {
+            'status': 'success',
+            'data': {'roles': []},
+            'next': None}
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected, loads(response.data))
+
     def test_get_role_users_nonexistent_role(self):
         response = self.client.get(
             '/api/v1/roles/1/users/',
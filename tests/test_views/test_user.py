@@ -24,6 +24,71 @@ class TestUser(BaseCase):
         self.assertDictEqual(expected, loads(response.data))
         self.assertEqual(201, response.status_code)
 
+    def test_create_user_taken_email(self):
+        self.role1.save()
+        self.client.post(
+            '/api/v1/users/',
+            content_type='application/json',
+            data=dumps(self.user1_dict))
+        response = self.client.post(
+            '/api/v1/users/',
+            content_type='application/json',
+            data=dumps(self.user1_dict))
+        expected = {
+            'status': 'fail',
+            'message': 'The user could not be created.',
+            'help': 'Ensure the email and phone number are unused.'
+        }
+        self.assertEqual(409, response.status_code)
+        self.assertEqual(expected, loads(response.data))
+        self.assertEqual(1, len(User.get_all()))
+        self.assertEqual(1, len(Wallet.get_all()))
+
+    def test_create_users_in_bulk(self):
+        self.role1.save()
+        users = [dict(self.user1_dict), {'email': 'missing@email.com'}]
+        response = self.client.post(
+            '/api/v1/users/bulk',
+            headers=self.headers,
+            content_type='application/json',
+            data=dumps({'users': users}))
+        self.assertEqual(201, response.status_code)
+        data = loads(response.data)['data']
+        self.assertEqual(1, data['created'])
+        self.assertEqual([2], [error['row'] for error in data['errors']])
+        self.assertEqual(['basic'], [
+            role.title for role in User.get(email=users[0]['email']).roles])
+
+    def test_create_users_in_bulk_from_json_lines(self):
+        body = '\n'.join([dumps(self.user1_dict), '{}'])
+        response = self.client.post(
+            '/api/v1/users/bulk',
+            headers=self.headers,
+            content_type='application/x-ndjson',
+            data=body)
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(1, loads(response.data)['data']['created'])
+        response = self.client.post(
+            '/api/v1/users/bulk',
+            headers=self.headers,
+            content_type='application/x-ndjson',
+            data=body)
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(2, len(loads(response.data)['errors']))
+
+    def test_create_users_in_bulk_no_data(self):
+        response = self.client.post(
+            '/api/v1/users/bulk',
+            headers=self.headers,
+            content_type='application/json',
+            data=dumps({}))
+        self.assertEqual(400, response.status_code)
+        response = self.client.post(
+            '/api/v1/users/bulk',
+            content_type='application/json',
+            data=dumps({'users': []}))
+        self.assertEqual(400, response.status_code)
+
     def test_create_user_missing_data(self):
         response = self.client.post(
             '/api/v1/users/', content_type='application/json', data=dumps({}))
@@ -95,10 +160,21 @@ class TestUser(BaseCase):
                     {'id': 2,
                      'email': 'first2.last2@email.com',
                      'name': 'First2 Middle2 Last2',
-                     'phone_number': '000 12 3456782'}]}}
+                     'phone_number': '000 12 3456782'}]},
+            'next': None}
         self.assertDictEqual(expected, loads(response.data))
         self.assertEqual(200, response.status_code)
 
+    def test_get_users_page_size_is_capped(self):
+        self.app.config['MAX_PAGE_SIZE'] = 1
+        self.user1.save()
+        self.user2.save()
+        response = self.client.get(
+            '/api/v1/users/all/?limit=50', headers=self.headers)
+        actual = loads(response.data)
+        self.assertEqual(1, len(actual['data']['users']))
+        self.assertEqual(1, actual['next'])
+
     def test_get_users_when_none_is_in_database(self):
         response = self.client.get(
             '/api/v1/users/all/', headers=self.headers)
@@ -132,7 +208,8 @@ class TestUser(BaseCase):
                     {'id': 1,
                      'email': 'first1.last1@email.com',
                      'name': 'First1 Middle1 Last1',
-                     'phone_number': '000 12 3456781'}]}}
+                     'phone_number': '000 12 3456781'}]},
+            'next': None}
         self.assertDictEqual(expected, loads(response.data))
         self.assertEqual(200, response.status_code)
 
@@ -152,10 +229,44 @@ class TestUser(BaseCase):
                     {'id': 2,
                      'email': 'first2.last2@email.com',
                      'name': 'First2 Middle2 Last2',
-                     'phone_number': '000 12 3456782'}]}}
+                     'phone_number': '000 12 3456782'}]},
+            'next': None}
         self.assertDictEqual(expected, loads(response.data))
         self.assertEqual(200, response.status_code)
 
+    def test_search_user_paginated(self):
+        self.user1.save()
+        self.user2.save()
+        response = self.client.get(
+            '/api/v1/users/?q=First&limit=1&offset=1', headers=self.headers)
+        expected = {
+            'status': 'success',
+            'data': {
+                'users': [
+                    {'id': 2,
+                     'email': 'first2.last2@email.com',
+                     'name': 'First2 Middle2 Last2',
+                     'phone_number': '000 12 3456782'}]},
+            'next': None}
+        self.assertDictEqual(expected, loads(response.data))
+        self.assertEqual(200, response.status_code)
+
+    def test_search_user_pages(self):
+        self.user1.save()
+        self.user2.save()
+        response = self.client.get(
+            '/api/v1/users/?q=First&limit=1&offset=-5', headers=self.headers)
+        self.assertEqual(200, response.status_code)
+        data = loads(response.data)
+        self.assertEqual([1], [user['id'] for user in data['data']['users']])
+        self.assertEqual(1, data['next'])
+        response = self.client.get(
+            '/api/v1/users/?q=First&limit=1&offset={}'.format(data['next']),
+            headers=self.headers)
+        data = loads(response.data)
+        self.assertEqual([2], [user['id'] for user in data['data']['users']])
+        self.assertIsNone(data['next'])
+
     def test_search_user_no_result(self):
         self.user1.save()
         self.user2.save()
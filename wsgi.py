@@ -0,0 +1,12 @@
+"""
+The application as served by gunicorn.
+
+gunicorn imports this module in each worker after forking, so every worker
+builds its own application and database connection pool.
+"""
+
+from os import getenv
+
+from main import create_app
+
+app = create_app(getenv('APP_CONFIG', 'production'))